@@ -19,6 +19,8 @@ function HistoryPage() {
   // 为不同类型的数据创建独立的 state
   const [submissions, setSubmissions] = useState([]);
   const [papers, setPapers] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null); // 下一页游标，为 null 时表示没有更多
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -46,7 +48,7 @@ function HistoryPage() {
 
     setLoading(true);
     setError(null);
-    const endpoint = activeTab === 'submissions' ? '/history/' : '/history_test_papers';
+    const endpoint = activeTab === 'submissions' ? '/history/summary' : '/history_test_papers';
     const url = `${API_URL}${endpoint}`;
 
     const params = new URLSearchParams({
@@ -65,10 +67,11 @@ function HistoryPage() {
       const data = await response.json();
       // 根据当前 tab 更新对应的 state
       if (activeTab === 'submissions') {
-        setSubmissions(data);
+        setSubmissions(data.items);
       } else {
-        setPapers(data);
+        setPapers(data.items);
       }
+      setNextCursor(data.next_cursor);
     } catch (err) {
       console.error('获取历史记录时出错:', err);
       setError(err.message);
@@ -77,6 +80,38 @@ function HistoryPage() {
     }
   }, [activeTab, searchTerm, sortBy, order, submissions.length, papers.length]);
 
+  // 加载下一页并追加到当前列表
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    const endpoint = activeTab === 'submissions' ? '/history/summary' : '/history_test_papers';
+    const params = new URLSearchParams({
+      search: searchTerm,
+      sort_by: sortBy,
+      order: order,
+      cursor: nextCursor,
+    });
+
+    try {
+      const response = await fetch(`${API_URL}${endpoint}?${params.toString()}`);
+      if (!response.ok) {
+        throw new Error(`获取历史记录失败: ${response.status} ${response.statusText}`);
+      }
+      const data = await response.json();
+      if (activeTab === 'submissions') {
+        setSubmissions(prev => [...prev, ...data.items]);
+      } else {
+        setPapers(prev => [...prev, ...data.items]);
+      }
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      console.error('加载更多历史记录时出错:', err);
+      message.error(err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // 切换 tab 或排序条件时触发数据获取
   useEffect(() => {
     fetchHistory(true); // 强制刷新以获取新排序的数据
@@ -251,18 +286,18 @@ function HistoryPage() {
                 <div className="card-content">
                   <div className="card-header">
                     <h2 onClick={() => navigate(`/history/${item.id}`)}>
-                      {item.test_paper?.name || `提交记录 #${item.id}`}
+                      {item.test_paper_name || `提交记录 #${item.id}`}
                     </h2>
                     <p className="card-date">提交于: {new Date(item.created_at).toLocaleString()}</p>
                   </div>
                   <div className="card-stats">
                     <StatCard
                       label="客观题正确率"
-                      value={`${item.correct_objective_questions ?? 'N/A'} / ${item.test_paper?.total_objective_questions || 0}`}
+                      value={`${item.correct_objective_questions ?? 'N/A'} / ${item.total_objective_questions || 0}`}
                     />
                     <StatCard
                       label="论述题总数"
-                      value={`${item.test_paper?.total_essay_questions ?? 'N/A'}`}
+                      value={`${item.total_essay_questions ?? 'N/A'}`}
                     />
                   </div>
                 </div>
@@ -296,6 +331,12 @@ function HistoryPage() {
         )
       )}
 
+      {!loading && !error && nextCursor && (
+        <div style={{ display: 'flex', justifyContent: 'center', padding: '20px' }}>
+          <Button onClick={loadMore} loading={loadingMore}>加载更多</Button>
+        </div>
+      )}
+
       <Modal
         title="删除确认"
         visible={isModalVisible}
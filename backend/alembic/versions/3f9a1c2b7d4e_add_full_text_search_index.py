@@ -0,0 +1,92 @@
+"""Add full-text search index over papers and questions
+
+Revision ID: 3f9a1c2b7d4e
+Revises: dd9ed1c31122
+Create Date: 2026-10-19 10:12:41.532117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c2b7d4e'
+down_revision: Union[str, None] = 'dd9ed1c31122'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+OPTIONS_TEXT = "CASE WHEN json_valid({col}) THEN (SELECT group_concat(value, ' ') FROM json_each({col})) END"
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS test_papers_fts USING fts5(name, tokenize='trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(stem, options, tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS test_papers_fts_ai AFTER INSERT ON test_papers BEGIN
+        INSERT INTO test_papers_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS test_papers_fts_ad AFTER DELETE ON test_papers BEGIN
+        DELETE FROM test_papers_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS test_papers_fts_au AFTER UPDATE OF name ON test_papers BEGIN
+        DELETE FROM test_papers_fts WHERE rowid = old.id;
+        INSERT INTO test_papers_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+        INSERT INTO questions_fts(rowid, stem, options) VALUES (new.id, new.stem, {OPTIONS_TEXT.format(col='new.options')});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+        DELETE FROM questions_fts WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE OF stem, options ON questions BEGIN
+        DELETE FROM questions_fts WHERE rowid = old.id;
+        INSERT INTO questions_fts(rowid, stem, options) VALUES (new.id, new.stem, {OPTIONS_TEXT.format(col='new.options')});
+    END""",
+    # 回填已有数据
+    "DELETE FROM test_papers_fts",
+    "INSERT INTO test_papers_fts(rowid, name) SELECT id, name FROM test_papers",
+    "DELETE FROM questions_fts",
+    f"INSERT INTO questions_fts(rowid, stem, options) SELECT id, stem, {OPTIONS_TEXT.format(col='questions.options')} FROM questions",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS questions_fts_au",
+    "DROP TRIGGER IF EXISTS questions_fts_ad",
+    "DROP TRIGGER IF EXISTS questions_fts_ai",
+    "DROP TRIGGER IF EXISTS test_papers_fts_au",
+    "DROP TRIGGER IF EXISTS test_papers_fts_ad",
+    "DROP TRIGGER IF EXISTS test_papers_fts_ai",
+    "DROP TABLE IF EXISTS questions_fts",
+    "DROP TABLE IF EXISTS test_papers_fts",
+]
+
+POSTGRES_UPGRADE = [
+    """ALTER TABLE test_papers ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', coalesce(name, ''))) STORED""",
+    """ALTER TABLE questions ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', coalesce(stem, '') || ' ' || coalesce(options::jsonb::text, ''))) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_test_papers_search_vector ON test_papers USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_questions_search_vector ON questions USING GIN (search_vector)",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_questions_search_vector",
+    "DROP INDEX IF EXISTS ix_test_papers_search_vector",
+    "ALTER TABLE questions DROP COLUMN IF EXISTS search_vector",
+    "ALTER TABLE test_papers DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    statements = SQLITE_UPGRADE if dialect == 'sqlite' else POSTGRES_UPGRADE if dialect == 'postgresql' else []
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    statements = SQLITE_DOWNGRADE if dialect == 'sqlite' else POSTGRES_DOWNGRADE if dialect == 'postgresql' else []
+    for statement in statements:
+        op.execute(statement)
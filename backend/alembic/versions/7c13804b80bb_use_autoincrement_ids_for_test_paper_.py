@@ -0,0 +1,41 @@
+"""Use AUTOINCREMENT ids for test paper results
+
+Revision ID: 7c13804b80bb
+Revises: 772376a4ede9
+Create Date: 2026-10-19 05:21:53.219548
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c13804b80bb'
+down_revision: Union[str, None] = '772376a4ede9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        # PostgreSQL 的序列本身不會重用ID
+        return
+    # 重建表以加上 AUTOINCREMENT，索引隨 batch 重建；其他表對它的外鍵按表名引用，不受影響
+    with op.batch_alter_table('test_paper_results', recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+        pass
+    # 已歸檔的ID也不能再分配：把序列推到熱表與歸檔表中最大的ID
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'test_paper_results'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'test_paper_results', max("
+        "coalesce((SELECT max(id) FROM test_paper_results), 0), "
+        "coalesce((SELECT max(id) FROM test_paper_results_archive), 0))"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('test_paper_results', recreate='always', table_kwargs={'sqlite_autoincrement': False}):
+        pass
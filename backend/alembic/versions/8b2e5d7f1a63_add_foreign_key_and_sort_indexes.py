@@ -0,0 +1,30 @@
+"""Add foreign key and history sort indexes
+
+Revision ID: 8b2e5d7f1a63
+Revises: 3f9a1c2b7d4e
+Create Date: 2026-10-19 11:03:27.904215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e5d7f1a63'
+down_revision: Union[str, None] = '3f9a1c2b7d4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_questions_test_paper_id'), 'questions', ['test_paper_id'], unique=False)
+    op.create_index('ix_test_paper_results_test_paper_id_created_at', 'test_paper_results', ['test_paper_id', 'created_at'], unique=False)
+    op.create_index('ix_test_papers_name_sort', 'test_papers', [sa.text("coalesce(name, '')"), 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_test_papers_name_sort', table_name='test_papers')
+    op.drop_index('ix_test_paper_results_test_paper_id_created_at', table_name='test_paper_results')
+    op.drop_index(op.f('ix_questions_test_paper_id'), table_name='questions')
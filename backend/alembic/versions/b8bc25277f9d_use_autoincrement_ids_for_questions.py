@@ -0,0 +1,59 @@
+"""Use AUTOINCREMENT ids for questions
+
+Revision ID: b8bc25277f9d
+Revises: 7c13804b80bb
+Create Date: 2026-10-19 05:23:34.486250
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8bc25277f9d'
+down_revision: Union[str, None] = '7c13804b80bb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 編寫本遷移時 questions 上的全文索引觸發器（副本，不隨 models 修改而變化）
+QUESTIONS_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+        INSERT INTO questions_fts(rowid, stem, options) VALUES (
+            new.id, new.stem,
+            CASE WHEN json_valid(new.options) THEN (SELECT group_concat(value, ' ') FROM json_each(new.options)) END
+        );
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+        DELETE FROM questions_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE OF stem, options ON questions BEGIN
+        DELETE FROM questions_fts WHERE rowid = old.id;
+        INSERT INTO questions_fts(rowid, stem, options) VALUES (
+            new.id, new.stem,
+            CASE WHEN json_valid(new.options) THEN (SELECT group_concat(value, ' ') FROM json_each(new.options)) END
+        );
+    END""",
+]
+
+
+def _rebuild_questions(autoincrement: bool):
+    # 重建表不會保留 questions 上的全文索引觸發器，重建後補回（questions_fts 中的數據按ID對應，無需回填）
+    with op.batch_alter_table('questions', recreate='always', table_kwargs={'sqlite_autoincrement': autoincrement}):
+        pass
+    for statement in QUESTIONS_FTS_TRIGGERS:
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        # PostgreSQL 的序列本身不會重用ID
+        return
+    _rebuild_questions(True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _rebuild_questions(False)
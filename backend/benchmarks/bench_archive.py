@@ -0,0 +1,81 @@
+# benchmarks/bench_archive.py
+
+"""
+测量归档旧提交记录的吞吐量与每批持锁时间，以及归档前后历史接口的延迟和数据库体积。
+用法（在 backend 目录下）: python -m benchmarks.bench_archive --results 20000 --recent 1000
+"""
+
+import os
+import time
+import argparse
+import datetime
+
+from sqlalchemy import text, update
+from sqlalchemy.orm import Session
+
+import models
+import services
+from benchmarks.common import make_engine, make_client, seed_paper, seed_results, timed, rng
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=20000, help="提交记录总数")
+    parser.add_argument("--recent", type=int, default=1000, help="其中保持为近期（不归档）的记录数")
+    parser.add_argument("--questions", type=int, default=30, help="每份试卷的题目数量")
+    parser.add_argument("--batch-size", type=int, default=services.RESULT_ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    engine = make_engine()
+    path = engine.url.database
+    with Session(engine) as session:
+        r = rng()
+        paper = seed_paper(session, args.questions, r)
+        seed_results(session, paper, args.results, r)
+        # seed_results 的时间从 2025-01-01 开始，把最后 recent 条改为当前时间
+        recent_from = args.results - args.recent
+        session.execute(
+            update(models.TestPaperResult)
+            .where(models.TestPaperResult.id > recent_from)
+            .values(created_at=datetime.datetime.utcnow())
+        )
+        session.commit()
+
+    client = make_client(engine)
+
+    def measure(label):
+        with engine.connect() as conn:
+            conn.execute(text("VACUUM"))
+        page, _ = timed(lambda: client.get("/history/summary", params={"limit": 50}))
+        count, _ = timed(lambda: client.get("/history/summary", params={"limit": 50, "include_total": True}))
+        full, _ = timed(lambda: client.get("/history/", params={"limit": 50}))
+        print(f"{label:<26}{os.path.getsize(path) / 1e6:>10.1f} MB{page * 1000:>12.1f} ms{count * 1000:>12.1f} ms{full * 1000:>12.1f} ms")
+
+    print(f"{args.results} results x {args.questions} questions, {args.recent} recent, batch size {args.batch_size}")
+    print(f"{'':<26}{'db size':>13}{'summary':>15}{'+ total':>15}{'full page':>15}")
+    measure("before archiving")
+
+    batch_times = []
+    with Session(engine) as session:
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=services.RESULT_ARCHIVE_AFTER_DAYS)
+        while True:
+            start = time.perf_counter()
+            moved = services.archive_results_batch(session, cutoff, args.batch_size)
+            if not moved:
+                break
+            batch_times.append(time.perf_counter() - start)
+        hot, cold, stored = services.result_archive_counts(session)
+
+    batch_times.sort()
+    total = sum(batch_times)
+    print(f"archived {cold} rows in {len(batch_times)} batches, {total:.2f} s ({cold / total:,.0f} rows/s); "
+          f"per batch p50 {batch_times[len(batch_times) // 2] * 1000:.1f} ms, max {batch_times[-1] * 1000:.1f} ms; "
+          f"{stored / cold:,.0f} bytes/row compressed")
+    measure("after archiving (hot)")
+    page, _ = timed(lambda: client.get("/history/summary", params={"limit": 50, "include_archived": True}))
+    full, _ = timed(lambda: client.get("/history/", params={"limit": 50, "include_archived": True, "order": "asc"}))
+    print(f"{'include_archived':<26}{'':>13}{page * 1000:>12.1f} ms{'':>15}{full * 1000:>12.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# benchmarks/bench_bulk_export.py
+
+"""
+批量 ZIP 导出：测量吞吐，以及导出过程中 Python 堆内存峰值是否随试卷数量增长。
+用法（在 backend 目录下）: python -m benchmarks.bench_bulk_export --papers 1000 2000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from sqlalchemy.orm import Session
+
+import services
+from benchmarks.common import make_engine, seed_paper, seed_results, rng
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, nargs="+", default=[500, 2000], help="试卷数量（可给出多个规模对比）")
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--results", type=int, default=5, help="每份试卷的提交数")
+    args = parser.parse_args()
+
+    print(f"{'papers':>8}{'zip bytes':>16}{'seconds':>10}{'papers/s':>10}{'peak heap':>14}")
+    for count in args.papers:
+        engine = make_engine()
+        r = rng()
+        with Session(engine) as session:
+            for i in range(count):
+                paper = seed_paper(session, args.questions, r, name=f"试卷{i}")
+                seed_results(session, paper, args.results, r)
+                session.expunge_all()
+
+        with Session(engine) as session:
+            tracemalloc.start()
+            start = time.perf_counter()
+            total = 0
+            for chunk in services.iter_papers_zip(session, services.filter_papers(session)):
+                total += len(chunk)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        print(f"{count:>8}{total:>16,}{elapsed:>10.2f}{count / elapsed:>10.0f}{peak / 1024 / 1024:>11.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
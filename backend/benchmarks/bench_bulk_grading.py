@@ -0,0 +1,81 @@
+# benchmarks/bench_bulk_grading.py
+
+"""
+比较逐份调用 /grade-questions 与一次调用批量接口批改同样数量提交的耗时。
+用法（在 backend 目录下）: python -m benchmarks.bench_bulk_grading --students 500
+"""
+
+import argparse
+import csv
+import io
+
+from sqlalchemy.orm import Session
+
+import models
+from benchmarks.common import make_engine, make_client, make_user_answers, seed_paper, timed, rng
+
+HEADERS = {"X-Provider": "siliconflow", "X-Api-Key": "bench"}
+LETTERS = "ABCD"
+
+
+def to_csv(paper, submissions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["student_id"] + [str(q.id) for q in paper.questions])
+    for submission in submissions:
+        cells = []
+        for answer in submission["answers"]:
+            if answer["answer_index"] is not None:
+                cells.append(LETTERS[answer["answer_index"]])
+            elif answer["answer_indices"] is not None:
+                cells.append("".join(LETTERS[i] for i in answer["answer_indices"]))
+            elif answer["answer_texts"] is not None:
+                cells.append("|".join(answer["answer_texts"]))
+            else:
+                cells.append(answer["answer_text"])
+        writer.writerow([submission["student_id"]] + cells)
+    return buffer.getvalue().encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=500, help="提交数量")
+    parser.add_argument("--questions", type=int, default=40, help="每份试卷的题目数量")
+    args = parser.parse_args()
+
+    engine = make_engine()
+    with Session(engine) as session:
+        r = rng()
+        paper = seed_paper(session, args.questions, r)
+        paper_id = paper.id
+        submissions = [{"student_id": f"s{i}", "answers": make_user_answers(paper, r)} for i in range(args.students)]
+        csv_body = to_csv(paper, submissions)
+
+    client = make_client(engine)
+
+    def one_by_one():
+        for submission in submissions:
+            response = client.post("/grade-questions", headers=HEADERS,
+                                   json={"test_id": str(paper_id), "answers": submission["answers"]})
+            assert response.status_code == 200
+
+    def bulk_json():
+        response = client.post("/grade-questions/bulk", json={"test_id": str(paper_id), "submissions": submissions})
+        assert response.status_code == 200
+
+    def bulk_csv():
+        response = client.post("/grade-questions/bulk/upload", data={"test_id": str(paper_id)},
+                               files={"file": ("answers.csv", csv_body, "text/csv")})
+        assert response.status_code == 200
+
+    print(f"{args.students} submissions x {args.questions} questions")
+    for name, func in (("one request each", one_by_one), ("bulk JSON", bulk_json), ("bulk CSV upload", bulk_csv)):
+        elapsed, _ = timed(func, repeat=1)
+        print(f"{name:<20}{elapsed:>8.2f} s{args.students / elapsed:>10.0f} submissions/s")
+
+    with Session(engine) as session:
+        assert session.query(models.TestPaperResult).count() == args.students * 3
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_dedup.py
+
+"""
+近似重复检测：向题库写入大量互不相同的题目（其中一部分是改写过的近似重复），
+测量首次建立 LSH 索引的耗时、单次查重的延迟（含增量同步与存在性确认）以及重复簇的计算耗时。
+用法（在 backend 目录下）: python -m benchmarks.bench_dedup --questions 100000
+"""
+
+import argparse
+import random
+import time
+import statistics
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import models
+import services
+from services import dedup
+from benchmarks.common import make_engine, rng
+
+VOCABULARY = ("循环 变量 函数 列表 字典 元组 字符串 集合 索引 事务 哈希 排序 递归 指针 栈 队列 "
+              "线程 进程 缓存 网络 协议 数据库 编译 解释 对象 继承 多态 接口 异常 模块").split()
+
+
+def make_stem(r):
+    return "关于" + "、".join(r.sample(VOCABULARY, 6)) + f"的描述，下列说法正确的是（{r.randrange(10**6)}）"
+
+
+def seed_bank(engine, count, duplicate_rate, r):
+    stems = []
+    with Session(engine) as session:
+        paper_ids = session.scalars(
+            insert(models.TestPaper).returning(models.TestPaper.id, sort_by_parameter_order=True),
+            [{"name": f"题库{i}"} for i in range(count // 50 + 1)],
+        ).all()
+        rows = []
+        for i in range(count):
+            if stems and r.random() < duplicate_rate:
+                stem = r.choice(stems) + "。"  # 只差一个标点的近似重复
+            else:
+                stem = make_stem(r)
+            stems.append(stem)
+            rows.append({"test_paper_id": paper_ids[i // 50], "question_type": "single_choice", "stem": stem,
+                         "options": [f"选项{j}" for j in range(4)], "correct_answer": {"index": 0}})
+        session.execute(insert(models.DBQuestion), rows)
+        session.commit()
+    return stems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--duplicates", type=float, default=0.02, help="近似重复题目的比例")
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    r = rng()
+    engine = make_engine()
+    stems = seed_bank(engine, args.questions, args.duplicates, r)
+
+    with Session(engine) as session:
+        start = time.perf_counter()
+        index = dedup.sync_question_index(session)
+        print(f"index build: {time.perf_counter() - start:.2f} s for {len(index):,} questions")
+
+        probes = [r.choice(stems) if i % 2 else make_stem(r) for i in range(args.lookups)]
+        options = [f"选项{j}" for j in range(4)]
+        timings = {"index lookup": [], "find_duplicate_questions": []}
+        for stem in probes:
+            signature = dedup.minhash_signature(stem, options)
+            start = time.perf_counter()
+            index.query(signature, services.DUPLICATE_THRESHOLD)
+            timings["index lookup"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            services.find_duplicate_questions(session, stem, options)
+            timings["find_duplicate_questions"].append(time.perf_counter() - start)
+        for name, values in timings.items():
+            values.sort()
+            print(f"{name:<26} p50 {statistics.median(values) * 1000:.3f} ms   p99 {values[int(len(values) * 0.99)] * 1000:.3f} ms")
+
+        start = time.perf_counter()
+        response = services.find_duplicate_clusters(session, limit=100)
+        print(f"clusters: {time.perf_counter() - start:.2f} s, first page {len(response.clusters)} clusters")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# benchmarks/bench_history_summary.py
+
+"""
+比较完整历史记录接口与摘要接口的响应体积和延迟。
+用法（在 backend 目录下）: python -m benchmarks.bench_history_summary --results 5000
+"""
+
+import argparse
+
+from benchmarks.common import make_engine, make_client, seed_paper, seed_results, timed, rng
+
+
+def walk_all(client, url, limit):
+    """按游标翻完所有页，返回 (总字节数, 总条数)。"""
+    total_bytes, total_items, cursor = 0, 0, None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(url, params=params)
+        total_bytes += len(response.content)
+        data = response.json()
+        total_items += len(data["items"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            return total_bytes, total_items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=5000, help="提交记录数量")
+    parser.add_argument("--questions", type=int, default=30, help="每份试卷的题目数量")
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    engine = make_engine()
+    from sqlalchemy.orm import Session
+    with Session(engine) as session:
+        r = rng()
+        paper = seed_paper(session, args.questions, r)
+        seed_results(session, paper, args.results, r)
+
+    client = make_client(engine)
+    print(f"{args.results} results x {args.questions} questions, page size {args.page_size}")
+    print(f"{'endpoint':<20}{'first page':>14}{'page bytes':>14}{'full walk':>12}{'walk bytes':>14}")
+    for url in ("/history/", "/history/summary"):
+        page_time, response = timed(lambda: client.get(url, params={"limit": args.page_size}))
+        walk_time, (walk_bytes, items) = timed(lambda: walk_all(client, url, args.page_size), repeat=1)
+        assert items == args.results
+        print(f"{url:<20}{page_time * 1000:>11.1f} ms{len(response.content):>14,}{walk_time:>10.2f} s{walk_bytes:>14,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_item_analysis.py
+
+"""
+在大量提交记录上测量项目分析的耗时：冷启动（读库 + 构建矩阵 + 计算）、仅计算、以及缓存命中。
+用法（在 backend 目录下）: python -m benchmarks.bench_item_analysis --results 10000
+"""
+
+import argparse
+
+from benchmarks.common import make_engine, make_client, seed_paper, seed_results, timed, rng
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=10000, help="提交记录数量")
+    parser.add_argument("--questions", type=int, default=40, help="每份试卷的题目数量")
+    args = parser.parse_args()
+
+    engine = make_engine()
+    from sqlalchemy.orm import Session
+    with Session(engine) as session:
+        r = rng()
+        paper = seed_paper(session, args.questions, r)
+        seed_results(session, paper, args.results, r, feedback_chars=40)
+        paper_id = paper.id
+
+    from services import item_analysis
+
+    with Session(engine) as session:
+        def cold():
+            item_analysis._cache.clear()
+            return item_analysis.get_item_analysis(session, paper_id)
+        cold_time, response = timed(cold, repeat=3)
+
+        questions = [q for q in session.get(type(paper), paper_id).questions if q.question_type != "essay"]
+        import models
+        rows = session.query(models.TestPaperResult.user_answers, models.TestPaperResult.grading_results).filter(
+            models.TestPaperResult.test_paper_id == paper_id).all()
+        build_time, matrices = timed(lambda: item_analysis.ResponseMatrices(questions, rows), repeat=3)
+        compute_time, _ = timed(lambda: item_analysis.compute_item_metrics(matrices), repeat=5)
+
+    client = make_client(engine)
+    url = f"/history_test_papers/{paper_id}/item-analysis"
+    client.get(url)
+    cached_time, _ = timed(lambda: client.get(url), repeat=20)
+
+    print(f"{args.results} results x {args.questions} questions ({response.items_count} objective), KR-20 = {response.kr20}")
+    print(f"cold (load + build + compute): {cold_time * 1000:8.1f} ms")
+    print(f"  build response matrices:     {build_time * 1000:8.1f} ms")
+    print(f"  vectorized metrics:          {compute_time * 1000:8.1f} ms")
+    print(f"cached HTTP request:           {cached_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
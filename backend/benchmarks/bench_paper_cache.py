@@ -0,0 +1,50 @@
+# benchmarks/bench_paper_cache.py
+
+"""
+测量热门试卷的读取吞吐：每次重新渲染（缓存关闭）、命中序列化缓存、以及 ETag 重新验证返回 304。
+用法（在 backend 目录下）: python -m benchmarks.bench_paper_cache --requests 200
+"""
+
+import argparse
+
+from sqlalchemy.orm import Session
+
+from benchmarks.common import make_engine, make_client, seed_paper, timed, rng
+from services import response_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="每种场景的请求数（模拟同时打开试卷的学生）")
+    parser.add_argument("--questions", type=int, default=100, help="试卷题目数量")
+    args = parser.parse_args()
+
+    engine = make_engine()
+    with Session(engine) as session:
+        paper_id = seed_paper(session, args.questions, rng()).id
+    client = make_client(engine)
+
+    print(f"{args.requests} requests, {args.questions}-question paper")
+    print(f"{'endpoint':<34}{'uncached':>12}{'cached':>12}{'304':>12}   (requests/s)")
+    for url in (f"/test-papers/{paper_id}", f"/export/test-paper/{paper_id}/html"):
+        etag = client.get(url).headers["etag"]
+
+        def uncached():
+            for _ in range(args.requests):
+                response_cache._cache.clear()
+                assert client.get(url).status_code == 200
+
+        def cached():
+            for _ in range(args.requests):
+                assert client.get(url).status_code == 200
+
+        def revalidate():
+            for _ in range(args.requests):
+                assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+        rates = [args.requests / timed(func, repeat=3)[0] for func in (uncached, cached, revalidate)]
+        print(f"{url:<34}" + "".join(f"{rate:>12.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_serialization.py
+
+"""
+序列化微基准：
+  1. 100 道题的试卷：逐个尝试的 Union 答案模型 vs 按 type 区分的联合类型
+  2. 试卷响应与 1000 条历史记录：标准库 json.dumps vs orjson
+用法（在 backend 目录下）: python -m benchmarks.bench_serialization
+"""
+
+import argparse
+import datetime
+import json
+from typing import List, Optional, Union
+
+import orjson
+from pydantic import BaseModel, TypeAdapter
+
+import schemas
+from benchmarks.common import make_questions, timed, rng
+
+
+class LegacyQuestionModel(BaseModel):
+    """改动前的题目模型：answer 为普通 Union，校验时逐个尝试。"""
+    id: Optional[str] = None
+    type: str
+    stem: str
+    options: Optional[List[str]] = None
+    answer: Union[schemas.SingleChoiceAnswer, schemas.MultipleChoiceAnswer,
+                  schemas.FillInTheBlankAnswer, schemas.EssayAnswer]
+
+
+def json_dumps(data) -> bytes:
+    # 与 FastAPI 默认 JSONResponse 的参数一致
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def paper_rows(count, r):
+    return [
+        {"id": str(i + 1), "type": q["type"], "stem": q["stem"], "options": q["options"],
+         "answer": {"explanation": "", **q["answer"]} if q["type"] != "essay" else q["answer"]}
+        for i, q in enumerate(make_questions(count, r))
+    ]
+
+
+def history_rows(count, questions, r):
+    paper = {"id": 1, "name": "基准测试试卷", "created_at": datetime.datetime(2025, 1, 1),
+             "total_objective_questions": 75, "total_essay_questions": 25}
+    rows = []
+    for i in range(count):
+        rows.append({
+            "id": i + 1, "test_paper_id": 1, "test_paper": paper,
+            "user_answers": [{"question_id": q["id"], "question_type": q["type"], "answer_index": r.randrange(4)}
+                             for q in questions],
+            "grading_results": [{"question_id": q["id"], "is_correct": r.random() < 0.6} for q in questions],
+            "overall_feedback": "整体反馈" * 100,
+            "question_feedbacks": {q["id"]: "单题反馈" * 50 for q in questions[:5]},
+            "created_at": datetime.datetime(2025, 1, 1) + datetime.timedelta(minutes=i),
+            "correct_objective_questions": 45, "total_objective_questions": 75,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--history", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    r = rng()
+    questions = paper_rows(args.questions, r)
+    legacy = TypeAdapter(List[LegacyQuestionModel])
+    tagged = TypeAdapter(List[schemas.QuestionModel])
+    assert legacy.dump_python(legacy.validate_python(questions)) == tagged.dump_python(tagged.validate_python(questions))
+
+    print(f"{args.questions}-question paper")
+    for name, adapter in (("plain Union validate", legacy), ("discriminated validate", tagged)):
+        elapsed, _ = timed(lambda: adapter.validate_python(questions), repeat=args.repeat)
+        print(f"  {name:<28}{elapsed * 1000:>8.2f} ms")
+
+    paper = schemas.GenerateTestResponse(test_id="1", name="基准测试试卷", questions=tagged.validate_python(questions))
+    content = paper.model_dump(mode="json")
+    for name, encode in (("json.dumps", json_dumps), ("orjson.dumps", orjson.dumps)):
+        elapsed, body = timed(lambda: encode(content), repeat=args.repeat)
+        print(f"  {name:<28}{elapsed * 1000:>8.2f} ms  {len(body):,} bytes")
+
+    page = schemas.TestPaperResultPage(items=history_rows(args.history, questions, r))
+    content = page.model_dump(mode="json")
+    print(f"{args.history}-row history page")
+    for name, encode in (("json.dumps", json_dumps), ("orjson.dumps", orjson.dumps)):
+        elapsed, body = timed(lambda: encode(content), repeat=args.repeat)
+        print(f"  {name:<28}{elapsed * 1000:>8.2f} ms  {len(body):,} bytes")
+
+    events = [{"type": "question", "content": q} for q in questions]
+    print(f"SSE encoding of {len(events)} question events")
+    for name, encode in (("json.dumps", lambda e: f"data: {json.dumps(e)}\n\n"),
+                         ("orjson.dumps", lambda e: f"data: {orjson.dumps(e).decode()}\n\n")):
+        elapsed, _ = timed(lambda: [encode(e) for e in events], repeat=args.repeat)
+        print(f"  {name:<28}{elapsed * 1000:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
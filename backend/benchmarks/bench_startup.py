@@ -0,0 +1,90 @@
+# benchmarks/bench_startup.py
+
+"""
+测量冷启动：在全新的子进程中导入 main 的耗时、到第一个请求返回的耗时，
+以及按 `python -X importtime` 统计的最慢模块。提供商 SDK 在第一次使用时才导入，这里单独列出其开销。
+用法（在 backend 目录下）: python -m benchmarks.bench_startup --runs 5
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from os.path import abspath, dirname
+
+BACKEND_DIR = dirname(dirname(abspath(__file__)))
+
+IMPORT_MAIN = """
+import time, sys
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+print(int('google.generativeai' in sys.modules), int('openai' in sys.modules))
+"""
+
+FIRST_REQUEST = """
+import time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+import main
+with TestClient(main.app) as client:
+    assert client.get("/").status_code == 200
+    print(time.perf_counter() - start)
+"""
+
+SDK_IMPORT = """
+import time
+import main
+start = time.perf_counter()
+import services
+services.warm_up_llm_clients(["google", "siliconflow"])
+print(time.perf_counter() - start)
+"""
+
+
+def run(code, *flags, env=None):
+    result = subprocess.run(
+        [sys.executable, *flags, "-W", "ignore", "-c", code],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env=env, check=True,
+    )
+    return result.stdout.split(), result.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="列出累计导入耗时最长的模块数")
+    args = parser.parse_args()
+
+    # 内存数据库 + 不在启动时建表，只测量进程本身的启动开销
+    env = {**os.environ, "DATABASE_URL": "sqlite://", "DB_SCHEMA_MODE": "off", "LLM_WARMUP_PROVIDERS": ""}
+
+    imports, sdk_loaded = [], None
+    for _ in range(args.runs):
+        out, _ = run(IMPORT_MAIN, env=env)
+        imports.append(float(out[0]))
+        sdk_loaded = out[1:]
+    first = [float(run(FIRST_REQUEST, env=env)[0][0]) for _ in range(args.runs)]
+    sdk = [float(run(SDK_IMPORT, env=env)[0][0]) for _ in range(args.runs)]
+
+    print(f"import main            median {statistics.median(imports) * 1000:8.0f} ms")
+    print(f"first response to /    median {statistics.median(first) * 1000:8.0f} ms")
+    print(f"provider SDK warm-up   median {statistics.median(sdk) * 1000:8.0f} ms (paid on first use or by the warm-up hook)")
+    print(f"SDKs loaded by import main: google.generativeai={sdk_loaded[0]} openai={sdk_loaded[1]}")
+
+    _, stderr = run("import main", "-X", "importtime", env=env)
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    rows.sort(reverse=True)
+    print(f"\nslowest imports (cumulative, -X importtime):")
+    for cumulative, name in rows[:args.top]:
+        print(f"{cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_transfer.py
+
+"""
+JSONL 迁移：导出整个题库到（gzip）文件，再导入一个新的空数据库，记录耗时与进程内存峰值。
+用法（在 backend 目录下）: python -m benchmarks.bench_transfer --papers 2000 --questions 50
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from sqlalchemy.orm import Session
+
+import models
+import services
+from benchmarks.common import make_engine, make_questions, seed_results, rng
+
+
+def seed_bank(engine, papers, questions_per_paper, results_per_paper, r):
+    with Session(engine) as session:
+        template = make_questions(questions_per_paper, r)
+        for i in range(papers):
+            paper = models.TestPaper(name=f"题库试卷{i}", source_content="知识源文本" * 200,
+                                     config={"description": "bench", "question_config": [], "difficulty": "中等"},
+                                     total_objective_questions=sum(1 for q in template if q["type"] != "essay"),
+                                     total_essay_questions=sum(1 for q in template if q["type"] == "essay"))
+            paper.questions = [models.DBQuestion(question_type=q["type"], stem=q["stem"], options=q["options"],
+                                                 correct_answer={"explanation": "", **q["answer"]} if q["type"] != "essay" else q["answer"])
+                               for q in template]
+            session.add(paper)
+            session.flush()
+            if results_per_paper:
+                seed_results(session, paper, results_per_paper, r)
+            session.commit()
+            session.expunge_all()
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=50, help="每份试卷的题目数")
+    parser.add_argument("--results", type=int, default=2, help="每份试卷的提交数")
+    parser.add_argument("--no-gzip", action="store_true")
+    args = parser.parse_args()
+
+    source = make_engine()
+    start = time.perf_counter()
+    seed_bank(source, args.papers, args.questions, args.results, rng())
+    print(f"seeded {args.papers * args.questions:,} questions in {time.perf_counter() - start:.1f} s "
+          f"(peak RSS {peak_rss_mb():.0f} MB)")
+
+    path = os.path.join(tempfile.mkdtemp(prefix="ai4exam-transfer-"), "bank.jsonl" + ("" if args.no_gzip else ".gz"))
+    with Session(source) as session, open(path, "wb") as out:
+        start = time.perf_counter()
+        for chunk in services.iter_jsonl_export(session, compress=not args.no_gzip):
+            out.write(chunk)
+    print(f"export: {time.perf_counter() - start:.1f} s, {os.path.getsize(path):,} bytes (peak RSS {peak_rss_mb():.0f} MB)")
+
+    target = make_engine()
+    with Session(target) as session, open(path, "rb") as source_file:
+        start = time.perf_counter()
+        summary = services.import_jsonl(session, services.open_jsonl(source_file))
+    print(f"import: {time.perf_counter() - start:.1f} s, {summary.questions:,} questions, "
+          f"{summary.results:,} results (peak RSS {peak_rss_mb():.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
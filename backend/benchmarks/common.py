@@ -0,0 +1,158 @@
+# benchmarks/common.py
+#
+# 基准测试脚本共用的工具：建立独立的 SQLite 数据库、批量造数和计时。
+
+import os
+import sys
+import logging
+import time
+import random
+import tempfile
+import datetime
+import statistics
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+# 避免导入 main 时在工作目录下创建 test.db
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import get_db
+
+
+def make_engine():
+    """在临时目录中创建一个文件型 SQLite 数据库（比内存库更接近真实部署）。"""
+    path = os.path.join(tempfile.mkdtemp(prefix="ai4exam-bench-"), "bench.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def make_questions(count, rng):
+    """生成混合题型的题目数据，格式与 AI 返回的 questions 一致。"""
+    types = ["single_choice", "multiple_choice", "fill_in_the_blank", "essay"]
+    questions = []
+    for i in range(count):
+        q_type = types[i % len(types)]
+        stem = f"第{i + 1}题：关于循环结构的描述，" + "下列说法正确的是" * rng.randint(1, 4)
+        if q_type == "single_choice":
+            answer = {"index": rng.randrange(4), "explanation": "解析" * 20}
+        elif q_type == "multiple_choice":
+            answer = {"indexes": sorted(rng.sample(range(4), 2)), "explanation": "解析" * 20}
+        elif q_type == "fill_in_the_blank":
+            answer = {"texts": ["for", "while"], "explanation": "解析" * 20}
+        else:
+            answer = {"reference_explanation": "参考答案" * 30}
+        questions.append({
+            "type": q_type,
+            "stem": stem,
+            "options": [f"选项{j}" * 5 for j in range(4)] if "choice" in q_type else None,
+            "answer": answer,
+        })
+    return questions
+
+
+def make_user_answers(paper, rng):
+    """为试卷随机作答，返回可直接存入 TestPaperResult.user_answers 的字典列表。"""
+    answers = []
+    for q in paper.questions:
+        answer = {"question_id": str(q.id), "question_type": q.question_type,
+                  "answer_index": None, "answer_indices": None, "answer_texts": None, "answer_text": None}
+        if q.question_type == "single_choice":
+            answer["answer_index"] = rng.randrange(4)
+        elif q.question_type == "multiple_choice":
+            answer["answer_indices"] = sorted(rng.sample(range(4), rng.randint(1, 3)))
+        elif q.question_type == "fill_in_the_blank":
+            answer["answer_texts"] = [rng.choice(["for", "while", "do"]), rng.choice(["for", "while"])]
+        else:
+            answer["answer_text"] = "我的作答" * rng.randint(10, 50)
+        answers.append(answer)
+    return answers
+
+
+def seed_paper(session, question_count, rng, name="基准测试试卷"):
+    questions = make_questions(question_count, rng)
+    paper = models.TestPaper(
+        name=name,
+        source_content="知识源文本" * 200,
+        config={"description": "bench", "question_config": [], "difficulty": "中等"},
+        total_objective_questions=sum(1 for q in questions if q["type"] != "essay"),
+        total_essay_questions=sum(1 for q in questions if q["type"] == "essay"),
+    )
+    session.add(paper)
+    for q in questions:
+        session.add(models.DBQuestion(test_paper=paper, question_type=q["type"], stem=q["stem"],
+                                      options=q["options"], correct_answer=q["answer"]))
+    session.commit()
+    return paper
+
+
+def seed_results(session, paper, count, rng, feedback_chars=400):
+    """为试卷批量写入提交记录，JSON 字段大小与真实记录相近。"""
+    from sqlalchemy import insert
+    from services import grading, insert_question_feedbacks
+    import schemas
+
+    start = datetime.datetime(2025, 1, 1)
+    rows = []
+    for i in range(count):
+        answers = make_user_answers(paper, rng)
+        grading_results = []
+        correct = 0
+        for q, a in zip(paper.questions, answers):
+            if q.question_type == "essay":
+                grading_results.append({"question_id": str(q.id), "reference_explanation": "参考答案" * 30})
+                continue
+            is_correct = grading.grade_objective_question(q, schemas.UserAnswer(**a))
+            correct += is_correct
+            grading_results.append({"question_id": str(q.id), "is_correct": is_correct})
+        rows.append({
+            "test_paper_id": paper.id,
+            "user_answers": answers,
+            "grading_results": grading_results,
+            "correct_objective_questions": correct,
+            "overall_feedback": "整体反馈" * (feedback_chars // 4),
+            "question_feedbacks": {str(q.id): "单题反馈" * (feedback_chars // 4) for q in paper.questions[:5]},
+            "created_at": start + datetime.timedelta(minutes=i),
+        })
+    feedbacks = [row.pop("question_feedbacks") for row in rows]
+    ids = session.scalars(insert(models.TestPaperResult).returning(models.TestPaperResult.id, sort_by_parameter_order=True), rows).all()
+    insert_question_feedbacks(session, dict(zip(ids, feedbacks)))
+    session.commit()
+
+
+def make_client(engine):
+    """返回使用给定数据库的 TestClient。"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return TestClient(app)
+
+
+def timed(func, repeat=5):
+    """运行 func 多次，返回 (中位耗时秒数, 最后一次返回值)。"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations), result
+
+
+def rng(seed=42):
+    return random.Random(seed)
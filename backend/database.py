@@ -1,14 +1,38 @@
+import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 # 数据库连接可以保留在这里，或者移动到单独的 database.py 文件
-DATABASE_URL = "sqlite:///./test.db" # 使用相对路径更具可移植性
+# 可通过环境变量 DATABASE_URL 覆盖（例如测试时使用内存数据库）
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db") # 使用相对路径更具可移植性
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 启动时如何准备数据库结构：
+# - create: 创建缺少的表（开发默认，不会修改已有的表）
+# - migrate: 执行 alembic upgrade head
+# - off: 不做任何操作，由部署流程单独执行 `alembic upgrade head`（冷启动最快）
+DB_SCHEMA_MODE = os.getenv("DB_SCHEMA_MODE", "create")
+
+def init_db(mode: str = None):
+    mode = mode or DB_SCHEMA_MODE
+    if mode == "create":
+        from models import Base
+        Base.metadata.create_all(bind=engine)
+    elif mode == "migrate":
+        from alembic import command
+        from alembic.config import Config
+        # 不读取 alembic.ini：其中的日志配置会覆盖应用的日志设置，数据库地址也以 DATABASE_URL 为准
+        config = Config()
+        config.set_main_option("script_location", os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic"))
+        config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+        command.upgrade(config, "head")
+    elif mode != "off":
+        raise ValueError(f"Unknown DB_SCHEMA_MODE: {mode}")
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
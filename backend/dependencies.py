@@ -3,7 +3,6 @@
 import os
 import logging
 from typing import Optional
-import google.generativeai as genai
 from fastapi import Header, HTTPException
 
 # 配置日志记录
@@ -19,6 +18,7 @@ def configure_genai(api_key: str, provider: str):
     try:
         # 只有当提供商是 'google' 时才配置 genai
         if provider == 'google':
+            import google.generativeai as genai  # 按需导入，见 services/ai.py
             genai.configure(api_key=api_key)
         # 对于其他提供商，我们不需要在这里配置，因为它们会在 services/ai.py 中的 get_llm_client 函数中被配置
     except Exception as e:
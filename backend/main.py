@@ -1,31 +1,88 @@
 # main.py
 
-import uvicorn
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-# 從 models 導入資料庫相關設定
-from models import Base
-from database import engine
+from database import engine, init_db
+import services
 # 從 routers 導入所有路由器模組
-from routers import tests, grading, history, utils, history_test_papers, export
+from routers import tests, grading, history, utils, history_test_papers, export, search, transfer
 
 # --- App and Configuration Setup ---
 
-# 在應用啟動時創建資料庫表
-Base.metadata.create_all(bind=engine)
-
 # 配置日誌記錄
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 每個 worker 進程各自執行一次：進程內的緩存、客戶端和進程池都屬於單個 worker，在這裡建立和釋放
+    services.reset_drain()
+    # 數據庫結構在啟動時準備（見 database.DB_SCHEMA_MODE），導入 main 本身不再訪問數據庫
+    init_db()
+    # 預熱在後台線程中進行，不推遲開始接受請求
+    warmup = asyncio.create_task(asyncio.to_thread(services.warm_up_llm_clients)) if services.LLM_WARMUP_PROVIDERS else None
+    yield
+    if warmup:
+        warmup.cancel()
+    await services.cancel_speculations()
+    await services.close_llm_clients()
+    services.shutdown_extraction_pool()
+    engine.dispose()
+
+class RejectWhileDraining:
+    """排空期間新到的請求（例如 keep-alive 連接上的下一個請求）直接返回 503，進行中的請求不受影響。"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and services.is_draining():
+            response = PlainTextResponse("Server is shutting down", status_code=503,
+                                         headers={"Retry-After": "1", "Connection": "close"})
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+class RequestDeadline:
+    """讀取 X-Request-Timeout 請求頭，為本次請求中的 LLM 調用設置截止時間（見 services.deadlines）。"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = services.DEADLINE_HEADER.lower().encode()
+        value = next((v.decode("latin-1") for k, v in scope["headers"] if k == header), None)
+        try:
+            seconds = services.parse_request_timeout(value)
+        except ValueError:
+            response = ORJSONResponse({"detail": f"Invalid {services.DEADLINE_HEADER} header."}, status_code=400)
+            await response(scope, receive, send)
+            return
+        token = services.set_request_deadline(seconds)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            services.reset_request_deadline(token)
+
 app = FastAPI(
     title="AI智能试卷助手 - 后端API",
     description="为AI智能试卷助手提供生成试卷、批改题目等功能的API服务。",
     version="1.0.0",
+    # 所有 JSON 響應默認使用 orjson 序列化
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+# 後添加的中介軟體在外層。CORS 最後添加，排空時的 503 和無效截止時間的 400 也帶上 CORS 頭，
+# 瀏覽器才能讀到狀態碼和 Retry-After，而不是報告跨域錯誤
+app.add_middleware(RequestDeadline)
+app.add_middleware(RejectWhileDraining)
 # 設定 CORS 中介軟體
 app.add_middleware(
     CORSMiddleware,
@@ -43,6 +100,8 @@ app.include_router(history.router, prefix="/history")
 app.include_router(history_test_papers.router, prefix="/history_test_papers")
 app.include_router(utils.router)
 app.include_router(export.router)
+app.include_router(search.router)
+app.include_router(transfer.router)
 
 @app.get("/", tags=["Root"])
 async def read_root():
@@ -52,6 +111,7 @@ async def read_root():
 
 # --- 啟動伺服器 ---
 if __name__ == "__main__":
-    # 使用 uvicorn 來運行 FastAPI 應用
+    import uvicorn
+    # 使用 uvicorn 來運行 FastAPI 應用（開發用，單進程）；生產環境請使用 `python server.py`
     # host="0.0.0.0" 使其可以在局域網內被訪問
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,158 @@
+# manage.py
+#
+# 后端维护命令行工具。
+# 用法: python manage.py <command> [options]，使用 python manage.py -h 查看所有命令。
+
+import argparse
+import logging
+import sys
+
+from fastapi import HTTPException
+
+from database import SessionLocal
+import services
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def rebuild_stats(args):
+    """从全部提交记录重建统计表。"""
+    db = SessionLocal()
+    try:
+        processed = services.rebuild_statistics(db, test_paper_id=args.paper_id, batch_size=args.batch_size)
+        db.commit()
+        logger.info(f"Rebuilt statistics from {processed} results.")
+    finally:
+        db.close()
+
+
+def export_jsonl(args):
+    """将全部试卷、题目与提交记录导出为 JSONL（可选 gzip）。"""
+    db = SessionLocal()
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    compress = args.gzip or args.output.endswith(".gz")
+    try:
+        for chunk in services.iter_jsonl_export(db, compress=compress):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+        db.close()
+
+
+def import_jsonl(args):
+    """从 JSONL（或 .jsonl.gz）导入数据，所有ID重新分配。"""
+    db = SessionLocal()
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    try:
+        summary = services.import_jsonl(db, services.open_jsonl(source), batch_size=args.batch_size, skip_invalid=args.skip_invalid)
+        logger.info(f"Imported {summary.papers} papers, {summary.questions} questions, {summary.results} results "
+                    f"({summary.skipped} invalid lines skipped).")
+    except HTTPException as e:
+        logger.error(e.detail)
+        sys.exit(1)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        db.close()
+
+
+def source_report(args):
+    """报告知识源去重与压缩节省的空间，可选删除不再被引用的知识源。"""
+    db = SessionLocal()
+    try:
+        if args.delete_orphans:
+            logger.info(f"Deleted {services.delete_orphan_source_blobs(db)} unreferenced source documents.")
+        report = services.source_storage_report(db)
+        percent = f" ({report.saved_bytes * 100 / report.referenced_bytes:.1f}%)" if report.referenced_bytes else ""
+        logger.info(f"{report.papers} papers reference {report.documents} unique source documents: "
+                    f"{report.referenced_bytes} bytes if stored inline, {report.unique_bytes} bytes deduplicated, "
+                    f"{report.stored_bytes} bytes compressed; saved {report.saved_bytes} bytes{percent}.")
+    finally:
+        db.close()
+
+
+def archive_results(args):
+    """分批把旧提交记录移入归档表，每批单独提交，可以随时中断后重新运行。"""
+    db = SessionLocal()
+    try:
+        archived = services.archive_old_results(
+            db,
+            older_than_days=args.older_than_days,
+            batch_size=args.batch_size,
+            max_batches=args.max_batches,
+            pause_seconds=args.pause,
+        )
+        hot, cold, stored = services.result_archive_counts(db)
+        logger.info(f"Archived {archived} results. {hot} results remain in the hot table; "
+                    f"{cold} archived results use {stored} bytes compressed.")
+    finally:
+        db.close()
+
+
+def purge_idempotency_keys(args):
+    """删除已过期的 Idempotency-Key 记录（过期的键在被重新使用时也会被替换）。"""
+    db = SessionLocal()
+    try:
+        logger.info(f"Deleted {services.purge_expired_idempotency_keys(db)} expired idempotency keys.")
+    finally:
+        db.close()
+
+
+def purge_essay_evaluations(args):
+    """删除超过保留期、不属于任何提交记录的论述题评估缓存。"""
+    db = SessionLocal()
+    try:
+        deleted = services.purge_cached_essay_evaluations(db, older_than_days=args.older_than_days)
+        logger.info(f"Deleted {deleted} cached essay evaluations.")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI4Exam 后端维护命令")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser("rebuild-stats", help="从提交记录全量重建试卷/题目统计表（用于回填）")
+    rebuild_parser.add_argument("--paper-id", type=int, default=None, help="只重建指定试卷的统计")
+    rebuild_parser.add_argument("--batch-size", type=int, default=500, help="每批读取的提交记录数")
+    rebuild_parser.set_defaults(func=rebuild_stats)
+
+    export_parser = subparsers.add_parser("export-jsonl", help="流式导出全部数据为 JSONL")
+    export_parser.add_argument("output", help="输出文件路径，- 表示标准输出；以 .gz 结尾时自动压缩")
+    export_parser.add_argument("--gzip", action="store_true", help="使用 gzip 压缩")
+    export_parser.set_defaults(func=export_jsonl)
+
+    import_parser = subparsers.add_parser("import-jsonl", help="从 JSONL 导入数据（自动识别 gzip）")
+    import_parser.add_argument("input", help="输入文件路径，- 表示标准输入")
+    import_parser.add_argument("--batch-size", type=int, default=None, help="每批插入的行数")
+    import_parser.add_argument("--skip-invalid", action="store_true", help="跳过校验失败的行而不是中止导入")
+    import_parser.set_defaults(func=import_jsonl)
+
+    report_parser = subparsers.add_parser("source-report", help="统计知识源去重与压缩节省的空间")
+    report_parser.add_argument("--delete-orphans", action="store_true", help="先删除不再被任何试卷引用的知识源")
+    report_parser.set_defaults(func=source_report)
+
+    archive_parser = subparsers.add_parser("archive-results", help="把旧提交记录分批移入压缩归档表")
+    archive_parser.add_argument("--older-than-days", type=int, default=None,
+                                help=f"归档创建超过多少天的记录（默认 {services.RESULT_ARCHIVE_AFTER_DAYS}）")
+    archive_parser.add_argument("--batch-size", type=int, default=None, help="每批移动的记录数（每批一个事务）")
+    archive_parser.add_argument("--max-batches", type=int, default=None, help="最多执行的批次数，不指定时处理全部")
+    archive_parser.add_argument("--pause", type=float, default=0.0, help="批次之间暂停的秒数，让在线写入获得锁")
+    archive_parser.set_defaults(func=archive_results)
+
+    purge_parser = subparsers.add_parser("purge-idempotency-keys", help="删除已过期的 Idempotency-Key 及其保存的响应")
+    purge_parser.set_defaults(func=purge_idempotency_keys)
+
+    essay_parser = subparsers.add_parser("purge-essay-evaluations", help="删除过期的、不属于任何提交记录的论述题评估缓存")
+    essay_parser.add_argument("--older-than-days", type=int, default=None,
+                              help=f"删除创建超过多少天的缓存（默认 {services.ESSAY_EVALUATION_CACHE_TTL_DAYS}）")
+    essay_parser.set_defaults(func=purge_essay_evaluations)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
+import zlib
+import hashlib
 import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, ForeignKey, DateTime, JSON
-from sqlalchemy.orm import relationship, sessionmaker, declarative_base
+import orjson
+from sqlalchemy import create_engine, Column, Integer, String, Text, ForeignKey, DateTime, JSON, Index, LargeBinary, UniqueConstraint, event, func, inspect, insert, literal_column, select
+from sqlalchemy.orm import relationship, sessionmaker, declarative_base, Session
+
+try:
+    import zstandard
+except ImportError:  # 未安装 zstandard 时使用 zlib 压缩，已有的 zstd 数据仍需要安装后才能读取
+    zstandard = None
 
 Base = declarative_base()
 
@@ -11,12 +19,41 @@ class TestPaper(Base):
     total_objective_questions = Column(Integer, default=0)  # 客观题总数
     total_essay_questions = Column(Integer, default=0)  # 主观题总数
 
-    source_content = Column(Text)
+    source_hash = Column(String(64), ForeignKey('source_blobs.hash'), nullable=True, index=True)  # 知识源原文保存在 source_blobs 中
     config = Column(JSON) # 保存生成配置
     generation_prompt = Column(Text, nullable=True) # 保存生成提示
+    version = Column(Integer, nullable=False, default=1, server_default='1')  # 题目每次重新生成时递增，用作缓存版本号
+    content_hash = Column(String(64), nullable=True, index=True)  # (知识源, 配置, 提示, 模型) 的哈希，生成题目后写入，用于复用生成结果
     created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
     questions = relationship('DBQuestion', back_populates='test_paper', cascade="all, delete-orphan")
     results = relationship('TestPaperResult', back_populates='test_paper', cascade="all, delete-orphan")
+    source_blob = relationship('SourceBlob', lazy='select')
+
+    __table_args__ = (
+        # 试卷库按名称排序分页时使用 (coalesce(name, ''), id) 作为键集
+        Index('ix_test_papers_name_sort', func.coalesce(name, ''), id),
+    )
+
+    @property
+    def source_content(self):
+        """知识源原文。只有访问时才加载并解压对应的 source_blobs 行。"""
+        pending = getattr(self, '_pending_source', None)
+        if pending is not None:
+            return pending
+        if self.source_hash is None or self.source_blob is None:
+            return None
+        return decompress_source(self.source_blob.codec, self.source_blob.data)
+
+    @source_content.setter
+    def source_content(self, text):
+        # 原文在 flush 前写入 source_blobs（见 _store_pending_sources），相同内容只保存一份
+        self._pending_source = text
+        self.source_hash = source_hash(text) if text is not None else None
+
+
+# 按名称排序分页时的排序列。'' 必须以字面量写入 SQL：写成绑定参数时 SQLite 无法匹配 ix_test_papers_name_sort 的表达式
+TEST_PAPER_NAME_SORT = func.coalesce(TestPaper.name, literal_column("''"))
+
 
 class TestPaperResult(Base):
     __tablename__ = 'test_paper_results'
@@ -26,17 +63,323 @@ class TestPaperResult(Base):
     grading_results = Column(JSON) # Store grading results
     correct_objective_questions = Column(Integer, nullable=False, default=0)  # 客观题正确数
     overall_feedback = Column(Text, nullable=True) # Store overall AI feedback
-    question_feedbacks = Column(JSON, nullable=True) # Store individual question AI feedbacks
     created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
     test_paper = relationship('TestPaper', back_populates='results')
+    # 单题反馈每题一行（question_feedback 表），生成一题的反馈不再重写其他题的反馈
+    feedback_entries = relationship('QuestionFeedback', cascade='all, delete-orphan', order_by='QuestionFeedback.question_id')
+    # 论述题的 AI 评估每题一行（essay_evaluations 表），查看记录时直接读取，不再重新调用 LLM
+    evaluation_entries = relationship('EssayEvaluation', cascade='all, delete-orphan', order_by='EssayEvaluation.question_id')
+
+    __table_args__ = (
+        # 按试卷统计/删除提交记录，以及按试卷查看最近提交时使用
+        Index('ix_test_paper_results_test_paper_id_created_at', test_paper_id, created_at),
+        # SQLite 默认会把 max(id)+1 分配给新行，删除最新的提交后会重用已归档的ID；AUTOINCREMENT 保证ID从不重用
+        {'sqlite_autoincrement': True},
+    )
+
+    @property
+    def question_feedbacks(self):
+        """{题目ID字符串: 反馈} 形式的单题反馈（与原来的 JSON 列相同），没有反馈时为 None。"""
+        return {str(entry.question_id): entry.text for entry in self.feedback_entries} or None
+
+    @question_feedbacks.setter
+    def question_feedbacks(self, feedbacks):
+        # 原地更新已有的行，避免同一 (result_id, question_id) 先插入后删除而违反唯一约束
+        existing = {entry.question_id: entry for entry in self.feedback_entries}
+        entries = []
+        for question_id, text in (feedbacks or {}).items():
+            entry = existing.get(int(question_id)) or QuestionFeedback(question_id=int(question_id))
+            entry.text = text
+            entries.append(entry)
+        self.feedback_entries = entries
+
+    @property
+    def essay_evaluations(self):
+        """{题目ID字符串: 评估结果字典} 形式的论述题评估，没有评估时为 None。"""
+        return {str(entry.question_id): entry.as_dict() for entry in self.evaluation_entries} or None
+
+    @essay_evaluations.setter
+    def essay_evaluations(self, evaluations):
+        existing = {entry.question_id: entry for entry in self.evaluation_entries}
+        entries = []
+        for question_id, evaluation in (evaluations or {}).items():
+            entry = existing.get(int(question_id)) or EssayEvaluation(question_id=int(question_id))
+            for name in EssayEvaluation.STORED_FIELDS:
+                setattr(entry, name, evaluation.get(name))
+            entries.append(entry)
+        self.evaluation_entries = entries
+
+class QuestionFeedback(Base):
+    __tablename__ = 'question_feedback'
+    id = Column(Integer, primary_key=True)
+    result_id = Column(Integer, ForeignKey('test_paper_results.id', ondelete='CASCADE'), nullable=False)
+    question_id = Column(Integer, nullable=False)  # 不设外键：试卷重新生成后旧题目会被删除，反馈仍然保留
+    text = Column(Text, nullable=False)
+    model = Column(String(128), nullable=True)  # 生成反馈使用的模型
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        # 同一提交的同一题只有一条反馈，重新生成时覆盖（upsert）；也用于按提交查找
+        UniqueConstraint('result_id', 'question_id', name='uq_question_feedback_result_id_question_id'),
+    )
+
+class EssayEvaluation(Base):
+    __tablename__ = 'essay_evaluations'
+    id = Column(Integer, primary_key=True)
+    # 为空时是不属于任何提交的评估，只作为缓存
+    result_id = Column(Integer, ForeignKey('test_paper_results.id', ondelete='CASCADE'), nullable=True)
+    question_id = Column(Integer, nullable=True)
+    # (题干, 参考答案, 规范化后的作答, 模型, 提示词) 的 SHA-256，内容相同的作答直接复用已有的评估
+    cache_key = Column(String(64), nullable=False, index=True)
+    score = Column(Integer, nullable=False)
+    feedback = Column(Text, nullable=False)
+    strengths = Column(JSON)
+    areas_for_improvement = Column(JSON)
+    model = Column(String(128), nullable=True)  # 评估使用的模型
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    # 归档、恢复与复用缓存时一起复制的字段
+    STORED_FIELDS = ('cache_key', 'score', 'feedback', 'strengths', 'areas_for_improvement', 'model')
+
+    __table_args__ = (
+        UniqueConstraint('result_id', 'question_id', name='uq_essay_evaluations_result_id_question_id'),
+    )
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.STORED_FIELDS}
 
 
 class DBQuestion(Base):
     __tablename__ = 'questions'
     id = Column(Integer, primary_key=True, index=True)
-    test_paper_id = Column(Integer, ForeignKey('test_papers.id'))
+    test_paper_id = Column(Integer, ForeignKey('test_papers.id'), index=True)
     question_type = Column(String(50))
     stem = Column(Text)
     options = Column(JSON)
     correct_answer = Column(JSON)
-    test_paper = relationship('TestPaper', back_populates='questions')
\ No newline at end of file
+    test_paper = relationship('TestPaper', back_populates='questions')
+
+    __table_args__ = (
+        # 查重索引按ID水位线增量同步，ID 被重用的题目会被漏掉；AUTOINCREMENT 保证删除后ID不再分配
+        {'sqlite_autoincrement': True},
+    )
+
+
+# --- Content-Addressed Source Documents ---
+# 知识源原文按内容哈希去重、压缩后单独存放，test_papers 只保存哈希，扫描试卷表时不再读取大字段。
+
+SOURCE_ZSTD_LEVEL = 10
+SOURCE_ZLIB_LEVEL = 9
+
+class SourceBlob(Base):
+    __tablename__ = 'source_blobs'
+    hash = Column(String(64), primary_key=True)  # 原文 UTF-8 编码的 SHA-256
+    codec = Column(String(16), nullable=False)  # 'zstd' 或 'zlib'
+    size = Column(Integer, nullable=False)  # 原文字节数
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def compress_bytes(raw: bytes, zstd_level: int = SOURCE_ZSTD_LEVEL, zlib_level: int = SOURCE_ZLIB_LEVEL):
+    """返回 (codec, 压缩后的字节)。"""
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=zstd_level).compress(raw)
+    return 'zlib', zlib.compress(raw, zlib_level)
+
+def decompress_bytes(codec: str, data: bytes) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("data is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+def compress_source(text: str):
+    return compress_bytes(text.encode('utf-8'))
+
+def decompress_source(codec: str, data: bytes) -> str:
+    return decompress_bytes(codec, data).decode('utf-8')
+
+def store_source_blobs(connection, texts) -> int:
+    """
+    保存尚不存在的原文（已存在的哈希不会重新压缩），返回新写入的行数。
+    并发写入同一内容时依靠 ON CONFLICT DO NOTHING 保持幂等。
+    """
+    texts = {source_hash(text): text for text in texts if text is not None}
+    if not texts:
+        return 0
+    existing = set(connection.execute(select(SourceBlob.hash).where(SourceBlob.hash.in_(list(texts)))).scalars())
+    rows = []
+    for digest, text in texts.items():
+        if digest in existing:
+            continue
+        codec, data = compress_source(text)
+        rows.append({'hash': digest, 'codec': codec, 'size': len(text.encode('utf-8')), 'data': data, 'created_at': datetime.datetime.utcnow()})
+    if not rows:
+        return 0
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        connection.execute(insert(SourceBlob), rows)
+        return len(rows)
+    connection.execute(dialect_insert(SourceBlob).on_conflict_do_nothing(index_elements=['hash']), rows)
+    return len(rows)
+
+@event.listens_for(Session, 'before_flush')
+def _store_pending_sources(session, flush_context, instances):
+    texts = [
+        obj._pending_source for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, TestPaper) and getattr(obj, '_pending_source', None) is not None
+    ]
+    if texts:
+        store_source_blobs(session.connection(), texts)
+
+
+
+# --- Archived Results ---
+# 超过一定时间的提交记录分批移入归档表（`python manage.py archive-results`），热表保持较小。
+# 归档行沿用原来的ID；列表需要的字段保持为普通列，其余 JSON 字段合并压缩为一个 payload。
+
+ARCHIVE_ZSTD_LEVEL = 6
+ARCHIVE_PAYLOAD_FIELDS = ('user_answers', 'grading_results', 'overall_feedback', 'question_feedbacks', 'essay_evaluations')
+
+class ArchivedTestPaperResult(Base):
+    __tablename__ = 'test_paper_results_archive'
+    id = Column(Integer, primary_key=True, autoincrement=False)  # 与归档前 test_paper_results 中的ID相同
+    test_paper_id = Column(Integer, ForeignKey('test_papers.id'))
+    correct_objective_questions = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, index=True)
+    archived_at = Column(DateTime, default=datetime.datetime.utcnow)
+    codec = Column(String(16), nullable=False)
+    payload = Column(LargeBinary, nullable=False)  # ARCHIVE_PAYLOAD_FIELDS 组成的 JSON 对象，压缩保存
+    test_paper = relationship('TestPaper', viewonly=True)
+
+    __table_args__ = (
+        Index('ix_test_paper_results_archive_test_paper_id_created_at', test_paper_id, created_at),
+    )
+
+    @staticmethod
+    def pack(encoded_fields) -> tuple:
+        """
+        把已编码为 JSON 文本的 ARCHIVE_PAYLOAD_FIELDS 拼接成一个 JSON 对象并压缩，返回 (codec, payload)。
+        直接拼接数据库中已有的 JSON 文本，省去解析后再序列化。
+        """
+        parts = [b'"%s":%s' % (name.encode(), encoded_fields.get(name) or b'null') for name in ARCHIVE_PAYLOAD_FIELDS]
+        return compress_bytes(b'{' + b','.join(parts) + b'}', zstd_level=ARCHIVE_ZSTD_LEVEL)
+
+    def unpack(self) -> dict:
+        return orjson.loads(decompress_bytes(self.codec, self.payload))
+
+# --- Incrementally Maintained Statistics ---
+# 以下统计表在批改保存与删除提交记录时增量更新，可通过 `python manage.py rebuild-stats` 全量重建。
+
+class PaperStatistics(Base):
+    __tablename__ = 'paper_statistics'
+    test_paper_id = Column(Integer, ForeignKey('test_papers.id'), primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)  # 提交次数
+    correct_objective_sum = Column(Integer, nullable=False, default=0)  # 所有提交的客观题正确数之和
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class QuestionStatistics(Base):
+    __tablename__ = 'question_statistics'
+    question_id = Column(Integer, ForeignKey('questions.id'), primary_key=True)
+    test_paper_id = Column(Integer, ForeignKey('test_papers.id'), index=True)
+    attempts = Column(Integer, nullable=False, default=0)  # 作答次数（仅客观题）
+    correct_count = Column(Integer, nullable=False, default=0)
+
+class QuestionOptionStatistics(Base):
+    __tablename__ = 'question_option_statistics'
+    question_id = Column(Integer, ForeignKey('questions.id'), primary_key=True)
+    option_index = Column(Integer, primary_key=True)
+    test_paper_id = Column(Integer, ForeignKey('test_papers.id'), index=True)
+    pick_count = Column(Integer, nullable=False, default=0)  # 选择该选项的次数
+
+
+# --- Idempotency Keys ---
+# 客户端带 Idempotency-Key 头重试生成或批改请求时，返回第一次请求保存的响应而不是重新执行。
+
+class IdempotencyKey(Base):
+    __tablename__ = 'idempotency_keys'
+    scope = Column(String(64), primary_key=True)  # 接口名，例如 'grade-questions'；不同接口的同名键互不影响
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # 请求内容的 SHA-256，同一个键用于不同请求时拒绝
+    status_code = Column(Integer)  # 为空表示请求仍在执行
+    response = Column(LargeBinary)  # 响应的 JSON
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+# --- Full-Text Search Index ---
+# SQLite 使用 FTS5 (trigram 分词，可匹配中文子串)，由触发器与主表保持同步；
+# PostgreSQL 使用生成的 tsvector 列 + GIN 索引。二者均在 create_all 后自动建立。
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS test_papers_fts USING fts5(name, tokenize='trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(stem, options, tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS test_papers_fts_ai AFTER INSERT ON test_papers BEGIN
+        INSERT INTO test_papers_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS test_papers_fts_ad AFTER DELETE ON test_papers BEGIN
+        DELETE FROM test_papers_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS test_papers_fts_au AFTER UPDATE OF name ON test_papers BEGIN
+        DELETE FROM test_papers_fts WHERE rowid = old.id;
+        INSERT INTO test_papers_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+    # options 以 JSON 存储（中文会被转义为 \uXXXX），索引前先用 json_each 还原为纯文本
+    """CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+        INSERT INTO questions_fts(rowid, stem, options) VALUES (
+            new.id, new.stem,
+            CASE WHEN json_valid(new.options) THEN (SELECT group_concat(value, ' ') FROM json_each(new.options)) END
+        );
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+        DELETE FROM questions_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE OF stem, options ON questions BEGIN
+        DELETE FROM questions_fts WHERE rowid = old.id;
+        INSERT INTO questions_fts(rowid, stem, options) VALUES (
+            new.id, new.stem,
+            CASE WHEN json_valid(new.options) THEN (SELECT group_concat(value, ' ') FROM json_each(new.options)) END
+        );
+    END""",
+]
+
+# 首次建立索引时回填已有数据
+SQLITE_SEARCH_BACKFILL = [
+    "INSERT INTO test_papers_fts(rowid, name) SELECT id, name FROM test_papers",
+    """INSERT INTO questions_fts(rowid, stem, options)
+        SELECT id, stem, CASE WHEN json_valid(options) THEN (SELECT group_concat(value, ' ') FROM json_each(questions.options)) END
+        FROM questions""",
+]
+
+POSTGRES_SEARCH_DDL = [
+    """ALTER TABLE test_papers ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', coalesce(name, ''))) STORED""",
+    """ALTER TABLE questions ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', coalesce(stem, '') || ' ' || coalesce(options::jsonb::text, ''))) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_test_papers_search_vector ON test_papers USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_questions_search_vector ON questions USING GIN (search_vector)",
+]
+
+def create_search_index(connection):
+    """建立全文索引（幂等）。SQLite 下首次建立时会回填已有数据。"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        is_new = not inspect(connection).has_table('test_papers_fts')
+        for statement in SQLITE_SEARCH_DDL:
+            connection.exec_driver_sql(statement)
+        if is_new:
+            for statement in SQLITE_SEARCH_BACKFILL:
+                connection.exec_driver_sql(statement)
+    elif dialect == 'postgresql':
+        for statement in POSTGRES_SEARCH_DDL:
+            connection.exec_driver_sql(statement)
+
+@event.listens_for(Base.metadata, 'after_create')
+def _create_search_index_after_create(target, connection, **kw):
+    create_search_index(connection)
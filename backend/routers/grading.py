@@ -2,7 +2,7 @@
 
 import urllib.parse
 from typing import Optional
-from fastapi import APIRouter, Depends, Header
+from fastapi import APIRouter, Depends, File, Form, Header, UploadFile
 from sqlalchemy.orm import Session
 
 import services
@@ -19,16 +19,48 @@ async def grade_questions(
     request: schemas.GradeQuestionsRequest, 
     db: Session = Depends(get_db),
     provider: str = Header(..., alias="X-Provider"),
-    api_key: str = Header(..., alias="X-Api-Key")
+    api_key: str = Header(..., alias="X-Api-Key"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", description="客戶端重試時攜帶相同的鍵，返回第一次提交的結果而不是再保存一份。"),
+    speculative_feedback: bool = Header(False, alias="X-Speculative-Feedback", description="批改後在後台預生成總體反饋，之後的 /generate-overall-feedback 直接返回或等待它。"),
+    evaluation_model: Optional[str] = Header(None, alias="X-Evaluation-Model"),
+    overall_feedback_prompt: Optional[str] = Header(None, alias="X-Overall-Feedback-Prompt")
 ):
     configure_genai(api_key=api_key, provider=provider)
-    db_result, grading_results = await services.grade_and_save_test(
-        db=db,
-        request=request,
-        provider=provider,
-        api_key=api_key
-    )
-    return schemas.GradeQuestionsResponse(result_id=db_result.id, results=grading_results)
+
+    async def grade():
+        db_result, grading_results = await services.grade_and_save_test(
+            db=db,
+            request=request,
+            provider=provider,
+            api_key=api_key
+        )
+        started = False
+        if speculative_feedback:
+            decoded_prompt = urllib.parse.unquote(overall_feedback_prompt) if overall_feedback_prompt else None
+            started = services.start_speculative_overall_feedback(db, db_result.id, request, provider, api_key, evaluation_model, decoded_prompt)
+        return schemas.GradeQuestionsResponse(result_id=db_result.id, results=grading_results, speculative_feedback=started)
+
+    fingerprint = services.request_fingerprint(request.model_dump(mode="json"), provider)
+    return await services.run_idempotent(db, "grade-questions", idempotency_key, fingerprint, grade)
+
+
+@router.post("/grade-questions/bulk", response_model=schemas.BulkGradeResponse)
+def grade_questions_bulk(request: schemas.BulkGradeRequest, db: Session = Depends(get_db)):
+    """一次批改同一份試卷的多份提交（只批改客觀題，不調用AI），全部在一個事務中寫入。"""
+    return services.grade_and_save_bulk(db, int(request.test_id), request.submissions)
+
+
+@router.post("/grade-questions/bulk/upload", response_model=schemas.BulkGradeResponse)
+def grade_questions_bulk_upload(
+    test_id: int = Form(...),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    """上傳 CSV（student_id,<題目ID>...）或 JSONL 文件進行批量批改，文件按行流式解析。"""
+    fmt = services.detect_upload_format(file.filename, file.content_type)
+    answer_key = services.get_answer_key(db, test_id)
+    submissions = services.parse_bulk_upload(file.file, fmt, answer_key.questions)
+    return services.grade_and_save_bulk(db, test_id, submissions)
 
 
 @router.post("/generate-overall-feedback", response_model=schemas.GenerateOverallFeedbackResponse)
@@ -62,11 +94,13 @@ async def generate_single_question_feedback(
 @router.post("/evaluate-short-answer", response_model=schemas.EvaluateShortAnswerResponse)
 async def evaluate_short_answer(
     request: schemas.EvaluateShortAnswerRequest, 
+    db: Session = Depends(get_db),
     provider: str = Header(..., alias="X-Provider"),
     api_key: str = Header(..., alias="X-Api-Key"),
     evaluation_model: Optional[str] = Header(None, alias="X-Evaluation-Model"),
     evaluation_prompt: Optional[str] = Header(None, alias="X-Evaluation-Prompt")
 ):
     decoded_prompt = urllib.parse.unquote(evaluation_prompt) if evaluation_prompt else None
-    response = await services.evaluate_essay_with_ai(request, provider, api_key, evaluation_model, decoded_prompt)
+    # 内容相同的作答复用已保存的评估；带 result_id/question_id 时保存到该提交记录下
+    response = await services.evaluate_and_save_short_answer(db, request, provider, api_key, evaluation_model, decoded_prompt)
     return response
\ No newline at end of file
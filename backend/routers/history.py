@@ -1,8 +1,8 @@
 # routers/history.py
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, contains_eager, selectinload
 
 import services
 import schemas
@@ -12,34 +12,63 @@ router = APIRouter(
     tags=["History"]
 )
 
-from models import TestPaper, TestPaperResult
+from models import TEST_PAPER_NAME_SORT, TestPaper, TestPaperResult
 
-@router.get("/", response_model=List[schemas.history.TestPaperResult])
+@router.get("/", response_model=schemas.TestPaperResultPage)
 def get_submission_history(
     search: str = None,
     sort_by: str = 'created_at',
     order: str = 'desc',
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor。"),
+    limit: int = Query(services.DEFAULT_PAGE_SIZE, ge=1, description=f"每页条数，最大 {services.MAX_PAGE_SIZE}。"),
+    include_total: bool = Query(False, description="是否额外计算符合条件的总数。"),
+    include_archived: bool = Query(False, description="是否同时返回已归档的旧提交记录。"),
     db: Session = Depends(get_db)
 ):
     """
-    从数据库中获取提交历史记录，支持搜索和排序。
-    **优化：此端点现在将搜索和排序逻辑直接下推到数据库执行，以提高性能。**
+    从数据库中获取提交历史记录，支持搜索、排序和基于游标的分页。
+    **优化：排序键为 (排序列, id)，翻页时通过键集条件定位，不再扫描和序列化全部记录。**
+    默认只查询热表；include_archived=true 时同时查询归档表。
     """
-    query = db.query(TestPaperResult).join(TestPaper, TestPaperResult.test_paper_id == TestPaper.id)
+    if include_archived:
+        results, next_cursor, total = services.get_test_results_with_archive(
+            db, search=search, sort_by=sort_by, order=order, cursor=cursor, limit=limit, include_total=include_total,
+        )
+        return schemas.TestPaperResultPage(items=_fill_defaults(results), next_cursor=next_cursor, total=total)
+
+    query = (
+        db.query(TestPaperResult)
+        .join(TestPaper, TestPaperResult.test_paper_id == TestPaper.id)
+        .options(contains_eager(TestPaperResult.test_paper), selectinload(TestPaperResult.feedback_entries),
+                 selectinload(TestPaperResult.evaluation_entries))
+    )
 
     # 搜索逻辑
     if search:
-        query = query.filter(TestPaper.name.ilike(f"%{search}%"))
+        query = query.filter(services.paper_name_filter(db, search))
 
     # 排序逻辑
-    sort_column = TestPaper.name if sort_by == 'name' else TestPaperResult.created_at
-    if order == 'desc':
-        query = query.order_by(sort_column.desc())
+    if sort_by == 'name':
+        sort_column = TEST_PAPER_NAME_SORT
+        sort_key = lambda r: r.test_paper.name or ''
     else:
-        query = query.order_by(sort_column.asc())
-
-    results = query.all()
-
+        sort_column = TestPaperResult.created_at
+        sort_key = lambda r: r.created_at
+
+    results, next_cursor, total = services.paginate_keyset(
+        query,
+        sort_column=sort_column,
+        id_column=TestPaperResult.id,
+        sort_key=sort_key,
+        order=order,
+        cursor=cursor,
+        limit=limit,
+        include_total=include_total,
+    )
+    return schemas.TestPaperResultPage(items=_fill_defaults(results), next_cursor=next_cursor, total=total)
+
+
+def _fill_defaults(results):
     # 为旧数据中可能为None的题目数量字段提供默认值
     # 这一步仍然需要在应用层处理，因为数据库中的NULL值需要转换
     for result in results:
@@ -51,12 +80,41 @@ def get_submission_history(
                 result.test_paper.total_objective_questions = 0
             if result.test_paper.total_essay_questions is None:
                 result.test_paper.total_essay_questions = 0
-
     return results
 
 
+@router.get("/summary", response_model=schemas.TestPaperResultSummaryPage)
+def get_submission_history_summary(
+    search: str = None,
+    sort_by: str = 'created_at',
+    order: str = 'desc',
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor。"),
+    limit: int = Query(services.DEFAULT_PAGE_SIZE, ge=1, description=f"每页条数，最大 {services.MAX_PAGE_SIZE}。"),
+    include_total: bool = Query(False, description="是否额外计算符合条件的总数。"),
+    include_archived: bool = Query(False, description="是否同时返回已归档的旧提交记录。"),
+    db: Session = Depends(get_db)
+):
+    """
+    获取提交历史的轻量摘要（id、试卷名称、题目数量、得分与时间）。
+    只按列投影读取所需字段，不加载 user_answers / grading_results / question_feedbacks；
+    完整记录请通过 GET /history/{result_id} 按需获取。
+    """
+    items, next_cursor, total = services.get_test_result_summaries(
+        db,
+        search=search,
+        sort_by=sort_by,
+        order=order,
+        cursor=cursor,
+        limit=limit,
+        include_total=include_total,
+        include_archived=include_archived,
+    )
+    return schemas.TestPaperResultSummaryPage(items=items, next_cursor=next_cursor, total=total)
+
+
 @router.get("/{result_id}", response_model=schemas.TestPaperResult)
 def get_history_result(result_id: int, db: Session = Depends(get_db)):
+    """按ID获取完整的提交记录，已归档的记录同样可以直接获取。"""
     result = services.get_test_result(db, result_id)
     if not result:
         raise HTTPException(status_code=404, detail="Test result not found")
@@ -1,12 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, defer
-from typing import List, Optional
-from datetime import datetime
-
-from typing import List, Optional
-from datetime import datetime
-from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from typing import Optional
 
 import services
 import schemas
@@ -17,34 +12,41 @@ router = APIRouter(
     tags=["History Test Papers"]
 )
 
-@router.get("/", response_model=List[schemas.history.TestPaper])
+@router.get("/", response_model=schemas.TestPaperPage)
 def get_test_papers_history(
     search: Optional[str] = Query(None, description="Filters papers where the name contains the search term."),
     sort_by: Optional[str] = Query("created_at", description="The field to sort by.", enum=["name", "created_at"]),
     order: Optional[str] = Query("desc", description="The sort order.", enum=["asc", "desc"]),
+    cursor: Optional[str] = Query(None, description="The next_cursor returned by the previous page."),
+    limit: int = Query(services.DEFAULT_PAGE_SIZE, ge=1, description=f"Page size, capped at {services.MAX_PAGE_SIZE}."),
+    include_total: bool = Query(False, description="Also count all matching papers."),
     db: Session = Depends(get_db)
 ):
     """
-    Fetches a list of unique test paper templates.
+    Fetches a page of unique test paper templates using keyset pagination on (sort column, id).
     """
-    # Defer loading of source_content to avoid fetching large data
-    query = db.query(models.TestPaper).options(defer(models.TestPaper.source_content))
+    query = db.query(models.TestPaper)
 
     if search:
-        query = query.filter(models.TestPaper.name.contains(search))
+        query = query.filter(services.paper_name_filter(db, search))
 
     if sort_by == "name":
-        if order == "asc":
-            query = query.order_by(models.TestPaper.name.asc())
-        else:
-            query = query.order_by(models.TestPaper.name.desc())
-    elif sort_by == "created_at":
-        if order == "asc":
-            query = query.order_by(models.TestPaper.created_at.asc())
-        else:
-            query = query.order_by(models.TestPaper.created_at.desc())
-
-    test_papers = query.all()
+        sort_column = models.TEST_PAPER_NAME_SORT
+        sort_key = lambda p: p.name or ""
+    else:
+        sort_column = models.TestPaper.created_at
+        sort_key = lambda p: p.created_at
+
+    test_papers, next_cursor, total = services.paginate_keyset(
+        query,
+        sort_column=sort_column,
+        id_column=models.TestPaper.id,
+        sort_key=sort_key,
+        order=order,
+        cursor=cursor,
+        limit=limit,
+        include_total=include_total,
+    )
     # 为None的题目数量字段提供默认值
     for paper in test_papers:
         if paper.total_objective_questions is None:
@@ -52,7 +54,26 @@ def get_test_papers_history(
         if paper.total_essay_questions is None:
             paper.total_essay_questions = 0
 
-    return test_papers
+    return schemas.TestPaperPage(items=test_papers, next_cursor=next_cursor, total=total)
+
+
+@router.get("/{paper_id}/statistics", response_model=schemas.PaperStatisticsResponse)
+def get_test_paper_statistics(paper_id: int, db: Session = Depends(get_db)):
+    """
+    Returns attempts, mean score, per-question correct rates and per-option pick counts for a paper.
+    Reads the incrementally maintained statistics tables, so the cost depends on the number of
+    questions rather than the number of submissions.
+    """
+    return services.get_paper_statistics(db, paper_id)
+
+
+@router.get("/{paper_id}/item-analysis", response_model=schemas.ItemAnalysisResponse)
+def get_test_paper_item_analysis(paper_id: int, db: Session = Depends(get_db)):
+    """
+    Classical item statistics for a paper: difficulty, point-biserial and upper/lower discrimination,
+    distractor analysis and KR-20 reliability. Cached until a result is added or removed.
+    """
+    return services.get_item_analysis(db, paper_id)
 
 
 @router.delete("/{paper_id}", status_code=204)
@@ -62,8 +83,15 @@ def delete_test_paper_and_results(paper_id: int, db: Session = Depends(get_db)):
     if not paper:
         raise HTTPException(status_code=404, detail="Test paper not found")
 
-    # 删除所有相关的提交记录
+    # 删除所有相关的提交记录及统计数据
+    result_ids = select(models.TestPaperResult.id).where(models.TestPaperResult.test_paper_id == paper_id)
+    services.delete_question_feedbacks(db, result_ids)
+    services.delete_essay_evaluations(db, result_ids)
     db.query(models.TestPaperResult).filter(models.TestPaperResult.test_paper_id == paper_id).delete()
+    services.delete_archived_results(db, paper_id)
+    services.delete_paper_statistics(db, paper_id)
+    services.invalidate_answer_key(paper_id)
+    services.invalidate_paper_responses(paper_id)
 
     # 删除试卷本身
     db.delete(paper)
@@ -0,0 +1,34 @@
+# routers/search.py
+
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+import services
+import schemas
+from database import get_db
+
+router = APIRouter(
+    prefix="/search",
+    tags=["Search"]
+)
+
+@router.get("/", response_model=schemas.SearchResponse)
+def search_question_bank(
+    q: str = Query(..., min_length=1, description="搜索词，多个词以空格分隔（全部命中才返回）。"),
+    limit: int = Query(services.DEFAULT_PAGE_SIZE, ge=1, description=f"每页条数，最大 {services.MAX_PAGE_SIZE}。"),
+    offset: int = Query(0, ge=0, description="上一页返回的 next_offset。"),
+    db: Session = Depends(get_db)
+):
+    """在试卷名称、题干和选项中全文检索，返回按相关度排序并带高亮片段的试卷与题目。"""
+    return services.search_question_bank(db, q, limit=limit, offset=offset)
+
+@router.get("/duplicates", response_model=schemas.DuplicateClustersResponse)
+def list_duplicate_clusters(
+    threshold: float = Query(services.DUPLICATE_THRESHOLD, ge=0.0, le=1.0, description="估计相似度（Jaccard）达到该值的题目视为重复。"),
+    limit: int = Query(services.DEFAULT_PAGE_SIZE, ge=1, description=f"每页簇数，最大 {services.MAX_PAGE_SIZE}。"),
+    offset: int = Query(0, ge=0, description="上一页返回的 next_offset。"),
+    db: Session = Depends(get_db)
+):
+    """列出题库中的近似重复题目簇（题干 + 选项的 MinHash/LSH），按簇大小排序。"""
+    return services.find_duplicate_clusters(db, threshold=threshold, limit=limit, offset=offset)
@@ -3,8 +3,8 @@
 import urllib.parse
 from typing import Optional
 from fastapi.responses import StreamingResponse
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Header
-import json
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Header, Query
+import orjson
 from sqlalchemy.orm import Session
 
 import services
@@ -23,14 +23,18 @@ async def create_test_entry(
     source_text: Optional[str] = Form(None),
     config_json: str = Form(...),
     name: Optional[str] = Form(None), # 试卷名称
+    reuse: str = Form("off", pattern="^(off|serve|clone)$", description="off 总是新建；serve 返回已有的相同生成结果；clone 将其复制为新试卷。"),
+    force_fresh: bool = Form(False, description="忽略 reuse，强制新建。"),
     generation_model: Optional[str] = Header(None, alias="X-Generation-Model"),
     generation_prompt: Optional[str] = Header(None, alias="X-Generation-Prompt"),
 ):
+    # 与 /generate-test 一致：保存和计算内容哈希都使用解码后的提示，流式生成时直接使用保存的提示
+    decoded_prompt = urllib.parse.unquote(generation_prompt) if generation_prompt else None
     if not source_file and not source_text:
         raise HTTPException(status_code=400, detail="Either source_file or source_text must be provided.")
 
     config = schemas.GenerateTestConfig.model_validate_json(config_json)
-    file_content = (await source_file.read()).decode('utf-8') if source_file else ""
+    file_content = await services.extract_upload_text(source_file) if source_file else ""
     text_content = source_text if source_text else ""
     
     knowledge_content = ""
@@ -40,17 +44,25 @@ async def create_test_entry(
         knowledge_content += f"以下是用户输入内容：\n{text_content}\n"
     knowledge_content = knowledge_content.strip()
 
+    # 复用模式：相同知识源、配置、提示和模型已经生成过题目时，前端可以跳过流式生成直接加载试卷
+    if not force_fresh:
+        content_hash = services.generation_content_hash(knowledge_content, config, decoded_prompt, generation_model)
+        reused = services.reuse_test_paper(db, content_hash, reuse, name)
+        if reused:
+            paper, reused_from = reused
+            return {"test_id": paper.id, "reused_from": reused_from}
+
     # 在数据库中创建试卷记录，但不生成具体问题
     db_test_paper = services.create_test_paper(
         db=db, 
         name=name,
         source_content=knowledge_content, 
         config=config, 
-        generation_prompt=generation_prompt,
+        generation_prompt=decoded_prompt,
         ai_response=None  # We are not generating questions here
     )
 
-    return {"test_id": db_test_paper.id}
+    return {"test_id": db_test_paper.id, "reused_from": None}
 
 
 @router.post("/generate-test", response_model=schemas.GenerateTestResponse)
@@ -60,17 +72,20 @@ async def generate_test(
     source_text: Optional[str] = Form(None),
     config_json: str = Form(...),
     name: Optional[str] = Form(None),
+    reuse: str = Form("off", pattern="^(off|serve|clone)$", description="off 总是重新生成；serve 返回已有的相同生成结果；clone 将其复制为新试卷。"),
+    force_fresh: bool = Form(False, description="忽略 reuse，强制重新生成。"),
     provider: str = Header(..., alias="X-Provider"),
     api_key: str = Header(..., alias="X-Api-Key"),
     generation_model: Optional[str] = Header(None, alias="X-Generation-Model"),
-    generation_prompt: Optional[str] = Header(None, alias="X-Generation-Prompt")
+    generation_prompt: Optional[str] = Header(None, alias="X-Generation-Prompt"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", description="客户端重试时携带相同的键，返回第一次请求的结果而不是重新生成。"),
 ):
     decoded_prompt = urllib.parse.unquote(generation_prompt) if generation_prompt else None
     if not source_file and not source_text:
         raise HTTPException(status_code=400, detail="Either source_file or source_text must be provided.")
 
     config = schemas.GenerateTestConfig.model_validate_json(config_json)
-    file_content = (await source_file.read()).decode('utf-8') if source_file else ""
+    file_content = await services.extract_upload_text(source_file) if source_file else ""
     text_content = source_text if source_text else ""
     
     knowledge_content = ""
@@ -80,38 +95,56 @@ async def generate_test(
         knowledge_content += f"以下是用户输入内容：\n{text_content}\n"
     knowledge_content = knowledge_content.strip()
 
-    ai_response = await services.generate_test_from_ai(
-        knowledge_content=knowledge_content, 
-        config=config, 
-        provider=provider,
-        api_key=api_key,
-        generation_model=generation_model, 
-        generation_prompt=decoded_prompt
-    )
-    db_test_paper = services.create_test_paper(
-        db,
-        name=name,
-        source_content=knowledge_content,
-        config=config,  # [New] Pass config
-        generation_prompt=decoded_prompt,  # [New] Pass decoded_prompt
-        ai_response=ai_response
-    )
+    content_hash = services.generation_content_hash(knowledge_content, config, decoded_prompt, generation_model)
 
-    questions_data = [
-        schemas.QuestionModel(
-            id=str(q.id),
-            type=q.question_type,
-            stem=q.stem,
-            options=q.options,
-            answer=q.correct_answer
+    async def generate():
+        if not force_fresh:
+            reused = services.reuse_test_paper(db, content_hash, reuse, name)
+            if reused:
+                paper, reused_from = reused
+                return _generate_test_response(paper, reused_from)
+
+        ai_response = await services.generate_test_from_ai(
+            knowledge_content=knowledge_content, 
+            config=config, 
+            provider=provider,
+            api_key=api_key,
+            generation_model=generation_model, 
+            generation_prompt=decoded_prompt
+        )
+        db_test_paper = services.create_test_paper(
+            db,
+            name=name,
+            source_content=knowledge_content,
+            config=config,  # [New] Pass config
+            generation_prompt=decoded_prompt,  # [New] Pass decoded_prompt
+            ai_response=ai_response,
+            content_hash=content_hash
         )
-        for q in db_test_paper.questions
+        return _generate_test_response(db_test_paper)
+
+    # 内容哈希已覆盖知识源、配置、提示和模型
+    fingerprint = services.request_fingerprint(content_hash, name, reuse, force_fresh, provider)
+    return await services.run_idempotent(db, "generate-test", idempotency_key, fingerprint, generate)
+
+
+def _generate_test_response(test_paper, reused_from: Optional[int] = None) -> schemas.GenerateTestResponse:
+    questions_data = [
+        schemas.QuestionModelAdapter.validate_python({
+            'id': str(q.id),
+            'type': q.question_type,
+            'stem': q.stem,
+            'options': q.options,
+            'answer': q.correct_answer,
+        })
+        for q in test_paper.questions
     ]
 
     return schemas.GenerateTestResponse(
-        test_id=str(db_test_paper.id), 
-        name=db_test_paper.name, 
-        questions=questions_data
+        test_id=str(test_paper.id), 
+        name=test_paper.name, 
+        questions=questions_data,
+        reused_from=str(reused_from) if reused_from is not None else None
     )
 
 
@@ -121,9 +154,12 @@ async def generate_stream_test(
     db: Session = Depends(get_db),
     provider: str = Header(..., alias="X-Provider"),
     api_key: str = Header(..., alias="X-Api-Key"),
-    generation_model: str = Header(..., alias="X-Generation-Model")
+    generation_model: str = Header(..., alias="X-Generation-Model"),
+    duplicates: str = Query("keep", pattern="^(keep|flag|drop)$", description="与题库或本次已生成题目近似重复的题目：keep 不检查，flag 在题目中附带 duplicate_of，drop 丢弃并发送 duplicate 事件。"),
 ):
     print(f"Received generation_model: {generation_model}")
+    if services.is_draining():
+        raise HTTPException(status_code=503, detail="Server is shutting down, please retry.", headers={"Retry-After": "1"})
     db_test_paper = services.get_test_paper_by_id(db, test_id)
     if not db_test_paper:
         raise HTTPException(status_code=404, detail="Test paper not found")
@@ -141,45 +177,77 @@ async def generate_stream_test(
         generation_prompt=decoded_prompt
     )
 
+    duplicate_filter = services.StreamDuplicateFilter(db, test_paper_id=test_id) if duplicates != "keep" else None
+
     async def db_saving_stream_generator():
         # Initialize a structure to hold the complete test paper data for DB saving
         db_test_paper_data = {"title": "", "questions": []}
+        # 服务器关闭（排空）时在截止时间前结束，已生成的题目照常保存
+        chunks = services.DrainAwareStream(stream_generator)
+        # 模型超时停止输出时 AI 服务发送的 interrupted 事件，与排空一样在最后带上已保存的题目数
+        stalled = None
+        # 丢弃了重复题目的试卷不完整，不能复用给不丢弃重复题目的请求
+        dropped_duplicates = False
 
-        async for chunk in stream_generator:
+        async for chunk in chunks:
             if chunk.startswith('data:'):
                 data_str = chunk[len('data:'):].strip()
                 if data_str and data_str != '[DONE]':
                     try:
-                        json_data = json.loads(data_str)
+                        json_data = orjson.loads(data_str)
                         event_type = json_data.get('type')
                         content = json_data.get('content')
 
+                        if event_type == 'interrupted':
+                            stalled = content
+                            continue
                         if event_type == 'metadata' and content and 'title' in content:
                             db_test_paper_data['title'] = content['title']
                         elif event_type == 'question' and content:
-                            db_test_paper_data['questions'].append(content)
+                            matches = duplicate_filter.check(content) if duplicate_filter else []
+                            if matches and duplicates == "drop":
+                                chunk = _duplicate_event(content, matches)
+                                dropped_duplicates = True
+                            else:
+                                if matches:
+                                    content['duplicate_of'] = [m.model_dump(exclude_none=True) for m in matches]
+                                    chunk = f"data: {orjson.dumps(json_data).decode()}\n\n"
+                                if duplicate_filter:
+                                    duplicate_filter.accept(content)
+                                db_test_paper_data['questions'].append(content)
                         
-                    except json.JSONDecodeError:
+                    except orjson.JSONDecodeError:
                         pass
             yield chunk
+
+        interrupted = {'reason': 'server_shutdown'} if chunks.interrupted else stalled
+        if interrupted:
+            # 不完整的试卷不记录内容哈希，不会被当作相同输入的生成结果复用
+            payload = {'type': 'interrupted', 'content': {**interrupted, 'saved_questions': len(db_test_paper_data['questions'])}}
+            yield f"data: {orjson.dumps(payload).decode()}\n\n"
         
         # After the stream is finished, save the complete test paper to the database
         if db_test_paper_data['questions']:
-            services.update_test_paper(db, test_id=test_id, ai_response=db_test_paper_data)
+            content_hash = None if interrupted or dropped_duplicates else services.generation_content_hash(knowledge_content, config, decoded_prompt, generation_model)
+            services.update_test_paper(db, test_id=test_id, ai_response=db_test_paper_data, content_hash=content_hash)
     return StreamingResponse(db_saving_stream_generator(), media_type="text/event-stream")
 
 
-@router.get("/test-papers/{test_id}", response_model=schemas.GenerateTestResponse)
-async def get_test(test_id: int, db: Session = Depends(get_db)):
-    test_paper = services.get_test_paper_by_id(db, test_id)
+def _duplicate_event(question: dict, matches) -> str:
+    # 被丢弃的题目不保存、不作为 question 事件发送，只告知前端它与哪些题目重复
+    payload = {'type': 'duplicate', 'content': {'stem': question.get('stem'), 'duplicate_of': [m.model_dump(exclude_none=True) for m in matches]}}
+    return f"data: {orjson.dumps(payload).decode()}\n\n"
+
+
+def _render_test_paper_json(test_paper) -> bytes:
     questions_to_return = [
-        schemas.QuestionModel(
-            id=str(q.id),
-            type=q.question_type,
-            stem=q.stem,
-            options=q.options,
-            answer=q.correct_answer
-        )
+        schemas.QuestionModelAdapter.validate_python({
+            'id': str(q.id),
+            'type': q.question_type,
+            'stem': q.stem,
+            'options': q.options,
+            'answer': q.correct_answer,
+        })
         for q in test_paper.questions
     ]
 
@@ -187,4 +255,16 @@ async def get_test(test_id: int, db: Session = Depends(get_db)):
         test_id=str(test_paper.id), 
         name=test_paper.name, 
         questions=questions_to_return
+    ).model_dump_json().encode("utf-8")
+
+
+@router.get("/test-papers/{test_id}", response_model=schemas.GenerateTestResponse)
+def get_test(
+    test_id: int,
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
+):
+    # 考試期間大量學生同時打開同一份試卷：序列化結果按版本緩存，並支持 ETag/304
+    return services.cached_paper_response(
+        db, "json", test_id, _render_test_paper_json, "application/json", if_none_match
     )
\ No newline at end of file
@@ -0,0 +1,53 @@
+# routers/transfer.py
+
+import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, Form, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+import services
+import schemas
+from database import get_db
+
+router = APIRouter(
+    prefix="/transfer",
+    tags=["Import & Export"]
+)
+
+@router.get("/export.jsonl")
+def export_jsonl(
+    gzip: bool = Query(False, description="Compress the stream with gzip."),
+    created_from: Optional[datetime.datetime] = Query(None, description="Only papers created at or after this time."),
+    created_to: Optional[datetime.datetime] = Query(None, description="Only papers created before this time."),
+    search: Optional[str] = Query(None, description="Filters papers where the name contains the search term."),
+    ids: Optional[List[int]] = Query(None, description="Only these paper IDs (repeat the parameter)."),
+    db: Session = Depends(get_db)
+):
+    """以 JSONL 流式导出试卷、题目与提交记录，可用 /transfer/import 导入到另一个实例。"""
+    # 依賴注入的會話會在響應開始發送前關閉，流式生成器使用自己的會話
+    session = Session(bind=db.get_bind())
+    query = services.filter_papers(session, created_from, created_to, search, ids)
+
+    def jsonl_stream():
+        try:
+            yield from services.iter_jsonl_export(session, query, compress=gzip)
+        finally:
+            session.close()
+
+    filename = f"ai4exam-{datetime.date.today():%Y%m%d}.jsonl" + (".gz" if gzip else "")
+    return StreamingResponse(
+        jsonl_stream(),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/import", response_model=schemas.ImportSummary)
+def import_jsonl(
+    file: UploadFile = File(..., description="JSONL or gzip-compressed JSONL produced by /transfer/export.jsonl."),
+    skip_invalid: bool = Form(False, description="Skip lines that fail validation instead of aborting."),
+    db: Session = Depends(get_db)
+):
+    """逐行校验并分批导入，重新分配所有ID；任何一行出错时整体回滚（除非 skip_invalid）。"""
+    return services.import_jsonl(db, services.open_jsonl(file.file), skip_invalid=skip_invalid)
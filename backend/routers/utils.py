@@ -1,10 +1,10 @@
 # routers/utils.py
 
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException, Header
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Header, Query
 from pydantic import BaseModel
-import google.generativeai as genai
-from openai import AsyncOpenAI
 
 from services import ai as services_ai
 
@@ -14,6 +14,14 @@ router = APIRouter(
 
 logger = logging.getLogger(__name__)
 
+@router.post("/warmup")
+async def warm_up(
+    providers: Optional[str] = Query(None, description="逗号分隔的提供商，默认使用 LLM_WARMUP_PROVIDERS。")
+):
+    """预先导入提供商 SDK 并创建客户端（不发出网络请求），可供部署平台在切换流量前调用。"""
+    warmed = await asyncio.to_thread(services_ai.warm_up_llm_clients, providers.split(",") if providers else None)
+    return {"warmed": warmed}
+
 class ConnectivityTestRequest(BaseModel):
     model_name: str
 
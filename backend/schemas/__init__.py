@@ -7,7 +7,15 @@ from .test_generation import (
     MultipleChoiceAnswer,
     FillInTheBlankAnswer,
     EssayAnswer,
+    SingleChoiceQuestion,
+    MultipleChoiceQuestion,
+    FillInTheBlankQuestion,
+    EssayQuestion,
+    StrictQuestionModel,
+    StrictQuestionModelAdapter,
+    LegacyQuestionModel,
     QuestionModel,
+    QuestionModelAdapter,
     GenerateTestResponse,
 )
 from .test_grading import (
@@ -16,6 +24,11 @@ from .test_grading import (
     ObjectiveGradeResult,
     EssayGradeResult,
     GradeQuestionsResponse,
+    BulkSubmission,
+    BulkGradeRequest,
+    BulkStudentResult,
+    BulkGradeAggregates,
+    BulkGradeResponse,
 )
 from .feedback import (
     GenerateOverallFeedbackRequest,
@@ -27,10 +40,43 @@ from .essay_evaluation import (
     QuestionInfo,
     EvaluateShortAnswerRequest,
     EvaluateShortAnswerResponse,
+    StoredEssayEvaluation,
 )
 from .history import (
     TestPaper,
     TestPaperResult,
+    TestPaperPage,
+    TestPaperResultPage,
+    TestPaperResultSummary,
+    TestPaperResultSummaryPage,
+)
+from .statistics import (
+    QuestionStatistics,
+    PaperStatisticsResponse,
+)
+from .item_analysis import (
+    OptionAnalysis,
+    ItemAnalysis,
+    ItemAnalysisResponse,
+)
+from .transfer import (
+    TransferHeader,
+    PaperRecord,
+    QuestionRecord,
+    ResultRecord,
+    TransferRecord,
+    ImportSummary,
+)
+from .dedup import (
+    DuplicateMatch,
+    DuplicateClusterQuestion,
+    DuplicateCluster,
+    DuplicateClustersResponse,
+)
+from .search import (
+    PaperSearchHit,
+    QuestionSearchHit,
+    SearchResponse,
 )
 
 __all__ = [
@@ -41,7 +87,15 @@ __all__ = [
     "MultipleChoiceAnswer",
     "FillInTheBlankAnswer",
     "EssayAnswer",
+    "SingleChoiceQuestion",
+    "MultipleChoiceQuestion",
+    "FillInTheBlankQuestion",
+    "EssayQuestion",
+    "StrictQuestionModel",
+    "StrictQuestionModelAdapter",
+    "LegacyQuestionModel",
     "QuestionModel",
+    "QuestionModelAdapter",
     "GenerateTestResponse",
     # Test Grading
     "UserAnswer",
@@ -49,6 +103,11 @@ __all__ = [
     "ObjectiveGradeResult",
     "EssayGradeResult",
     "GradeQuestionsResponse",
+    "BulkSubmission",
+    "BulkGradeRequest",
+    "BulkStudentResult",
+    "BulkGradeAggregates",
+    "BulkGradeResponse",
     # Feedback
     "GenerateOverallFeedbackRequest",
     "GenerateOverallFeedbackResponse",
@@ -58,7 +117,35 @@ __all__ = [
     "QuestionInfo",
     "EvaluateShortAnswerRequest",
     "EvaluateShortAnswerResponse",
+    "StoredEssayEvaluation",
     # History
     "TestPaper",
     "TestPaperResult",
+    "TestPaperPage",
+    "TestPaperResultPage",
+    "TestPaperResultSummary",
+    "TestPaperResultSummaryPage",
+    # Statistics
+    "QuestionStatistics",
+    "PaperStatisticsResponse",
+    # Item Analysis
+    "OptionAnalysis",
+    "ItemAnalysis",
+    "ItemAnalysisResponse",
+    # Transfer
+    "TransferHeader",
+    "PaperRecord",
+    "QuestionRecord",
+    "ResultRecord",
+    "TransferRecord",
+    "ImportSummary",
+    # Duplicate Detection
+    "DuplicateMatch",
+    "DuplicateClusterQuestion",
+    "DuplicateCluster",
+    "DuplicateClustersResponse",
+    # Search
+    "PaperSearchHit",
+    "QuestionSearchHit",
+    "SearchResponse",
 ]
\ No newline at end of file
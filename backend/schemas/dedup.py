@@ -0,0 +1,27 @@
+# schemas/dedup.py
+
+from typing import List, Optional
+from pydantic import BaseModel
+
+class DuplicateMatch(BaseModel):
+    question_id: Optional[int] = None # 题库中的题目；与本次生成的题目重复时为None
+    generated_index: Optional[int] = None # 本次生成的第几道题（从0开始）
+    test_paper_id: Optional[int] = None
+    similarity: float # MinHash 估计的 Jaccard 相似度
+
+class DuplicateClusterQuestion(BaseModel):
+    id: int
+    test_paper_id: Optional[int] = None
+    test_paper_name: Optional[str] = None
+    question_type: Optional[str] = None
+    stem: Optional[str] = None
+
+class DuplicateCluster(BaseModel):
+    size: int
+    similarity: float # 簇内相连题目对的最低估计相似度
+    questions: List[DuplicateClusterQuestion]
+
+class DuplicateClustersResponse(BaseModel):
+    threshold: float
+    clusters: List[DuplicateCluster]
+    next_offset: Optional[int] = None # 为None时表示没有更多结果
@@ -11,10 +11,22 @@ class EvaluateShortAnswerRequest(BaseModel):
     question: QuestionInfo
     user_answer: str
     evaluation_prompt: Optional[str] = None
+    # 给出时评估结果保存到这条提交记录的这道题下，再次打开记录时直接读取
+    result_id: Optional[int] = None
+    question_id: Optional[str] = None
 
 class EvaluateShortAnswerResponse(BaseModel):
     score: int
     feedback: str
     strengths: List[str]
     areas_for_improvement: List[str]
-    reference_explanation: str
\ No newline at end of file
+    reference_explanation: str
+    cached: bool = False # 是否复用了已保存的评估（未调用LLM）
+
+class StoredEssayEvaluation(BaseModel):
+    """提交记录中保存的论述题评估。"""
+    score: int
+    feedback: str
+    strengths: List[str] = []
+    areas_for_improvement: List[str] = []
+    model: Optional[str] = None
@@ -4,6 +4,8 @@ from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 import datetime
 
+from .essay_evaluation import StoredEssayEvaluation
+
 class TestPaper(BaseModel):
     id: int
     name: str
@@ -22,12 +24,43 @@ class TestPaperResult(BaseModel):
     grading_results: List[Any]
     overall_feedback: Optional[str] = None
     question_feedbacks: Optional[Dict[str, str]] = None
+    essay_evaluations: Optional[Dict[str, StoredEssayEvaluation]] = None # 按题目ID保存的论述题评估
     created_at: datetime.datetime
     test_paper: TestPaper # 嵌套的TestPaper信息
 
     # 新增的统计字段
     correct_objective_questions: int = 0
     total_objective_questions: int = 0
+    archived: bool = False # 是否来自归档表
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TestPaperResultSummary(BaseModel):
+    """提交记录列表使用的轻量摘要，不包含答案、批改结果与反馈等大字段。"""
+    id: int
+    test_paper_id: int
+    test_paper_name: Optional[str] = None
+    correct_objective_questions: int = 0
+    total_objective_questions: int = 0
+    total_essay_questions: int = 0
+    score: Optional[float] = None # 客观题得分率（百分制），没有客观题时为None
+    created_at: datetime.datetime
+    archived: bool = False
+
+
+# --- 分页响应 ---
+class TestPaperPage(BaseModel):
+    items: List[TestPaper]
+    next_cursor: Optional[str] = None # 为None时表示没有更多数据
+    total: Optional[int] = None # 仅在 include_total=true 时返回
+
+class TestPaperResultPage(BaseModel):
+    items: List[TestPaperResult]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+class TestPaperResultSummaryPage(BaseModel):
+    items: List[TestPaperResultSummary]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
\ No newline at end of file
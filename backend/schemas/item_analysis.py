@@ -0,0 +1,29 @@
+# schemas/item_analysis.py
+
+from typing import List, Optional
+from pydantic import BaseModel
+
+class OptionAnalysis(BaseModel):
+    index: int
+    is_key: bool # 是否为正确选项
+    pick_rate: Optional[float] = None
+    upper_pick_rate: Optional[float] = None # 高分组（前27%）选择率
+    lower_pick_rate: Optional[float] = None # 低分组（后27%）选择率
+    point_biserial: Optional[float] = None # 选择该选项与总分的相关，干扰项应为负值
+
+class ItemAnalysis(BaseModel):
+    question_id: str
+    question_type: Optional[str] = None
+    difficulty: Optional[float] = None # 难度指数（答对比例）
+    point_biserial: Optional[float] = None # 校正后的点二列相关区分度
+    discrimination_index: Optional[float] = None # 上下组答对率之差
+    options: List[OptionAnalysis] = []
+
+class ItemAnalysisResponse(BaseModel):
+    test_paper_id: int
+    students: int
+    items_count: int
+    mean_score: Optional[float] = None
+    score_std: Optional[float] = None
+    kr20: Optional[float] = None # KR-20 信度系数
+    items: List[ItemAnalysis]
@@ -0,0 +1,27 @@
+# schemas/search.py
+
+from typing import List, Optional
+from pydantic import BaseModel
+import datetime
+
+class PaperSearchHit(BaseModel):
+    id: int
+    name: Optional[str] = None
+    name_highlight: Optional[str] = None # 已转义的 HTML，命中部分以 <mark></mark> 包裹
+    created_at: Optional[datetime.datetime] = None
+    rank: float
+
+class QuestionSearchHit(BaseModel):
+    id: int
+    test_paper_id: Optional[int] = None
+    test_paper_name: Optional[str] = None
+    question_type: Optional[str] = None
+    stem_snippet: Optional[str] = None
+    options_snippet: Optional[str] = None
+    rank: float
+
+class SearchResponse(BaseModel):
+    query: str
+    papers: List[PaperSearchHit]
+    questions: List[QuestionSearchHit]
+    next_offset: Optional[int] = None # 为None时表示没有更多结果
@@ -0,0 +1,22 @@
+# schemas/statistics.py
+
+from typing import List, Optional
+from pydantic import BaseModel
+
+class QuestionStatistics(BaseModel):
+    question_id: str
+    question_type: Optional[str] = None
+    stem: Optional[str] = None
+    attempts: int = 0
+    correct_count: int = 0
+    correct_rate: Optional[float] = None # 0~1，尚无作答时为None
+    option_pick_counts: List[int] = [] # 按选项顺序排列的被选次数
+
+class PaperStatisticsResponse(BaseModel):
+    test_paper_id: int
+    name: Optional[str] = None
+    attempts: int = 0
+    total_objective_questions: int = 0
+    mean_correct_objective: Optional[float] = None # 平均客观题正确数
+    mean_score: Optional[float] = None # 平均客观题得分率（百分制）
+    questions: List[QuestionStatistics]
@@ -1,7 +1,7 @@
 # schemas/test_generation.py
 
-from typing import List, Optional, Union
-from pydantic import BaseModel
+from typing import Annotated, List, Literal, Optional, Union
+from pydantic import BaseModel, Field, TypeAdapter
 
 class QuestionConfig(BaseModel):
     type: str
@@ -29,14 +29,51 @@ class FillInTheBlankAnswer(BaseModel):
 class EssayAnswer(BaseModel):
     reference_explanation: str
 
-class QuestionModel(BaseModel):
+# --- Question Models ---
+# 按题型 type 区分的联合类型：校验时直接根据 type 选择对应的答案模型，而不是逐个尝试
+class _QuestionBase(BaseModel):
     id: Optional[str] = None # ID在返回给前端时才有
+    stem: str
+    options: Optional[List[str]] = None
+
+class SingleChoiceQuestion(_QuestionBase):
+    type: Literal['single_choice']
+    answer: SingleChoiceAnswer
+
+class MultipleChoiceQuestion(_QuestionBase):
+    type: Literal['multiple_choice']
+    answer: MultipleChoiceAnswer
+
+class FillInTheBlankQuestion(_QuestionBase):
+    type: Literal['fill_in_the_blank']
+    answer: FillInTheBlankAnswer
+
+class EssayQuestion(_QuestionBase):
+    type: Literal['essay']
+    answer: EssayAnswer
+
+StrictQuestionModel = Annotated[
+    Union[SingleChoiceQuestion, MultipleChoiceQuestion, FillInTheBlankQuestion, EssayQuestion],
+    Field(discriminator='type'),
+]
+# 保存新题目前用它校验，答案结构与题型不符的题目不写入数据库
+StrictQuestionModelAdapter: TypeAdapter[StrictQuestionModel] = TypeAdapter(StrictQuestionModel)
+
+class LegacyQuestionModel(BaseModel):
+    """旧版的题目模型：不要求答案结构与题型一致。数据库中已有的此类题目仍按它读出。"""
+    id: Optional[str] = None
     type: str
     stem: str
     options: Optional[List[str]] = None
     answer: Union[SingleChoiceAnswer, MultipleChoiceAnswer, FillInTheBlankAnswer, EssayAnswer]
 
+# 先按题型校验，不符合时退回旧版模型，读取已有试卷时不会因为个别题目整卷失败
+QuestionModel = Annotated[Union[StrictQuestionModel, LegacyQuestionModel], Field(union_mode='left_to_right')]
+# 用于从字典（例如数据库行）直接构造单个题目
+QuestionModelAdapter: TypeAdapter[QuestionModel] = TypeAdapter(QuestionModel)
+
 class GenerateTestResponse(BaseModel):
     test_id: str
     name: str  # 试卷名称
-    questions: List[QuestionModel]
\ No newline at end of file
+    questions: List[QuestionModel]
+    reused_from: Optional[str] = None  # 复用已有生成结果时，被复用的试卷ID
\ No newline at end of file
@@ -1,6 +1,6 @@
 # schemas/test_grading.py
 
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 from pydantic import BaseModel
 
 # 注意：我们将所有UserAnswer合并到一个模型中，以便在services.py中进行类型提示
@@ -26,4 +26,35 @@ class EssayGradeResult(BaseModel):
 
 class GradeQuestionsResponse(BaseModel):
     result_id: int
-    results: List[Union[ObjectiveGradeResult, EssayGradeResult]]
\ No newline at end of file
+    results: List[Union[ObjectiveGradeResult, EssayGradeResult]]
+    speculative_feedback: bool = False  # 是否已在后台预生成总体反馈
+
+# --- Bulk Grading ---
+
+class BulkSubmission(BaseModel):
+    student_id: Optional[str] = None
+    answers: List[UserAnswer]
+
+class BulkGradeRequest(BaseModel):
+    test_id: str
+    submissions: List[BulkSubmission]
+
+class BulkStudentResult(BaseModel):
+    student_id: Optional[str] = None
+    result_id: int
+    correct_objective_questions: int
+    score: Optional[float] = None
+
+class BulkGradeAggregates(BaseModel):
+    submissions: int
+    total_objective_questions: int
+    mean_score: Optional[float] = None
+    median_score: Optional[float] = None
+    min_score: Optional[float] = None
+    max_score: Optional[float] = None
+    question_correct_rates: Dict[str, float] = {}
+
+class BulkGradeResponse(BaseModel):
+    test_id: str
+    aggregates: BulkGradeAggregates
+    students: List[BulkStudentResult]
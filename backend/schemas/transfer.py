@@ -0,0 +1,56 @@
+# schemas/transfer.py
+
+import datetime
+from typing import Annotated, Dict, List, Literal, Optional, Union
+from pydantic import BaseModel, Field
+
+from .test_generation import GenerateTestConfig, QuestionModel
+from .test_grading import UserAnswer, ObjectiveGradeResult, EssayGradeResult
+
+# --- JSONL 导入/导出记录 ---
+# 每行一条记录，按 kind 区分；id 为导出实例中的原始ID，导入时会重新分配并改写引用
+
+class TransferHeader(BaseModel):
+    kind: Literal['header']
+    format: Literal['ai4exam-jsonl']
+    version: int
+    exported_at: Optional[datetime.datetime] = None
+
+class PaperRecord(BaseModel):
+    kind: Literal['paper']
+    id: int
+    name: Optional[str] = None
+    source_content: Optional[str] = None
+    config: Optional[GenerateTestConfig] = None
+    generation_prompt: Optional[str] = None
+    total_objective_questions: int = 0
+    total_essay_questions: int = 0
+    created_at: Optional[datetime.datetime] = None
+
+class QuestionRecord(BaseModel):
+    kind: Literal['question']
+    id: int
+    test_paper_id: int
+    question: QuestionModel # 题型、题干、选项与答案，按 type 校验
+
+class ResultRecord(BaseModel):
+    kind: Literal['result']
+    id: int
+    test_paper_id: int
+    user_answers: List[UserAnswer]
+    grading_results: List[Union[ObjectiveGradeResult, EssayGradeResult]]
+    correct_objective_questions: int = 0
+    overall_feedback: Optional[str] = None
+    question_feedbacks: Optional[Dict[str, str]] = None
+    created_at: Optional[datetime.datetime] = None
+
+TransferRecord = Annotated[
+    Union[TransferHeader, PaperRecord, QuestionRecord, ResultRecord],
+    Field(discriminator='kind'),
+]
+
+class ImportSummary(BaseModel):
+    papers: int = 0
+    questions: int = 0
+    results: int = 0
+    skipped: int = 0 # 校验失败并被跳过的行数（仅在 skip_invalid 时）
@@ -0,0 +1,86 @@
+# server.py
+#
+# 生产环境启动脚本（开发时仍可直接运行 python main.py）。
+# 用法: python server.py [--host HOST] [--port PORT] [--workers N]
+#
+# - worker 进程数默认取 WEB_CONCURRENCY，未设置时为 CPU 核数；每个 worker 通过 main.lifespan 各自建立和释放
+#   数据库连接池、LLM 客户端、提取进程池和进程内缓存。
+# - 安装了 uvloop / httptools 时使用它们，否则回退到 asyncio / h11。
+# - 收到 SIGTERM 后 worker 立即停止接受新连接和新请求，进行中的请求（包括流式生成）最多继续
+#   DRAIN_TIMEOUT_SECONDS 秒；生成流在截止前 DRAIN_CHECKPOINT_MARGIN_SECONDS 秒保存已生成的题目并结束。
+
+import argparse
+import importlib.util
+import logging
+import math
+import os
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from database import engine, init_db
+import services
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 空闲 keep-alive 连接保持的秒数；应大于前面负载均衡器的空闲超时（常见为 60 秒），
+# 否则负载均衡器可能把请求发到服务器刚刚关闭的连接上
+KEEP_ALIVE_SECONDS = int(os.getenv("KEEP_ALIVE_SECONDS", "75"))
+# 监听队列长度，突发连接较多时不会被内核直接拒绝
+BACKLOG = int(os.getenv("BACKLOG", "2048"))
+
+
+class DrainingServer(uvicorn.Server):
+    """在 uvicorn 开始关闭之前进入排空状态，让中间件和生成流知道截止时间。"""
+
+    def handle_exit(self, sig, frame):
+        services.begin_drain()
+        super().handle_exit(sig, frame)
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def build_config(host: str, port: int, workers: int) -> uvicorn.Config:
+    loop = "uvloop" if _available("uvloop") else "asyncio"
+    http = "httptools" if _available("httptools") else "h11"
+    logger.info(f"Starting {workers} worker(s) with loop={loop}, http={http}")
+    return uvicorn.Config(
+        "main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=BACKLOG,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS,
+        timeout_graceful_shutdown=math.ceil(services.DRAIN_TIMEOUT_SECONDS),
+        proxy_headers=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API server for production.")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))))
+    args = parser.parse_args()
+
+    config = build_config(args.host, args.port, max(1, args.workers))
+    server = DrainingServer(config)
+    if config.workers > 1:
+        # 数据库结构由父进程准备一次，避免多个 worker 同时建表或迁移
+        init_db()
+        engine.dispose()
+        os.environ["DB_SCHEMA_MODE"] = "off"
+        # 所有 worker 共享父进程绑定的监听套接字；父进程收到 SIGTERM 后转发给每个 worker 并等待它们退出
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,11 @@ from .ai import (
     get_overall_feedback_from_ai,
     get_single_question_feedback_from_ai,
     evaluate_essay_with_ai,
-    generate_test_stream_from_ai
+    generate_test_stream_from_ai,
+    LLM_WARMUP_PROVIDERS,
+    get_llm_client,
+    close_llm_clients,
+    warm_up_llm_clients
 )
 
 # --- 從 database.py 匯出 ---
@@ -17,6 +21,7 @@ from .database import (
     get_question_by_id,
     get_test_result_by_id,
     get_all_test_results,
+    get_test_result_summaries,
     get_test_result,
     delete_test_result
 )
@@ -26,16 +31,198 @@ from .database import (
 from .grading import (
     GRADING_STRATEGIES,
     grade_objective_question,
+    compile_answer,
+    grade_compiled_answer,
     get_formatted_user_answer
 )
 
 # --- 從 orchestration.py 匯出 ---
 from .orchestration import (
     grade_and_save_test,
+    grade_and_save_bulk,
     generate_and_save_overall_feedback,
+    start_speculative_overall_feedback,
     generate_and_save_single_question_feedback
 )
 
+# --- 從 pagination.py 匯出 ---
+from .pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    encode_cursor,
+    decode_cursor,
+    paginate_keyset
+)
+
+# --- 從 statistics.py 匯出 ---
+from .statistics import (
+    apply_result_to_statistics,
+    apply_results_to_statistics,
+    delete_paper_statistics,
+    rebuild_statistics,
+    get_paper_statistics
+)
+
+# --- 從 item_analysis.py 匯出 ---
+from .item_analysis import (
+    get_item_analysis
+)
+
+# --- 從 search.py 匯出 ---
+from .search import (
+    search_question_bank,
+    paper_name_filter
+)
+
+# --- 從 answer_key.py 匯出 ---
+from .answer_key import (
+    CompiledQuestion,
+    AnswerKey,
+    get_paper_version,
+    get_answer_key,
+    invalidate_answer_key
+)
+
+# --- 從 response_cache.py 匯出 ---
+from .response_cache import (
+    make_etag,
+    cached_paper_response,
+    invalidate_paper_responses
+)
+
+# --- 從 export.py 匯出 ---
+from .export import (
+    iter_test_paper_html,
+    render_test_paper_html,
+    filter_papers,
+    iter_papers_zip
+)
+
+# --- 從 transfer.py 匯出 ---
+from .transfer import (
+    iter_jsonl_export,
+    open_jsonl,
+    import_jsonl
+)
+
+# --- 從 dedup.py 匯出 ---
+from .dedup import (
+    DUPLICATE_THRESHOLD,
+    DUPLICATE_MODES,
+    StreamDuplicateFilter,
+    find_duplicate_questions,
+    find_duplicate_clusters
+)
+
+# --- 從 generation_reuse.py 匯出 ---
+from .generation_reuse import (
+    REUSE_MODES,
+    generation_content_hash,
+    find_reusable_test_paper,
+    clone_test_paper,
+    reuse_test_paper
+)
+
+# --- 從 source_store.py 匯出 ---
+from .source_store import (
+    SourceStorageReport,
+    source_storage_report,
+    delete_orphan_source_blobs
+)
+
+# --- 從 archive.py 匯出 ---
+from .archive import (
+    RESULT_ARCHIVE_AFTER_DAYS,
+    RESULT_ARCHIVE_BATCH_SIZE,
+    archive_results_batch,
+    archive_old_results,
+    restore_archived_result,
+    get_archived_result,
+    get_test_results_with_archive,
+    iter_paper_result_rows,
+    delete_archived_results,
+    result_archive_counts
+)
+
+# --- 從 extraction.py 匯出 ---
+from .extraction import (
+    SOURCE_UPLOAD_MAX_BYTES,
+    UnsupportedDocumentError,
+    detect_document_kind,
+    decode_text,
+    extract_text,
+    read_upload_limited,
+    extract_upload_text,
+    shutdown_extraction_pool
+)
+
+# --- 從 idempotency.py 匯出 ---
+from .idempotency import (
+    IDEMPOTENCY_KEY_TTL_SECONDS,
+    REPLAYED_HEADER,
+    request_fingerprint,
+    run_idempotent,
+    purge_expired_idempotency_keys
+)
+
+# --- 從 deadlines.py 匯出 ---
+from .deadlines import (
+    DEADLINE_HEADER,
+    LLM_CONNECT_TIMEOUT_SECONDS,
+    LLM_REQUEST_TIMEOUT_SECONDS,
+    LLM_FIRST_TOKEN_TIMEOUT_SECONDS,
+    LLM_IDLE_TIMEOUT_SECONDS,
+    LLMTimeoutError,
+    parse_request_timeout,
+    set_request_deadline,
+    reset_request_deadline,
+    remaining_seconds
+)
+
+# --- 從 speculation.py 匯出 ---
+from .speculation import (
+    SPECULATIVE_CONCURRENCY,
+    start_speculation,
+    find_speculation,
+    running_speculations,
+    cancel_speculations
+)
+
+# --- 從 question_feedback.py 匯出 ---
+from .question_feedback import (
+    save_question_feedback,
+    insert_question_feedbacks,
+    question_feedback_map,
+    delete_question_feedbacks
+)
+
+# --- 從 essay_evaluation.py 匯出 ---
+from .essay_evaluation import (
+    ESSAY_EVALUATION_CACHE_TTL_DAYS,
+    normalize_answer,
+    evaluation_cache_key,
+    evaluate_and_save_short_answer,
+    delete_essay_evaluations,
+    purge_cached_essay_evaluations
+)
+
+# --- 從 drain.py 匯出 ---
+from .drain import (
+    DRAIN_TIMEOUT_SECONDS,
+    DRAIN_CHECKPOINT_MARGIN_SECONDS,
+    begin_drain,
+    reset_drain,
+    is_draining,
+    DrainAwareStream
+)
+
+# --- 從 bulk_upload.py 匯出 ---
+from .bulk_upload import (
+    BULK_GRADE_MAX_SUBMISSIONS,
+    detect_upload_format,
+    parse_bulk_upload
+)
+
 # 使用 __all__ 來定義公開的 API 介面
 __all__ = [
     # AI Services
@@ -44,6 +231,10 @@ __all__ = [
     'get_single_question_feedback_from_ai',
     'evaluate_essay_with_ai',
     'generate_test_stream_from_ai',
+    'LLM_WARMUP_PROVIDERS',
+    'get_llm_client',
+    'close_llm_clients',
+    'warm_up_llm_clients',
 
     # Database Services
     'get_test_paper_by_id',
@@ -52,16 +243,159 @@ __all__ = [
     'get_question_by_id',
     'get_test_result_by_id',
     'get_all_test_results',
+    'get_test_result_summaries',
     'get_test_result',
     'delete_test_result',
 
     # Grading Logic
     'GRADING_STRATEGIES',
     'grade_objective_question',
+    'compile_answer',
+    'grade_compiled_answer',
     'get_formatted_user_answer',
     
     # Orchestration Services
     'grade_and_save_test',
+    'grade_and_save_bulk',
     'generate_and_save_overall_feedback',
-    'generate_and_save_single_question_feedback'
+    'start_speculative_overall_feedback',
+    'generate_and_save_single_question_feedback',
+
+    # Pagination
+    'DEFAULT_PAGE_SIZE',
+    'MAX_PAGE_SIZE',
+    'encode_cursor',
+    'decode_cursor',
+    'paginate_keyset',
+
+    # Statistics
+    'apply_result_to_statistics',
+    'apply_results_to_statistics',
+    'delete_paper_statistics',
+    'rebuild_statistics',
+    'get_paper_statistics',
+
+    # Item Analysis
+    'get_item_analysis',
+
+    # Search
+    'search_question_bank',
+    'paper_name_filter',
+
+    # Answer Keys
+    'CompiledQuestion',
+    'AnswerKey',
+    'get_paper_version',
+    'get_answer_key',
+    'invalidate_answer_key',
+
+    # Response Cache
+    'make_etag',
+    'cached_paper_response',
+    'invalidate_paper_responses',
+
+    # Export
+    'iter_test_paper_html',
+    'render_test_paper_html',
+    'filter_papers',
+    'iter_papers_zip',
+
+    # Transfer
+    'iter_jsonl_export',
+    'open_jsonl',
+    'import_jsonl',
+
+    # Duplicate Detection
+    'DUPLICATE_THRESHOLD',
+    'DUPLICATE_MODES',
+    'StreamDuplicateFilter',
+    'find_duplicate_questions',
+    'find_duplicate_clusters',
+
+    # Generation Reuse
+    'REUSE_MODES',
+    'generation_content_hash',
+    'find_reusable_test_paper',
+    'clone_test_paper',
+    'reuse_test_paper',
+
+    # Source Storage
+    'SourceStorageReport',
+    'source_storage_report',
+    'delete_orphan_source_blobs',
+
+    # Result Archive
+    'RESULT_ARCHIVE_AFTER_DAYS',
+    'RESULT_ARCHIVE_BATCH_SIZE',
+    'archive_results_batch',
+    'archive_old_results',
+    'restore_archived_result',
+    'get_archived_result',
+    'get_test_results_with_archive',
+    'iter_paper_result_rows',
+    'delete_archived_results',
+    'result_archive_counts',
+
+    # Source Extraction
+    'SOURCE_UPLOAD_MAX_BYTES',
+    'UnsupportedDocumentError',
+    'detect_document_kind',
+    'decode_text',
+    'extract_text',
+    'read_upload_limited',
+    'extract_upload_text',
+    'shutdown_extraction_pool',
+
+    # Question Feedback
+    'save_question_feedback',
+    'insert_question_feedbacks',
+    'question_feedback_map',
+    'delete_question_feedbacks',
+
+    # Essay Evaluations
+    'ESSAY_EVALUATION_CACHE_TTL_DAYS',
+    'normalize_answer',
+    'evaluation_cache_key',
+    'evaluate_and_save_short_answer',
+    'delete_essay_evaluations',
+    'purge_cached_essay_evaluations',
+
+    # Idempotency Keys
+    'IDEMPOTENCY_KEY_TTL_SECONDS',
+    'REPLAYED_HEADER',
+    'request_fingerprint',
+    'run_idempotent',
+    'purge_expired_idempotency_keys',
+
+    # Deadlines & Timeouts
+    'DEADLINE_HEADER',
+    'LLM_CONNECT_TIMEOUT_SECONDS',
+    'LLM_REQUEST_TIMEOUT_SECONDS',
+    'LLM_FIRST_TOKEN_TIMEOUT_SECONDS',
+    'LLM_IDLE_TIMEOUT_SECONDS',
+    'LLMTimeoutError',
+    'parse_request_timeout',
+    'set_request_deadline',
+    'reset_request_deadline',
+    'remaining_seconds',
+
+    # Speculative Work
+    'SPECULATIVE_CONCURRENCY',
+    'start_speculation',
+    'find_speculation',
+    'running_speculations',
+    'cancel_speculations',
+
+    # Graceful Shutdown
+    'DRAIN_TIMEOUT_SECONDS',
+    'DRAIN_CHECKPOINT_MARGIN_SECONDS',
+    'begin_drain',
+    'reset_drain',
+    'is_draining',
+    'DrainAwareStream',
+
+    # Bulk Upload
+    'BULK_GRADE_MAX_SUBMISSIONS',
+    'detect_upload_format',
+    'parse_bulk_upload'
 ]
\ No newline at end of file
@@ -1,40 +1,133 @@
 # services/ai.py
 
+import os
 import json
 import re
-from typing import Dict, Any, List
+import asyncio
+import logging
+import threading
+import orjson
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
 
-import google.generativeai as genai
-from openai import AsyncOpenAI
 from fastapi import HTTPException
 
 import schemas
 import models
+from . import deadlines
+from .deadlines import LLMTimeoutError
 from prompts import (
     GENERATE_TEST_PROMPT, EVALUATE_ESSAY_PROMPT, 
     OVERALL_FEEDBACK_PROMPT, SINGLE_QUESTION_FEEDBACK_PROMPT, GENERATE_STREAMABLE_TEST_PROMPT
 )
 
+logger = logging.getLogger(__name__)
+
+# --- SSE Encoding ---
+
+def _sse_event(payload: Dict[str, Any]) -> str:
+    """將一個事件編碼為 SSE 的 data 行（orjson 比 json.dumps 快得多，輸出 UTF-8 原文）。"""
+    try:
+        return f"data: {orjson.dumps(payload).decode()}\n\n"
+    except orjson.JSONEncodeError:
+        # 例如 AI 返回了超出 64 位的整數，退回標準庫
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
 # --- LLM Client Factory ---
+# 提供商 SDK 在第一次使用時才導入（google.generativeai 與 openai 合計約 1.5 秒），不拖慢冷啟動。
+
+OPENAI_COMPATIBLE_BASE_URLS = {
+    'siliconflow': "https://api.siliconflow.cn/v1",
+    'deepseek': "https://api.deepseek.cn/v1",
+    'aliyun': "https://dashscope.aliyuncs.com/compatible-mode/v1",
+}
+# 進程內緩存多少個 OpenAI 兼容客戶端（每個提供商和事件循環一個）；復用客戶端可以復用其連接池
+LLM_CLIENT_CACHE_SIZE = int(os.getenv("LLM_CLIENT_CACHE_SIZE", "64"))
+# 啟動後在後台預熱的提供商（逗號分隔），例如 "google,siliconflow"；默認不預熱
+LLM_WARMUP_PROVIDERS = [p.strip() for p in os.getenv("LLM_WARMUP_PROVIDERS", "").split(",") if p.strip()]
+
+_clients: "OrderedDict[tuple, Any]" = OrderedDict()
+_clients_lock = threading.Lock()
+
+def _genai():
+    import google.generativeai as genai
+    return genai
 
 def get_llm_client(provider: str, api_key: str, generation_model: str = None):
-    """根据提供商获取相应的LLM客户端。"""
+    """
+    根据提供商获取相应的LLM客户端。OpenAI 兼容客戶端按 (提供商, 事件循環) 緩存，每次調用通過 with_options
+    換上請求的 API Key：副本共用緩存客戶端的連接池，不持有自己的連接，用戶再多也不會洩漏連接池。
+    """
     if provider == 'google':
+        genai = _genai()
         genai.configure(api_key=api_key)
         return genai
-    elif provider == 'siliconflow':
-        # Special handling for SiliconFlow to inject model into the base_url if needed
-        # This is a placeholder for any such logic. As of now, it uses a generic client.
-        return AsyncOpenAI(api_key=api_key, base_url="https://api.siliconflow.cn/v1")
-    elif provider == 'deepseek':
-        return AsyncOpenAI(api_key=api_key, base_url="https://api.deepseek.cn/v1") 
-    elif provider == 'aliyun':
-        return AsyncOpenAI(api_key=api_key, base_url="https://dashscope.aliyuncs.com/compatible-mode/v1")
-    else:
+    base_url = OPENAI_COMPATIBLE_BASE_URLS.get(provider)
+    if base_url is None:
         raise HTTPException(status_code=400, detail=f"Unsupported LLM provider: {provider}")
+    try:
+        # 客戶端的連接池綁定在創建它的事件循環上
+        loop_id = id(asyncio.get_running_loop())
+    except RuntimeError:
+        loop_id = None
+    key = (provider, loop_id)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            _clients.move_to_end(key)
+            return client.with_options(api_key=api_key)
+    import httpx
+    from openai import AsyncOpenAI
+    # 連接超時在客戶端上設置；整個調用的時限由 deadlines.wait_stage 控制
+    timeout = httpx.Timeout(deadlines.LLM_REQUEST_TIMEOUT_SECONDS, connect=deadlines.LLM_CONNECT_TIMEOUT_SECONDS)
+    client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout)
+    with _clients_lock:
+        # 並發創建時保留先放入緩存的客戶端
+        client = _clients.setdefault(key, client)
+        _clients.move_to_end(key)
+        # 超出的只會是已結束的事件循環留下的客戶端，其連接池隨事件循環一起失效
+        while len(_clients) > LLM_CLIENT_CACHE_SIZE:
+            _clients.popitem(last=False)
+    return client.with_options(api_key=api_key)
+
+async def close_llm_clients():
+    """關閉當前事件循環創建的緩存客戶端（在應用 lifespan 結束時調用），其他事件循環的客戶端只從緩存中移除。"""
+    try:
+        loop_id = id(asyncio.get_running_loop())
+    except RuntimeError:
+        loop_id = None
+    with _clients_lock:
+        clients = [client for (_, client_loop), client in _clients.items() if client_loop == loop_id]
+        _clients.clear()
+    for client in clients:
+        await client.close()
+
+def warm_up_llm_clients(providers: Optional[List[str]] = None) -> List[str]:
+    """
+    導入指定提供商的 SDK 並創建一次客戶端（包括 SDK 延遲加載的子模塊），返回已預熱的提供商。
+    不發出網絡請求；在啟動後的後台線程中調用，第一個真實請求就不必承擔導入開銷。
+    """
+    warmed = []
+    for provider in (LLM_WARMUP_PROVIDERS if providers is None else providers):
+        if provider == 'google':
+            _genai().GenerativeModel
+        elif provider in OPENAI_COMPATIBLE_BASE_URLS:
+            from openai import AsyncOpenAI
+            AsyncOpenAI(api_key="warmup", base_url=OPENAI_COMPATIBLE_BASE_URLS[provider]).chat.completions.create
+        else:
+            continue
+        warmed.append(provider)
+    return warmed
 
 # --- Reusable Utilities ---
 
+async def _await_llm(awaitable):
+    """等待一次非流式 LLM 調用，不超過 LLM_REQUEST_TIMEOUT_SECONDS 和請求的截止時間。"""
+    return await deadlines.wait_stage(awaitable, "response", deadlines.LLM_REQUEST_TIMEOUT_SECONDS)
+
+def _timeout_error(action: str, e: LLMTimeoutError) -> HTTPException:
+    return HTTPException(status_code=504, detail=f"AI {action} timed out: {e}")
+
 def _extract_json_from_ai_response(ai_text: str) -> Dict[str, Any]:
     """安全地從AI的文本響應中提取和解析JSON。"""
     match = re.search(r"```json\n(.*?)\n```", ai_text, re.DOTALL)
@@ -66,12 +159,14 @@ async def generate_test_stream_from_ai(
         knowledge_content=knowledge_content,
         config_json=config.model_dump_json(indent=2)
     )
+    # 建立连接和等待第一个数据块共用首个 token 的时限
+    first_token_by = asyncio.get_running_loop().time() + deadlines.LLM_FIRST_TOKEN_TIMEOUT_SECONDS
     # 初始化模型并开始流式生成
     try:
         if provider == 'google':
-            get_llm_client(provider, api_key)  # Configure API key
+            genai = get_llm_client(provider, api_key)  # Configure API key
             model = genai.GenerativeModel(model_name)
-            stream = await model.generate_content_async(prompt, stream=True)
+            stream = await deadlines.wait_stage(model.generate_content_async(prompt, stream=True), "first_token", deadlines.LLM_FIRST_TOKEN_TIMEOUT_SECONDS)
         else: # OpenAI compatible
             messages = [
                 {"role": "system", "content": system_prompt},
@@ -93,7 +188,7 @@ async def generate_test_stream_from_ai(
                 if provider == 'aliyun' and 'qwen3' in model_name:
                     params['extra_body'] = {"enable_thinking": True} # Let's assume streaming needs it to be true, can be configured
 
-                stream = await client.chat.completions.create(**params)
+                stream = await deadlines.wait_stage(client.chat.completions.create(**params), "first_token", deadlines.LLM_FIRST_TOKEN_TIMEOUT_SECONDS)
             except Exception as e:
                 print(f"---[AI_SERVICE_ERROR]---")
                 print(f"Error calling SiliconFlow API: {e}")
@@ -104,62 +199,68 @@ async def generate_test_stream_from_ai(
         # 如果模型初始化或API调用失败，立即停止并报告错误
         error_message = f"Error initializing or calling AI model: {e}"
         print(error_message)
-        yield f"data: {json.dumps({'error': error_message})}\n\n" 
+        yield _sse_event({'error': error_message}) 
         return
     # --- 智能解析器 ---
     buffer = ""
     meta_yielded = False
     chunk_count = 0
-    async for chunk in stream:
-        chunk_count += 1
-        if provider == 'google':
-            buffer += chunk.text
-        else: # OpenAI compatible
-            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
-                 buffer += chunk.choices[0].delta.content
-
-        # --- 实时解析和产生事件 ---
-        # 尝试解析元数据
-        if not meta_yielded:
-            meta_end_marker = "%%END_OF_META%%"
-            if meta_end_marker in buffer:
-                meta_part, buffer = buffer.split(meta_end_marker, 1)
-                meta_json_str = meta_part.strip().replace("```json", "").replace("```", "").strip()
-                try:
-                    meta_data = json.loads(meta_json_str)
-                    yield f"data: {json.dumps({'type': 'metadata', 'content': meta_data})}\n\n"
-                    meta_yielded = True
-                except json.JSONDecodeError:
-                    error_msg = f"Metadata JSON decode error for chunk: {meta_json_str[:200]}"
-                    print(f"---[AI_SERVICE_DEBUG]---: {error_msg}")
-                    yield f"data: {json.dumps({'type': 'error', 'content': error_msg})}\n\n"
-                    # Do not put the chunk back, just discard it and continue.
+    chunks = deadlines.iter_with_timeouts(stream, first_token_by - asyncio.get_running_loop().time())
+    try:
+        async for chunk in chunks:
+            chunk_count += 1
+            if provider == 'google':
+                buffer += chunk.text
+            else: # OpenAI compatible
+                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                     buffer += chunk.choices[0].delta.content
 
-        # 尝试解析问题
-        question_end_marker = "%%END_OF_QUESTION%%"
-        while question_end_marker in buffer:
-            question_part, buffer = buffer.split(question_end_marker, 1)
+            # --- 实时解析和产生事件 ---
+            # 尝试解析元数据
+            if not meta_yielded:
+                meta_end_marker = "%%END_OF_META%%"
+                if meta_end_marker in buffer:
+                    meta_part, buffer = buffer.split(meta_end_marker, 1)
+                    meta_json_str = meta_part.strip().replace("```json", "").replace("```", "").strip()
+                    try:
+                        meta_data = json.loads(meta_json_str)
+                        yield _sse_event({'type': 'metadata', 'content': meta_data})
+                        meta_yielded = True
+                    except json.JSONDecodeError:
+                        error_msg = f"Metadata JSON decode error for chunk: {meta_json_str[:200]}"
+                        print(f"---[AI_SERVICE_DEBUG]---: {error_msg}")
+                        yield _sse_event({'type': 'error', 'content': error_msg})
+                        # Do not put the chunk back, just discard it and continue.
+
+            # 尝试解析问题
+            question_end_marker = "%%END_OF_QUESTION%%"
+            while question_end_marker in buffer:
+                question_part, buffer = buffer.split(question_end_marker, 1)
             
-            # Use regex to safely extract JSON from the part
-            match = re.search(r"```json\n(.*?)\n```", question_part, re.DOTALL)
-            if match:
-                question_json_str = match.group(1).strip()
-            else:
-                # If no ```json``` block, assume the whole part is a JSON string
-                question_json_str = question_part.strip()
+                # Use regex to safely extract JSON from the part
+                match = re.search(r"```json\n(.*?)\n```", question_part, re.DOTALL)
+                if match:
+                    question_json_str = match.group(1).strip()
+                else:
+                    # If no ```json``` block, assume the whole part is a JSON string
+                    question_json_str = question_part.strip()
 
-            if not question_json_str:
-                continue
+                if not question_json_str:
+                    continue
 
-            try:
-                question_data = json.loads(question_json_str)
-                yield f"data: {json.dumps({'type': 'question', 'content': question_data})}\n\n"
-            except json.JSONDecodeError:
-                error_msg = f"Question JSON decode error for chunk: {question_json_str[:200]}"
-                print(f"---[AI_SERVICE_DEBUG]---: {error_msg}")
-                yield f"data: {json.dumps({'type': 'error', 'content': error_msg})}\n\n"
-                # If a block is corrupted, we skip it and move to the next one.
-                pass
+                try:
+                    question_data = json.loads(question_json_str)
+                    yield _sse_event({'type': 'question', 'content': question_data})
+                except json.JSONDecodeError:
+                    error_msg = f"Question JSON decode error for chunk: {question_json_str[:200]}"
+                    print(f"---[AI_SERVICE_DEBUG]---: {error_msg}")
+                    yield _sse_event({'type': 'error', 'content': error_msg})
+                    # If a block is corrupted, we skip it and move to the next one.
+                    pass
+    except LLMTimeoutError as e:
+        # 模型停止输出：已经发送的题目保留，未完成的部分丢弃，由调用方保存并结束
+        logger.warning(f"Generation stream stalled: {e}")
+        yield _sse_event({'type': 'interrupted', 'content': {'reason': 'timeout', 'stage': e.stage}})
 
 # --- AI Interaction Services ---
 
@@ -182,9 +283,9 @@ async def generate_test_from_ai(
     )
     try:
         if provider == 'google':
-            get_llm_client(provider, api_key) # Configure API key
+            genai = get_llm_client(provider, api_key) # Configure API key
             model = genai.GenerativeModel(model_name)
-            response = await model.generate_content_async(prompt)
+            response = await _await_llm(model.generate_content_async(prompt))
             response_text = response.text
         else: # OpenAI compatible
             messages = [
@@ -201,10 +302,12 @@ async def generate_test_from_ai(
             if provider == 'aliyun' and 'qwen3' in model_name:
                 params['extra_body'] = {"enable_thinking": False}
 
-            response = await client.chat.completions.create(**params)
+            response = await _await_llm(client.chat.completions.create(**params))
             response_text = response.choices[0].message.content
 
         return _extract_json_from_ai_response(response_text)
+    except LLMTimeoutError as e:
+        raise _timeout_error("test generation", e)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"AI test generation failed: {e}")
 
@@ -218,7 +321,7 @@ async def get_overall_feedback_from_ai(graded_info: List[Dict], provider: str, a
         client = get_llm_client(provider, api_key)
         if provider == 'google':
             model = client.GenerativeModel(model_name)
-            response = await model.generate_content_async(prompt)
+            response = await _await_llm(model.generate_content_async(prompt))
             return response.text
         else: # OpenAI compatible
             messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
@@ -230,8 +333,10 @@ async def get_overall_feedback_from_ai(graded_info: List[Dict], provider: str, a
             if provider == 'aliyun' and 'qwen3' in model_name:
                 params['extra_body'] = {"enable_thinking": False}
 
-            response = await client.chat.completions.create(**params)
+            response = await _await_llm(client.chat.completions.create(**params))
             return response.choices[0].message.content
+    except LLMTimeoutError as e:
+        raise _timeout_error("feedback generation", e)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"AI feedback generation failed: {e}")
 
@@ -268,7 +373,7 @@ async def get_single_question_feedback_from_ai(question: models.DBQuestion, user
         client = get_llm_client(provider, api_key)
         if provider == 'google':
             model = client.GenerativeModel(model_name)
-            response = await model.generate_content_async(prompt)
+            response = await _await_llm(model.generate_content_async(prompt))
             return response.text
         else: # OpenAI compatible
             messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
@@ -280,8 +385,10 @@ async def get_single_question_feedback_from_ai(question: models.DBQuestion, user
             if provider == 'aliyun' and 'qwen3' in model_name:
                 params['extra_body'] = {"enable_thinking": False}
 
-            response = await client.chat.completions.create(**params)
+            response = await _await_llm(client.chat.completions.create(**params))
             return response.choices[0].message.content
+    except LLMTimeoutError as e:
+        raise _timeout_error("feedback generation", e)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"AI feedback generation failed: {e}")
 
@@ -297,7 +404,7 @@ async def evaluate_essay_with_ai(request: schemas.EvaluateShortAnswerRequest, pr
         client = get_llm_client(provider, api_key)
         if provider == 'google':
             model = client.GenerativeModel(model_name)
-            response = await model.generate_content_async(prompt)
+            response = await _await_llm(model.generate_content_async(prompt))
             response_text = response.text
         else: # OpenAI compatible
             messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
@@ -309,7 +416,7 @@ async def evaluate_essay_with_ai(request: schemas.EvaluateShortAnswerRequest, pr
             if provider == 'aliyun' and 'qwen3' in model_name:
                 params['extra_body'] = {"enable_thinking": False}
 
-            response = await client.chat.completions.create(**params)
+            response = await _await_llm(client.chat.completions.create(**params))
             response_text = response.choices[0].message.content
         
         ai_response_data = _extract_json_from_ai_response(response_text)
@@ -319,5 +426,7 @@ async def evaluate_essay_with_ai(request: schemas.EvaluateShortAnswerRequest, pr
             **ai_response_data,
             reference_explanation=request.question.reference_explanation
         )
+    except LLMTimeoutError as e:
+        raise _timeout_error("evaluation", e)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"AI evaluation failed: {e}")
\ No newline at end of file
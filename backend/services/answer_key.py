@@ -0,0 +1,94 @@
+# services/answer_key.py
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+import models
+from .grading import GRADING_STRATEGIES, compile_answer
+
+# 進程內最多緩存多少份試卷的編譯答案
+ANSWER_KEY_CACHE_SIZE = int(os.getenv("ANSWER_KEY_CACHE_SIZE", "256"))
+
+class CompiledQuestion(NamedTuple):
+    id: str
+    question_type: str
+    key: Any  # 客觀題為編譯後的標準答案，論述題為參考答案文本
+
+class AnswerKey(NamedTuple):
+    test_paper_id: int
+    version: Tuple[int, Any]  # (試卷版本號, 創建時間)；創建時間用於區分被刪除後重用的ID
+    questions: Dict[str, CompiledQuestion]
+    total_objective_questions: int
+
+def _essay_reference(correct_answer: Any) -> str:
+    # The reference answer is stored in correct_answer['reference_explanation']
+    if isinstance(correct_answer, dict):
+        return correct_answer.get('reference_explanation', '')
+    if isinstance(correct_answer, str):
+        # Compatible with old data or unexpected string format
+        return correct_answer
+    return ''
+
+def compile_answer_key(test_paper_id: int, version: Tuple[int, Any], rows) -> AnswerKey:
+    """rows: 可迭代的 (id, question_type, correct_answer)。"""
+    questions = {}
+    for question_id, question_type, correct_answer in rows:
+        if question_type == 'essay':
+            key = _essay_reference(correct_answer)
+        else:
+            key = compile_answer(question_type, correct_answer)
+        questions[str(question_id)] = CompiledQuestion(str(question_id), question_type, key)
+    total_objective = sum(1 for q in questions.values() if q.question_type in GRADING_STRATEGIES)
+    return AnswerKey(test_paper_id, version, questions, total_objective)
+
+_cache: "OrderedDict[int, AnswerKey]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def get_paper_version(db: Session, test_paper_id: int) -> Tuple[int, Any]:
+    """以主鍵查詢試卷的緩存版本 (version, created_at)，試卷不存在時拋出404。"""
+    row = (
+        db.query(models.TestPaper.version, models.TestPaper.created_at)
+        .filter(models.TestPaper.id == test_paper_id)
+        .first()
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Test with ID {test_paper_id} not found.")
+    return tuple(row)
+
+def get_answer_key(db: Session, test_paper_id: int) -> AnswerKey:
+    """
+    返回試卷的編譯答案。每次只查詢一次試卷的版本號（主鍵查找），
+    版本未變時直接使用緩存，不再加載題目。
+    """
+    version = get_paper_version(db, test_paper_id)
+
+    with _cache_lock:
+        cached = _cache.get(test_paper_id)
+        if cached and cached.version == version:
+            _cache.move_to_end(test_paper_id)
+            return cached
+
+    rows = (
+        db.query(models.DBQuestion.id, models.DBQuestion.question_type, models.DBQuestion.correct_answer)
+        .filter(models.DBQuestion.test_paper_id == test_paper_id)
+        .order_by(models.DBQuestion.id)
+        .all()
+    )
+    answer_key = compile_answer_key(test_paper_id, version, rows)
+
+    with _cache_lock:
+        _cache[test_paper_id] = answer_key
+        _cache.move_to_end(test_paper_id)
+        while len(_cache) > ANSWER_KEY_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return answer_key
+
+def invalidate_answer_key(test_paper_id: int):
+    """題目被重新生成或試卷被刪除時調用；其他進程通過版本號發現變化。"""
+    with _cache_lock:
+        _cache.pop(test_paper_id, None)
@@ -0,0 +1,266 @@
+# services/archive.py
+
+import os
+import time
+import heapq
+import datetime
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import Text, delete, func, insert, literal, select, type_coerce, union_all
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+import models
+from .pagination import paginate_keyset
+from .essay_evaluation import pop_essay_evaluations
+from .question_feedback import pop_question_feedbacks, with_question_feedbacks
+from .search import paper_name_filter
+
+# 創建時間早於這個天數的提交記錄會被歸檔
+RESULT_ARCHIVE_AFTER_DAYS = int(os.getenv("RESULT_ARCHIVE_AFTER_DAYS", "180"))
+# 每批移動的行數；每批是一個獨立的短事務，寫鎖只在這一批的刪除、壓縮和插入期間持有
+RESULT_ARCHIVE_BATCH_SIZE = int(os.getenv("RESULT_ARCHIVE_BATCH_SIZE", "500"))
+
+_HOT = models.TestPaperResult
+_COLD = models.ArchivedTestPaperResult
+# JSON 列按原始文本返回，歸檔時不解析
+_JSON_FIELDS = ('user_answers', 'grading_results')
+_ARCHIVE_RETURNING = (
+    _HOT.id, _HOT.test_paper_id, _HOT.correct_objective_questions, _HOT.created_at, _HOT.overall_feedback,
+    *(type_coerce(getattr(_HOT, name), Text).label(name) for name in _JSON_FIELDS),
+)
+
+# --- Moving Results ---
+
+def _archive_row(row, archived_at: datetime.datetime, question_feedbacks: Optional[Dict[str, str]],
+                 essay_evaluations: Optional[Dict[str, Dict]]) -> Dict:
+    encoded = {name: getattr(row, name).encode('utf-8') for name in _JSON_FIELDS if getattr(row, name) is not None}
+    if row.overall_feedback is not None:
+        encoded['overall_feedback'] = orjson.dumps(row.overall_feedback)
+    # 單題反饋從 question_feedback 表移入 payload，格式與原來的 JSON 列相同
+    if question_feedbacks:
+        encoded['question_feedbacks'] = orjson.dumps(question_feedbacks)
+    # 論述題評估同樣移入 payload，恢復時寫回 essay_evaluations 表
+    if essay_evaluations:
+        encoded['essay_evaluations'] = orjson.dumps(essay_evaluations)
+    codec, payload = _COLD.pack(encoded)
+    return {
+        'id': row.id,
+        'test_paper_id': row.test_paper_id,
+        'correct_objective_questions': row.correct_objective_questions or 0,
+        'created_at': row.created_at,
+        'archived_at': archived_at,
+        'codec': codec,
+        'payload': payload,
+    }
+
+def archive_results_batch(db: Session, cutoff: datetime.datetime, batch_size: Optional[int] = None) -> int:
+    """
+    把最多 batch_size 條創建時間早於 cutoff 的提交記錄移入歸檔表並提交，返回移動的行數。
+    DELETE ... RETURNING 取出並刪除同一批行，期間被並發修改的記錄不會丟失更新。
+    """
+    # test_paper_results 使用 AUTOINCREMENT，歸檔後新的提交不會重用歸檔中的ID
+    batch = (
+        select(_HOT.id)
+        .where(_HOT.created_at < cutoff)
+        .order_by(_HOT.created_at, _HOT.id)
+        .limit(batch_size or RESULT_ARCHIVE_BATCH_SIZE)
+    )
+    try:
+        ids = db.execute(batch).scalars().all()
+        feedbacks = pop_question_feedbacks(db, ids)
+        evaluations = pop_essay_evaluations(db, ids)
+        rows = db.execute(
+            delete(_HOT).where(_HOT.id.in_(ids)).returning(*_ARCHIVE_RETURNING),
+            execution_options={"synchronize_session": False},
+        ).all() if ids else []
+        if rows:
+            archived_at = datetime.datetime.utcnow()
+            db.execute(insert(_COLD), [_archive_row(row, archived_at, feedbacks.get(row.id), evaluations.get(row.id)) for row in rows])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
+
+def archive_old_results(
+    db: Session,
+    older_than_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    max_batches: Optional[int] = None,
+    pause_seconds: float = 0.0,
+) -> int:
+    """
+    分批歸檔創建超過 older_than_days 天的提交記錄，返回歸檔的總行數。
+    批次之間可以暫停 pause_seconds 秒，讓在線請求的寫入有機會獲得鎖；可以隨時中斷，下次從剩餘的行繼續。
+    """
+    days = RESULT_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_results_batch(db, cutoff, batch_size)
+        total += moved
+        batches += 1
+        if moved < (batch_size or RESULT_ARCHIVE_BATCH_SIZE):
+            break
+        if pause_seconds:
+            time.sleep(pause_seconds)
+    return total
+
+def restore_archived_result(db: Session, result_id: int) -> Optional[models.TestPaperResult]:
+    """把一條歸檔的提交記錄移回熱表（需要修改它時使用），不存在時返回 None。"""
+    row = db.get(_COLD, result_id)
+    if row is None:
+        return None
+    result = _HOT(
+        id=row.id,
+        test_paper_id=row.test_paper_id,
+        correct_objective_questions=row.correct_objective_questions,
+        created_at=row.created_at,
+        **row.unpack(),
+    )
+    db.delete(row)
+    db.add(result)
+    db.commit()
+    return result
+
+# --- Reading Archived Results ---
+
+def _archived_view(row: models.ArchivedTestPaperResult) -> SimpleNamespace:
+    """解壓後的歸檔記錄，屬性與 TestPaperResult 相同，但不屬於任何會話，不會被誤寫回熱表。"""
+    return SimpleNamespace(
+        id=row.id,
+        test_paper_id=row.test_paper_id,
+        correct_objective_questions=row.correct_objective_questions or 0,
+        created_at=row.created_at,
+        test_paper=row.test_paper,
+        archived=True,
+        **row.unpack(),
+    )
+
+def get_archived_result(db: Session, result_id: int) -> Optional[SimpleNamespace]:
+    row = db.query(_COLD).options(joinedload(_COLD.test_paper)).filter(_COLD.id == result_id).first()
+    return _archived_view(row) if row else None
+
+def get_archived_results(db: Session, result_ids: List[int]) -> Dict[int, SimpleNamespace]:
+    rows = db.query(_COLD).options(joinedload(_COLD.test_paper)).filter(_COLD.id.in_(result_ids))
+    return {row.id: _archived_view(row) for row in rows}
+
+def iter_archived_results(db: Session, test_paper_id: Optional[int] = None, batch_size: int = 500) -> Iterator[SimpleNamespace]:
+    """按ID順序逐條解壓歸檔記錄（不加載試卷）。"""
+    query = db.query(_COLD)
+    if test_paper_id is not None:
+        query = query.filter(_COLD.test_paper_id == test_paper_id)
+    for row in query.order_by(_COLD.id).yield_per(batch_size):
+        yield SimpleNamespace(
+            id=row.id,
+            test_paper_id=row.test_paper_id,
+            correct_objective_questions=row.correct_objective_questions or 0,
+            created_at=row.created_at,
+            **row.unpack(),
+        )
+
+def iter_paper_result_rows(db: Session, test_paper_id: int, batch_size: int = 500) -> Iterator[Dict]:
+    """按ID順序合併熱表與歸檔表中一份試卷的全部提交記錄，逐條返回字典（用於導出）。"""
+    hot = (
+        db.query(_HOT.id, _HOT.user_answers, _HOT.grading_results, _HOT.correct_objective_questions,
+                 _HOT.overall_feedback, _HOT.created_at)
+        .filter(_HOT.test_paper_id == test_paper_id)
+        .order_by(_HOT.id)
+        .yield_per(batch_size)
+    )
+    # question_feedbacks 先佔位，鍵的順序與歸檔記錄相同
+    hot = with_question_feedbacks(db, (
+        {
+            'id': r.id, 'user_answers': r.user_answers, 'grading_results': r.grading_results,
+            'correct_objective_questions': r.correct_objective_questions, 'overall_feedback': r.overall_feedback,
+            'question_feedbacks': None, 'created_at': r.created_at,
+        }
+        for r in hot
+    ), batch_size)
+    cold = (
+        {
+            'id': r.id, 'user_answers': r.user_answers, 'grading_results': r.grading_results,
+            'correct_objective_questions': r.correct_objective_questions, 'overall_feedback': r.overall_feedback,
+            'question_feedbacks': r.question_feedbacks, 'created_at': r.created_at,
+        }
+        for r in iter_archived_results(db, test_paper_id, batch_size)
+    )
+    return heapq.merge(hot, cold, key=lambda row: row['id'])
+
+def count_paper_results(db: Session, test_paper_id: int) -> int:
+    hot = db.query(func.count(_HOT.id)).filter(_HOT.test_paper_id == test_paper_id).scalar()
+    cold = db.query(func.count(_COLD.id)).filter(_COLD.test_paper_id == test_paper_id).scalar()
+    return hot + cold
+
+def delete_archived_results(db: Session, test_paper_id: int) -> int:
+    """刪除一份試卷的全部歸檔記錄（不提交事務）。"""
+    return db.query(_COLD).filter(_COLD.test_paper_id == test_paper_id).delete(synchronize_session=False)
+
+def result_archive_counts(db: Session) -> Tuple[int, int, int]:
+    """返回 (熱表行數, 歸檔行數, 歸檔 payload 壓縮後的總字節數)。"""
+    hot = db.query(func.count(_HOT.id)).scalar()
+    cold, stored = db.query(func.count(_COLD.id), func.coalesce(func.sum(func.length(_COLD.payload)), 0)).one()
+    return hot, cold, stored
+
+# --- History Across Both Tiers ---
+
+def result_history_subquery():
+    """熱表與歸檔表的並集，只包含列表和分頁需要的列；archived 標記行來自哪張表。"""
+    hot = select(_HOT.id, _HOT.test_paper_id, _HOT.correct_objective_questions, _HOT.created_at,
+                 literal(False).label('archived'))
+    cold = select(_COLD.id, _COLD.test_paper_id, _COLD.correct_objective_questions, _COLD.created_at,
+                  literal(True).label('archived'))
+    return union_all(hot, cold).subquery('all_results')
+
+def get_test_results_with_archive(
+    db: Session,
+    search: Optional[str] = None,
+    sort_by: str = 'created_at',
+    order: str = 'desc',
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    include_total: bool = False,
+) -> Tuple[List, Optional[str], Optional[int]]:
+    """
+    同時在熱表和歸檔表中分頁查詢完整的提交記錄，游標格式與只查熱表時相同。
+    先按並集分頁得到當前頁的ID，再分別從兩張表加載這些記錄；只有當前頁的歸檔記錄會被解壓。
+    """
+    results = result_history_subquery()
+    query = (
+        db.query(results.c.id, results.c.archived, models.TestPaper.name.label('test_paper_name'), results.c.created_at)
+        .join(models.TestPaper, results.c.test_paper_id == models.TestPaper.id)
+    )
+    if search:
+        query = query.filter(paper_name_filter(db, search))
+
+    if sort_by == 'name':
+        sort_column = models.TEST_PAPER_NAME_SORT
+        sort_key = lambda r: r.test_paper_name or ''
+    else:
+        sort_column = results.c.created_at
+        sort_key = lambda r: r.created_at
+
+    rows, next_cursor, total = paginate_keyset(
+        query,
+        sort_column=sort_column,
+        id_column=results.c.id,
+        sort_key=sort_key,
+        order=order,
+        cursor=cursor,
+        limit=limit,
+        include_total=include_total,
+    )
+
+    hot_ids = [row.id for row in rows if not row.archived]
+    loaded = get_archived_results(db, [row.id for row in rows if row.archived]) if len(hot_ids) < len(rows) else {}
+    if hot_ids:
+        loaded.update(
+            (result.id, result)
+            for result in db.query(_HOT)
+            .options(joinedload(_HOT.test_paper), selectinload(_HOT.feedback_entries), selectinload(_HOT.evaluation_entries))
+            .filter(_HOT.id.in_(hot_ids))
+        )
+    # 分頁與加載之間被移動的記錄直接跳過
+    return [loaded[row.id] for row in rows if row.id in loaded], next_cursor, total
@@ -0,0 +1,129 @@
+# services/bulk_upload.py
+
+import io
+import os
+import csv
+import string
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+import schemas
+from .answer_key import CompiledQuestion
+
+# 单次批量批改允许的最大提交数，可通过环境变量调整
+BULK_GRADE_MAX_SUBMISSIONS = int(os.getenv("BULK_GRADE_MAX_SUBMISSIONS", "5000"))
+STUDENT_ID_COLUMN = "student_id"
+FILL_IN_BLANK_SEPARATOR = "|"
+
+# --- CSV Cell Parsing ---
+
+def _parse_choice(cell: str) -> int:
+    """选项既可以写字母（A/b），也可以写从0开始的序号。"""
+    cell = cell.strip()
+    if cell.isdigit():
+        return int(cell)
+    if len(cell) == 1 and cell.upper() in string.ascii_uppercase:
+        return string.ascii_uppercase.index(cell.upper())
+    raise ValueError(f"invalid choice '{cell}'")
+
+def _parse_choices(cell: str) -> List[int]:
+    """多选题：'AC'、'A,C'、'A|C' 或 '0,2'。"""
+    cell = cell.strip()
+    if any(sep in cell for sep in ",|; "):
+        parts = [p for p in cell.replace("|", ",").replace(";", ",").replace(" ", ",").split(",") if p]
+    elif cell.isdigit():
+        parts = [cell]
+    else:
+        parts = list(cell)
+    return sorted({_parse_choice(p) for p in parts})
+
+def _parse_cell(question: CompiledQuestion, cell: str) -> Optional[schemas.UserAnswer]:
+    if cell is None or not cell.strip():
+        return None
+    question_id = str(question.id)
+    q_type = question.question_type
+    if q_type == 'single_choice':
+        return schemas.UserAnswer(question_id=question_id, question_type=q_type, answer_index=_parse_choice(cell))
+    if q_type == 'multiple_choice':
+        return schemas.UserAnswer(question_id=question_id, question_type=q_type, answer_indices=_parse_choices(cell))
+    if q_type == 'essay':
+        return schemas.UserAnswer(question_id=question_id, question_type=q_type, answer_text=cell)
+    return schemas.UserAnswer(question_id=question_id, question_type=q_type, answer_texts=cell.split(FILL_IN_BLANK_SEPARATOR))
+
+# --- Row Iterators ---
+
+def _iter_csv(text: io.TextIOBase, questions_map: Dict[str, CompiledQuestion]) -> Iterator[schemas.BulkSubmission]:
+    """
+    宽表格式：第一行为表头 student_id,<question_id>,<question_id>,...
+    之后每行是一名学生的作答。
+    """
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if not header:
+        return
+    header = [h.strip() for h in header]
+    student_column = header.index(STUDENT_ID_COLUMN) if STUDENT_ID_COLUMN in header else None
+    columns = []
+    for position, name in enumerate(header):
+        if position == student_column:
+            continue
+        question = questions_map.get(name)
+        if not question:
+            raise HTTPException(status_code=400, detail=f"Line 1: unknown question id '{name}' in CSV header.")
+        columns.append((position, question))
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            answers = []
+            for position, question in columns:
+                answer = _parse_cell(question, row[position] if position < len(row) else "")
+                if answer:
+                    answers.append(answer)
+        except (ValueError, ValidationError) as e:
+            raise HTTPException(status_code=400, detail=f"Line {reader.line_num}: {e}")
+        student_id = row[student_column].strip() if student_column is not None and student_column < len(row) else None
+        yield schemas.BulkSubmission(student_id=student_id or None, answers=answers)
+
+def _iter_jsonl(text: io.TextIOBase) -> Iterator[schemas.BulkSubmission]:
+    """每行一个 JSON 对象：{"student_id": "...", "answers": [UserAnswer, ...]}"""
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield schemas.BulkSubmission.model_validate_json(line)
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=f"Line {line_number}: {e}")
+
+# --- Public API ---
+
+def detect_upload_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson")) or "ndjson" in (content_type or "") or "jsonl" in (content_type or ""):
+        return "jsonl"
+    if name.endswith(".csv") or "csv" in (content_type or ""):
+        return "csv"
+    raise HTTPException(status_code=415, detail="Unsupported upload format. Use .csv or .jsonl.")
+
+def parse_bulk_upload(fileobj: BinaryIO, fmt: str, questions_map: Dict[str, CompiledQuestion]) -> List[schemas.BulkSubmission]:
+    """
+    逐行解析上传的文件（不会把整个文件读入内存），返回提交列表。
+    超过 BULK_GRADE_MAX_SUBMISSIONS 时返回413。
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        rows = _iter_csv(text, questions_map) if fmt == "csv" else _iter_jsonl(text)
+        submissions = []
+        for submission in rows:
+            submissions.append(submission)
+            if len(submissions) > BULK_GRADE_MAX_SUBMISSIONS:
+                raise HTTPException(status_code=413, detail=f"Too many submissions (max {BULK_GRADE_MAX_SUBMISSIONS}).")
+        return submissions
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Upload must be UTF-8 encoded.")
+    finally:
+        # 不关闭底层的上传文件，交由 UploadFile 自行清理
+        text.detach()
@@ -1,15 +1,37 @@
 # services/database.py
 
-from typing import Optional
+import logging
+from typing import List, Optional, Tuple
 from fastapi import HTTPException
+from pydantic import ValidationError
 from sqlalchemy.orm import Session, joinedload
 
 import models
 import schemas
+from .answer_key import invalidate_answer_key
+from .archive import count_paper_results, get_archived_result, restore_archived_result, result_history_subquery
 from .grading import GRADING_STRATEGIES
+from .pagination import paginate_keyset
+from .response_cache import invalidate_paper_responses
+from .search import paper_name_filter
+from .statistics import apply_result_to_statistics, delete_paper_statistics
+
+logger = logging.getLogger(__name__)
 
 # --- Database Interaction Services ---
 
+def _valid_questions(questions_data: List[dict]) -> List[dict]:
+    """按題型校驗 AI 生成的題目，丟棄答案結構與題型不符的題目（例如帶 indexes 的單選題），以免寫入後讀取失敗。"""
+    valid = []
+    for q_data in questions_data:
+        try:
+            schemas.StrictQuestionModelAdapter.validate_python(q_data)
+        except ValidationError as e:
+            logger.warning(f"Dropping generated question that does not match its type {q_data.get('type')!r}: {e.error_count()} errors")
+            continue
+        valid.append(q_data)
+    return valid
+
 def get_test_paper_by_id(db: Session, test_id: int) -> models.TestPaper:
     """通過ID從資料庫獲取試卷，如果找不到則拋出404異常。"""
     test_paper = db.query(models.TestPaper).filter(models.TestPaper.id == test_id).first()
@@ -17,7 +39,7 @@ def get_test_paper_by_id(db: Session, test_id: int) -> models.TestPaper:
         raise HTTPException(status_code=404, detail=f"Test with ID {test_id} not found.")
     return test_paper
 
-def create_test_paper(db: Session, name: Optional[str], source_content: str, config: schemas.GenerateTestConfig, generation_prompt: str, ai_response: Optional[dict]) -> models.TestPaper:
+def create_test_paper(db: Session, name: Optional[str], source_content: str, config: schemas.GenerateTestConfig, generation_prompt: str, ai_response: Optional[dict], content_hash: Optional[str] = None) -> models.TestPaper:
     """Creates a test paper record in the database, including a generated name."""
     # Determine the paper name. Prioritize the user-provided name.
     paper_name = name
@@ -28,6 +50,11 @@ def create_test_paper(db: Session, name: Optional[str], source_content: str, con
             paper_name = f"AI生成的試卷 - {source_content[:20]}..."
 
     questions_data = ai_response.get('questions', []) if ai_response else []
+    valid_questions = _valid_questions(questions_data)
+    if len(valid_questions) < len(questions_data):
+        # 缺少題目的試卷不能作為相同輸入的生成結果復用
+        content_hash = None
+    questions_data = valid_questions
 
     # 計算客觀題和主觀題的數量
     total_objective = sum(1 for q in questions_data if q.get('type') in GRADING_STRATEGIES)
@@ -39,7 +66,8 @@ def create_test_paper(db: Session, name: Optional[str], source_content: str, con
         config=config.model_dump(),
         generation_prompt=generation_prompt,
         total_objective_questions=total_objective,
-        total_essay_questions=total_essay
+        total_essay_questions=total_essay,
+        content_hash=content_hash
     )
     db.add(db_test_paper)
 
@@ -58,7 +86,7 @@ def create_test_paper(db: Session, name: Optional[str], source_content: str, con
     db.refresh(db_test_paper)
     return db_test_paper
 
-def update_test_paper(db: Session, test_id: int, ai_response: dict) -> models.TestPaper:
+def update_test_paper(db: Session, test_id: int, ai_response: dict, content_hash: Optional[str] = None) -> models.TestPaper:
     """Updates an existing test paper with questions and metadata from the AI response."""
     db_test_paper = get_test_paper_by_id(db, test_id)
 
@@ -68,7 +96,13 @@ def update_test_paper(db: Session, test_id: int, ai_response: dict) -> models.Te
         db_test_paper.name = new_paper_name
 
     questions_data = ai_response.get('questions', [])
-    questions_data = ai_response.get('questions', [])
+    valid_questions = _valid_questions(questions_data)
+    if len(valid_questions) < len(questions_data):
+        # 缺少題目的試卷不能作為相同輸入的生成結果復用
+        content_hash = None
+    questions_data = valid_questions
+    # 記錄本次生成的輸入哈希；未提供時清空，舊哈希已不能描述新的題目
+    db_test_paper.content_hash = content_hash
 
     # Recalculate question counts
     total_objective = sum(1 for q in questions_data if q.get('type') in GRADING_STRATEGIES)
@@ -81,6 +115,12 @@ def update_test_paper(db: Session, test_id: int, ai_response: dict) -> models.Te
     # Clear existing questions before adding new ones
     for question in db_test_paper.questions:
         db.delete(question)
+    # 舊題目的統計數據隨題目一起失效
+    delete_paper_statistics(db, db_test_paper.id, questions_only=True)
+    # 版本號遞增，使各進程緩存的編譯答案失效
+    db_test_paper.version = (db_test_paper.version or 1) + 1
+    invalidate_answer_key(db_test_paper.id)
+    invalidate_paper_responses(db_test_paper.id)
 
     # Add new questions
     for q_data in questions_data:
@@ -105,8 +145,10 @@ def get_question_by_id(db: Session, question_id: int) -> models.DBQuestion:
     return question
 
 def get_test_result_by_id(db: Session, result_id: int) -> models.TestPaperResult:
-    """Fetches a single test result by its ID."""
+    """Fetches a single test result by its ID. Archived results are moved back to the hot table so they can be updated."""
     result = db.query(models.TestPaperResult).filter(models.TestPaperResult.id == result_id).first()
+    if not result:
+        result = restore_archived_result(db, result_id)
     if not result:
         raise HTTPException(status_code=404, detail=f"Test result with ID {result_id} not found.")
     return result
@@ -118,14 +160,15 @@ def get_all_test_results(db: Session):
     results = (
         db.query(models.TestPaperResult)
         .options(
+            defer(models.TestPaperResult.user_answers),
+            defer(models.TestPaperResult.grading_results),
             joinedload(models.TestPaperResult.test_paper)
-            .defer(models.TestPaper.source_content)
         )
         .order_by(models.TestPaperResult.created_at.desc())
         .all()
     )
 
-    # 為每条結果動態計算統計數據
+    # 為每条結果填充統計數據
     for result in results:
         test_paper = result.test_paper
         if not test_paper:
@@ -138,20 +181,90 @@ def get_all_test_results(db: Session):
         result.total_objective_questions = test_paper.total_objective_questions
         result.total_essay_questions = test_paper.total_essay_questions
 
-        # 統計客觀題正確數
-        correct_objective = sum(1 for grade in result.grading_results if isinstance(grade, dict) and grade.get('is_correct'))
-        result.correct_objective_questions = correct_objective
+        # 客觀題正確數在批改時已經保存，無需重新遍歷 grading_results
+        if result.correct_objective_questions is None:
+            result.correct_objective_questions = 0
 
     return results
 
+def get_test_result_summaries(
+    db: Session,
+    search: Optional[str] = None,
+    sort_by: str = 'created_at',
+    order: str = 'desc',
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    include_total: bool = False,
+    include_archived: bool = False,
+) -> Tuple[List[schemas.TestPaperResultSummary], Optional[str], Optional[int]]:
+    """
+    按列投影分页獲取提交記錄摘要，只讀取列表頁需要的欄位，從不加載 JSON 大字段。
+    include_archived 為真時同時查詢歸檔表（歸檔記錄的摘要欄位未壓縮，同樣無需解壓）。
+    """
+    results = result_history_subquery() if include_archived else models.TestPaperResult.__table__
+    columns = [
+        results.c.id,
+        results.c.test_paper_id,
+        models.TestPaper.name.label('test_paper_name'),
+        results.c.correct_objective_questions,
+        models.TestPaper.total_objective_questions,
+        models.TestPaper.total_essay_questions,
+        results.c.created_at,
+    ]
+    if include_archived:
+        columns.append(results.c.archived)
+    query = (
+        db.query(*columns)
+        .join(models.TestPaper, results.c.test_paper_id == models.TestPaper.id)
+    )
+    if search:
+        query = query.filter(paper_name_filter(db, search))
+
+    if sort_by == 'name':
+        sort_column = models.TEST_PAPER_NAME_SORT
+        sort_key = lambda r: r.test_paper_name or ''
+    else:
+        sort_column = results.c.created_at
+        sort_key = lambda r: r.created_at
+
+    rows, next_cursor, total = paginate_keyset(
+        query,
+        sort_column=sort_column,
+        id_column=results.c.id,
+        sort_key=sort_key,
+        order=order,
+        cursor=cursor,
+        limit=limit,
+        include_total=include_total,
+    )
+
+    summaries = []
+    for row in rows:
+        correct = row.correct_objective_questions or 0
+        total_objective = row.total_objective_questions or 0
+        summaries.append(schemas.TestPaperResultSummary(
+            id=row.id,
+            test_paper_id=row.test_paper_id,
+            test_paper_name=row.test_paper_name,
+            correct_objective_questions=correct,
+            total_objective_questions=total_objective,
+            total_essay_questions=row.total_essay_questions or 0,
+            score=round(correct * 100 / total_objective, 1) if total_objective else None,
+            created_at=row.created_at,
+            archived=bool(getattr(row, 'archived', False)),
+        ))
+    return summaries, next_cursor, total
+
 def get_test_result(db: Session, result_id: int) -> models.TestPaperResult:
-    """Fetches a single test paper result by its ID, eagerly loading the test paper data."""
+    """Fetches a single test paper result by its ID, eagerly loading the test paper data. Falls back to the archive (read-only)."""
     result = (
         db.query(models.TestPaperResult)
         .options(joinedload(models.TestPaperResult.test_paper))
         .filter(models.TestPaperResult.id == result_id)
         .first()
     )
+    if not result:
+        result = get_archived_result(db, result_id)
     if not result:
         raise HTTPException(status_code=404, detail=f"Test result with ID {result_id} not found.")
     return result
@@ -159,21 +272,27 @@ def get_test_result(db: Session, result_id: int) -> models.TestPaperResult:
 def delete_test_result(db: Session, result_id: int, delete_paper: bool = False) -> bool:
     """Deletes a test result, and optionally the test paper if it's the last result."""
     result = db.query(models.TestPaperResult).filter(models.TestPaperResult.id == result_id).first()
-    if not result:
+    archived = None if result else get_archived_result(db, result_id)
+    if not result and not archived:
         return False
 
-    test_paper_id = result.test_paper_id
-    db.delete(result)
+    test_paper_id = (result or archived).test_paper_id
+    apply_result_to_statistics(db, result or archived, sign=-1)
+    if result:
+        db.delete(result)
+    else:
+        db.query(models.ArchivedTestPaperResult).filter(models.ArchivedTestPaperResult.id == result_id).delete()
     db.commit()
 
     if delete_paper and test_paper_id:
-        # Check if there are any remaining results for this test paper
-        remaining_results_count = db.query(models.TestPaperResult).filter(models.TestPaperResult.test_paper_id == test_paper_id).count()
+        # Check if there are any remaining results (hot or archived) for this test paper
+        remaining_results_count = count_paper_results(db, test_paper_id)
 
         if remaining_results_count == 0:
             # If no results are left, delete the test paper itself
             test_paper = db.query(models.TestPaper).filter(models.TestPaper.id == test_paper_id).first()
             if test_paper:
+                delete_paper_statistics(db, test_paper_id)
                 db.delete(test_paper)
                 db.commit()
                 
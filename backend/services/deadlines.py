@@ -0,0 +1,101 @@
+# services/deadlines.py
+
+import os
+import time
+import asyncio
+import contextvars
+from typing import AsyncIterator, Awaitable, Optional
+
+# 客戶端可以用這個請求頭給出本次請求最多還能等待多少秒，截止時間會傳遞到請求中的每一次 LLM 調用
+DEADLINE_HEADER = "X-Request-Timeout"
+MAX_REQUEST_TIMEOUT_SECONDS = 3600.0
+
+# LLM 調用各階段的超時（秒）；請求帶截止時間時取其與剩餘時間中較小的一個
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "10"))
+# 非流式調用從發出到收到完整響應（包括 SDK 內部的重試）
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "120"))
+# 流式調用從發出到收到第一個數據塊
+LLM_FIRST_TOKEN_TIMEOUT_SECONDS = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT_SECONDS", "60"))
+# 流式調用中相鄰兩個數據塊之間
+LLM_IDLE_TIMEOUT_SECONDS = float(os.getenv("LLM_IDLE_TIMEOUT_SECONDS", "30"))
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+class LLMTimeoutError(Exception):
+    """LLM 調用的某個階段超時。stage 為 response、first_token、idle，或請求的截止時間先到時為 deadline。"""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"no response from the AI provider within {timeout:.1f}s ({stage})")
+        self.stage = stage
+        self.timeout = timeout
+
+def parse_request_timeout(value: Optional[str]) -> Optional[float]:
+    """解析 X-Request-Timeout 的值（正數秒），格式錯誤時拋出 ValueError。"""
+    if value is None:
+        return None
+    seconds = float(value)
+    if not 0 < seconds <= MAX_REQUEST_TIMEOUT_SECONDS:
+        raise ValueError(f"{DEADLINE_HEADER} must be between 0 and {MAX_REQUEST_TIMEOUT_SECONDS:g} seconds.")
+    return seconds
+
+def set_request_deadline(seconds: Optional[float]) -> contextvars.Token:
+    """為當前請求（及其派生的任務）設置截止時間；返回的 token 用於恢復。"""
+    return _deadline.set(None if seconds is None else time.monotonic() + seconds)
+
+def reset_request_deadline(token: contextvars.Token):
+    _deadline.reset(token)
+
+def remaining_seconds() -> Optional[float]:
+    """距截止時間的秒數，沒有截止時間時返回 None。"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def _budget(stage: str, default: float):
+    remaining = remaining_seconds()
+    if remaining is not None and remaining < default:
+        return "deadline", remaining
+    return stage, default
+
+async def wait_stage(awaitable: Awaitable, stage: str, default: float):
+    """在 min(default, 剩餘時間) 內等待 awaitable，超時拋出 LLMTimeoutError。"""
+    stage, timeout = _budget(stage, default)
+    if timeout <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise LLMTimeoutError(stage, 0.0)
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise LLMTimeoutError(stage, timeout) from None
+
+async def _close_stream(stream):
+    for name in ("aclose", "close"):
+        close = getattr(stream, name, None)
+        if close is None:
+            continue
+        try:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception:
+            pass
+        return
+
+async def iter_with_timeouts(stream, first_token_timeout: Optional[float] = None) -> AsyncIterator:
+    """
+    逐塊轉發流式響應：第一塊最多等 first_token_timeout 秒（默認 LLM_FIRST_TOKEN_TIMEOUT_SECONDS），
+    之後每塊最多等 LLM_IDLE_TIMEOUT_SECONDS 秒，都不超過請求的截止時間。超時拋出 LLMTimeoutError 並關閉底層連接。
+    """
+    iterator = stream.__aiter__()
+    stage = "first_token"
+    timeout = LLM_FIRST_TOKEN_TIMEOUT_SECONDS if first_token_timeout is None else first_token_timeout
+    try:
+        while True:
+            try:
+                chunk = await wait_stage(iterator.__anext__(), stage, timeout)
+            except StopAsyncIteration:
+                return
+            yield chunk
+            stage, timeout = "idle", LLM_IDLE_TIMEOUT_SECONDS
+    finally:
+        await _close_stream(stream)
@@ -0,0 +1,379 @@
+# services/dedup.py
+
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from .pagination import clamp_page_size
+
+# MinHash 签名长度 = 分段数 × 每段行数。16 段 × 4 行时，估计相似度 0.8 的题目对几乎一定会成为候选
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+SHINGLE_SIZE = 3
+# 估计的 Jaccard 相似度达到阈值才视为重复
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.8"))
+# 新题目的分段哈希先放在待合并区（线性扫描），累积到这个数量再并入有序数组
+LSH_PENDING_LIMIT = 4096
+# 超过这个大小的桶通常由公共片段（相同的选项、固定的题干句式）造成，没有区分度，查询与聚类时跳过
+LSH_MAX_BUCKET_SIZE = int(os.getenv("LSH_MAX_BUCKET_SIZE", "64"))
+# PostgreSQL 的序列按分配顺序而不是提交顺序递增：较小的ID可能在较大的ID之后才提交。
+# 同步时重新扫描水位线以下这么多个ID，补上这类晚提交的题目
+QUESTION_INDEX_RESCAN_WINDOW = int(os.getenv("QUESTION_INDEX_RESCAN_WINDOW", "1000"))
+DUPLICATE_MODES = ("keep", "flag", "drop")
+
+# 每次向量化计算签名的题目数，限制临时数组（置换数 × shingle 数）的大小
+SIGNATURE_CHUNK_SIZE = 512
+
+# 固定种子：同一道题在所有进程中得到相同的签名
+_rng = np.random.default_rng(20240611)
+_A = _rng.integers(0, 2**64, size=MINHASH_PERMUTATIONS, dtype=np.uint64, endpoint=False) | np.uint64(1)
+_B = _rng.integers(0, 2**64, size=MINHASH_PERMUTATIONS, dtype=np.uint64, endpoint=False)
+_SHINGLE_WEIGHTS = _rng.integers(0, 2**64, size=SHINGLE_SIZE, dtype=np.uint64, endpoint=False) | np.uint64(1)
+_BAND_WEIGHTS = _rng.integers(1, 2**63, size=LSH_ROWS, dtype=np.uint64) | np.uint64(1)
+_BAND_SALTS = _rng.integers(0, 2**63, size=LSH_BANDS, dtype=np.uint64)
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+# --- Signatures ---
+
+def normalize_question_text(stem: Optional[str], options) -> str:
+    """题干 + 选项，忽略大小写、空白与标点；选项排序后拼接，使打乱选项顺序的题目仍然相同。"""
+    parts = [stem or ""]
+    if isinstance(options, list):
+        parts.extend(sorted(str(option) for option in options if option is not None))
+    return _NON_WORD.sub("", " ".join(parts).lower())
+
+def _signature_chunk(texts: List[str]) -> np.ndarray:
+    lengths = np.array([len(text) for text in texts], dtype=np.int64)
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    # 每个位置上的 3-gram 哈希：码点加权求和（uint64 溢出回绕）后取高 32 位
+    width = len(codes) - SHINGLE_SIZE + 1
+    grams = sum(codes[k:k + width] * _SHINGLE_WEIGHTS[k] for k in range(SHINGLE_SIZE)) >> np.uint64(32)
+    # 只保留不跨越两道题边界的 gram
+    starts = np.cumsum(lengths) - lengths
+    counts = lengths - SHINGLE_SIZE + 1
+    offsets = np.cumsum(counts) - counts
+    grams = grams[np.repeat(starts - offsets, counts) + np.arange(counts.sum())]
+    # multiply-add-shift 哈希族：(a * x + b) >> 32，对 32 位输入是泛哈希，无需取模
+    permuted = (_A[:, None] * grams[None, :] + _B[:, None]) >> np.uint64(32)
+    return np.minimum.reduceat(permuted, offsets, axis=1).astype(np.uint32).T
+
+def minhash_signatures(questions: List[Tuple[Optional[str], object]]) -> List[Optional[np.ndarray]]:
+    """
+    字符 3-gram 的 MinHash 签名，一次计算一批 (题干, 选项)，shingle 的生成与哈希全部在 numpy 中完成。
+    没有任何文字的题目返回 None（不参与去重）。
+    """
+    texts = [normalize_question_text(stem, options) for stem, options in questions]
+    # 不足一个 shingle 的短文本补齐，整段作为唯一的 shingle
+    present = [text.ljust(SHINGLE_SIZE, "\0") for text in texts if text]
+    chunks = [_signature_chunk(present[i:i + SIGNATURE_CHUNK_SIZE]) for i in range(0, len(present), SIGNATURE_CHUNK_SIZE)]
+    signatures = iter(np.concatenate(chunks) if chunks else [])
+    return [next(signatures) if text else None for text in texts]
+
+def minhash_signature(stem: Optional[str], options) -> Optional[np.ndarray]:
+    return minhash_signatures([(stem, options)])[0]
+
+def estimate_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / MINHASH_PERMUTATIONS
+
+def _band_keys(signatures: np.ndarray) -> np.ndarray:
+    """
+    (n, 64) 签名 -> (n, 16) 分段哈希（uint64 乘加，溢出回绕）。
+    每个分段的哈希再异或上该分段的盐，所有分段就可以放进同一个有序数组。
+    """
+    bands = signatures.astype(np.uint64).reshape(-1, LSH_BANDS, LSH_ROWS)
+    return (bands * _BAND_WEIGHTS).sum(axis=2, dtype=np.uint64) ^ _BAND_SALTS
+
+# --- Index ---
+
+class MinHashIndex:
+    """
+    进程内的 LSH 索引。所有分段的哈希放在一个有序数组中，一次查询只需两次二分查找；
+    新插入的题目先进入待合并区（线性扫描），累积到 LSH_PENDING_LIMIT 后一次性并入。
+    被删除的题目只标记为失效，下次合并时不再保留。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.watermark = 0  # 已同步的最大题目ID
+        self._row_of: Dict[int, int] = {}
+        self._size = 0
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._paper_ids = np.zeros(0, dtype=np.int64)
+        self._signatures = np.zeros((0, MINHASH_PERMUTATIONS), dtype=np.uint32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._sorted_keys = np.zeros(0, dtype=np.uint64)
+        self._sorted_rows = np.zeros(0, dtype=np.int64)
+        self._pending_keys = np.zeros((LSH_PENDING_LIMIT, LSH_BANDS), dtype=np.uint64)
+        self._pending_rows = np.zeros(LSH_PENDING_LIMIT, dtype=np.int64)
+        self._pending = 0
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        self._ids = np.resize(self._ids, capacity)
+        self._paper_ids = np.resize(self._paper_ids, capacity)
+        self._alive = np.resize(self._alive, capacity)
+        self._alive[self._size:] = False
+        signatures = np.zeros((capacity, MINHASH_PERMUTATIONS), dtype=np.uint32)
+        signatures[:self._size] = self._signatures[:self._size]
+        self._signatures = signatures
+
+    def add(self, rows: Iterable[Tuple[int, Optional[int], Optional[str], object]]):
+        """rows: 可迭代的 (题目ID, 试卷ID, 题干, 选项)。已索引的题目会被跳过。"""
+        rows = list(rows)
+        if not rows:
+            return
+        watermark = max(row[0] for row in rows)
+        # 重新扫描的窗口中大多是已索引的题目，先跳过它们再计算签名
+        rows = [row for row in rows if row[0] not in self._row_of]
+        signatures = minhash_signatures([(stem, options) for _, _, stem, options in rows]) if rows else []
+        with self._lock:
+            self.watermark = max(self.watermark, watermark)
+            batch = [
+                (question_id, test_paper_id or 0, signature)
+                for (question_id, test_paper_id, _, _), signature in zip(rows, signatures)
+                if signature is not None and question_id not in self._row_of
+            ]
+            if not batch:
+                return
+            self._reserve(len(batch))
+            start = self._size
+            for offset, (question_id, test_paper_id, signature) in enumerate(batch):
+                row = start + offset
+                self._row_of[question_id] = row
+                self._ids[row] = question_id
+                self._paper_ids[row] = test_paper_id
+                self._signatures[row] = signature
+                self._alive[row] = True
+            self._size += len(batch)
+            keys = _band_keys(self._signatures[start:self._size])
+            for offset in range(0, len(keys), LSH_PENDING_LIMIT):
+                chunk = keys[offset:offset + LSH_PENDING_LIMIT]
+                if self._pending + len(chunk) > LSH_PENDING_LIMIT:
+                    self._merge()
+                end = self._pending + len(chunk)
+                self._pending_keys[self._pending:end] = chunk
+                self._pending_rows[self._pending:end] = np.arange(start + offset, start + offset + len(chunk))
+                self._pending = end
+
+    def _merge(self):
+        if not self._pending:
+            return
+        pending = self._pending
+        keys = np.concatenate([self._sorted_keys, self._pending_keys[:pending].ravel()])
+        rows = np.concatenate([self._sorted_rows, np.repeat(self._pending_rows[:pending], LSH_BANDS)])
+        keep = self._alive[rows]
+        keys, rows = keys[keep], rows[keep]
+        order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[order]
+        self._sorted_rows = rows[order]
+        self._pending = 0
+
+    def remove(self, question_ids: Iterable[int]):
+        with self._lock:
+            for question_id in question_ids:
+                row = self._row_of.pop(question_id, None)
+                if row is not None:
+                    self._alive[row] = False
+
+    def retain(self, question_ids: Set[int]):
+        """只保留仍然存在的题目（用于发现其他进程删除的题目）。"""
+        self.remove([question_id for question_id in list(self._row_of) if question_id not in question_ids])
+
+    def query(self, signature: np.ndarray, threshold: float, exclude_test_paper_id: Optional[int] = None) -> List[Tuple[int, int, float]]:
+        """返回 (题目ID, 试卷ID, 估计相似度)，按相似度从高到低排序。"""
+        keys = _band_keys(signature[None, :])[0]
+        with self._lock:
+            lows = self._sorted_keys.searchsorted(keys, side="left")
+            highs = self._sorted_keys.searchsorted(keys, side="right")
+            found = [self._sorted_rows[lo:hi] for lo, hi in zip(lows.tolist(), highs.tolist()) if 0 < hi - lo <= LSH_MAX_BUCKET_SIZE]
+            if self._pending:
+                hits = (self._pending_keys[:self._pending] == keys).any(axis=1)
+                found.append(self._pending_rows[:self._pending][hits])
+            if not found:
+                return []
+            rows = np.unique(np.concatenate(found))
+            rows = rows[self._alive[rows]]
+            if exclude_test_paper_id is not None:
+                rows = rows[self._paper_ids[rows] != exclude_test_paper_id]
+            similarities = np.count_nonzero(self._signatures[rows] == signature, axis=1) / MINHASH_PERMUTATIONS
+            matched = similarities >= threshold
+            rows, similarities = rows[matched], similarities[matched]
+            order = np.argsort(-similarities, kind="stable")
+            return [(int(self._ids[r]), int(self._paper_ids[r]), float(s)) for r, s in zip(rows[order], similarities[order])]
+
+    def pairs(self, threshold: float) -> List[Tuple[int, int, float]]:
+        """所有估计相似度达到阈值的题目对 (题目ID, 题目ID, 相似度)。"""
+        edges: Dict[Tuple[int, int], float] = {}
+        with self._lock:
+            self._merge()
+            keys, rows = self._sorted_keys, self._sorted_rows
+            if len(keys) < 2:
+                return []
+            starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+            sizes = np.diff(np.append(starts, len(keys)))
+            # 大小相同的桶一起向量化比较：(桶数, 大小, 大小) 的相似度矩阵，按批次限制临时数组大小
+            for size in np.unique(sizes[(sizes > 1) & (sizes <= LSH_MAX_BUCKET_SIZE)]).tolist():
+                bucket_starts = starts[sizes == size]
+                step = max(1, (1 << 22) // (size * size * MINHASH_PERMUTATIONS))
+                for i in range(0, len(bucket_starts), step):
+                    buckets = rows[bucket_starts[i:i + step, None] + np.arange(size)]
+                    signatures = self._signatures[buckets]
+                    similarities = np.count_nonzero(signatures[:, :, None, :] == signatures[:, None, :, :], axis=3) / MINHASH_PERMUTATIONS
+                    b, x, y = np.nonzero(np.triu(similarities >= threshold, k=1))
+                    left, right = buckets[b, x], buckets[b, y]
+                    for a, c, similarity in zip(self._ids[left].tolist(), self._ids[right].tolist(), similarities[b, x, y].tolist()):
+                        if a != c:
+                            edges[(min(a, c), max(a, c))] = similarity
+        return [(a, b, similarity) for (a, b), similarity in edges.items()]
+
+    def clear(self):
+        self.__init__()
+
+_index = MinHashIndex()
+
+def sync_question_index(db: Session) -> MinHashIndex:
+    """
+    把ID大于水位线的题目加入索引。任何途径插入的题目（生成、重新生成、JSONL 导入、其他 worker）
+    都在下一次查询前被增量索引，只需一次主键范围查询。
+    SQLite 同一时间只有一个写事务，题目ID（AUTOINCREMENT）按提交顺序递增；其他数据库上
+    额外重新扫描水位线以下 QUESTION_INDEX_RESCAN_WINDOW 个ID，补上晚于更大ID提交的题目。
+    """
+    lower = _index.watermark
+    if db.get_bind().dialect.name != 'sqlite':
+        lower = max(0, lower - QUESTION_INDEX_RESCAN_WINDOW)
+    # 每次查重前都会执行，用 Core 语句避免 ORM 查询的开销
+    rows = db.execute(
+        select(models.DBQuestion.id, models.DBQuestion.test_paper_id, models.DBQuestion.stem, models.DBQuestion.options)
+        .where(models.DBQuestion.id > lower)
+        .order_by(models.DBQuestion.id)
+        .execution_options(yield_per=LSH_PENDING_LIMIT)
+    )
+    for batch in rows.partitions():
+        _index.add(batch)
+    return _index
+
+# --- Public API ---
+
+def find_duplicate_questions(
+    db: Session,
+    stem: Optional[str],
+    options=None,
+    exclude_test_paper_id: Optional[int] = None,
+    threshold: Optional[float] = None,
+) -> List[schemas.DuplicateMatch]:
+    """在题库中查找与给定题目近似重复的题目。"""
+    signature = minhash_signature(stem, options)
+    if signature is None:
+        return []
+    index = sync_question_index(db)
+    matches = index.query(signature, DUPLICATE_THRESHOLD if threshold is None else threshold, exclude_test_paper_id)
+    if not matches:
+        return []
+    # 候选题目可能已被删除（例如试卷被重新生成），确认后从索引中移除
+    ids = [question_id for question_id, _, _ in matches]
+    existing = set(db.scalars(select(models.DBQuestion.id).where(models.DBQuestion.id.in_(ids))))
+    index.remove(set(ids) - existing)
+    return [
+        schemas.DuplicateMatch(question_id=question_id, test_paper_id=test_paper_id or None, similarity=round(similarity, 3))
+        for question_id, test_paper_id, similarity in matches if question_id in existing
+    ]
+
+class StreamDuplicateFilter:
+    """生成过程中逐题检查：既与题库中其他试卷的题目比较，也与本次已生成的题目比较。"""
+
+    def __init__(self, db: Session, test_paper_id: Optional[int] = None, threshold: Optional[float] = None):
+        self.db = db
+        self.test_paper_id = test_paper_id
+        self.threshold = DUPLICATE_THRESHOLD if threshold is None else threshold
+        self._generated: List[Optional[np.ndarray]] = []
+
+    def check(self, question: dict) -> List[schemas.DuplicateMatch]:
+        stem, options = question.get("stem"), question.get("options")
+        signature = minhash_signature(stem, options)
+        if signature is None:
+            return []
+        # 正在重新生成的试卷的旧题目会被替换，不参与比较
+        matches = find_duplicate_questions(self.db, stem, options, self.test_paper_id, self.threshold)
+        for position, previous in enumerate(self._generated):
+            similarity = estimate_similarity(signature, previous) if previous is not None else 0.0
+            if similarity >= self.threshold:
+                matches.append(schemas.DuplicateMatch(generated_index=position, test_paper_id=self.test_paper_id, similarity=round(similarity, 3)))
+        return matches
+
+    def accept(self, question: dict):
+        """记录一道保留下来的题目，之后生成的题目会与它比较。"""
+        self._generated.append(minhash_signature(question.get("stem"), question.get("options")))
+
+def find_duplicate_clusters(db: Session, threshold: Optional[float] = None, limit: Optional[int] = None, offset: int = 0) -> schemas.DuplicateClustersResponse:
+    """
+    列出题库中的重复题目簇（相似度达到阈值的题目对的连通分量），按簇大小从大到小排列。
+    """
+    threshold = DUPLICATE_THRESHOLD if threshold is None else threshold
+    limit = clamp_page_size(limit)
+    index = sync_question_index(db)
+    index.retain({question_id for question_id, in db.query(models.DBQuestion.id)})
+
+    parent: Dict[int, int] = {}
+
+    def find(x: int) -> int:
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    lowest: Dict[int, float] = {}
+    edges = index.pairs(threshold)
+    for a, b, _ in edges:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    members: Dict[int, List[int]] = {}
+    for question_id in parent:
+        members.setdefault(find(question_id), []).append(question_id)
+    for a, _, similarity in edges:
+        root = find(a)
+        lowest[root] = min(lowest.get(root, 1.0), similarity)
+
+    clusters = sorted(members.items(), key=lambda item: (-len(item[1]), item[0]))
+    page = clusters[offset:offset + limit]
+    page_ids = [question_id for _, ids in page for question_id in ids]
+    rows = {
+        row.id: row for row in
+        db.query(models.DBQuestion.id, models.DBQuestion.test_paper_id, models.DBQuestion.question_type,
+                 models.DBQuestion.stem, models.TestPaper.name.label("test_paper_name"))
+        .outerjoin(models.TestPaper, models.DBQuestion.test_paper_id == models.TestPaper.id)
+        .filter(models.DBQuestion.id.in_(page_ids))
+    } if page_ids else {}
+
+    result = []
+    for root, ids in page:
+        questions = [
+            schemas.DuplicateClusterQuestion(
+                id=rows[question_id].id,
+                test_paper_id=rows[question_id].test_paper_id,
+                test_paper_name=rows[question_id].test_paper_name,
+                question_type=rows[question_id].question_type,
+                stem=rows[question_id].stem,
+            )
+            for question_id in sorted(ids) if question_id in rows
+        ]
+        result.append(schemas.DuplicateCluster(size=len(questions), similarity=round(lowest.get(root, 1.0), 3), questions=questions))
+    next_offset = offset + limit if offset + limit < len(clusters) else None
+    return schemas.DuplicateClustersResponse(threshold=threshold, clusters=result, next_offset=next_offset)
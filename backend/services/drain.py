@@ -0,0 +1,78 @@
+# services/drain.py
+
+import os
+import time
+import asyncio
+import threading
+from typing import AsyncIterator, Optional
+
+# 收到 SIGTERM 後最多等待進行中的請求多少秒（即 uvicorn 的 timeout_graceful_shutdown），超時的任務會被取消
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "30"))
+# 截止前多少秒讓仍未結束的生成流保存已生成的部分並結束，而不是被取消後丟失
+DRAIN_CHECKPOINT_MARGIN_SECONDS = float(os.getenv("DRAIN_CHECKPOINT_MARGIN_SECONDS", "5"))
+
+DRAIN_POLL_SECONDS = 0.5
+
+_drain_started: Optional[float] = None
+_drain_lock = threading.Lock()
+
+def begin_drain():
+    """進入排空狀態（由服務器的信號處理函數調用，可重複調用）。"""
+    global _drain_started
+    with _drain_lock:
+        if _drain_started is None:
+            _drain_started = time.monotonic()
+
+def reset_drain():
+    global _drain_started
+    with _drain_lock:
+        _drain_started = None
+
+def is_draining() -> bool:
+    return _drain_started is not None
+
+def checkpoint_deadline() -> Optional[float]:
+    """排空時返回生成流應當結束的 time.monotonic() 時間點，否則返回 None。"""
+    started = _drain_started
+    if started is None:
+        return None
+    return started + max(0.0, DRAIN_TIMEOUT_SECONDS - DRAIN_CHECKPOINT_MARGIN_SECONDS)
+
+class DrainAwareStream:
+    """
+    逐項轉發異步迭代器；進程排空且到達檢查點時間時提前結束迭代，並把 interrupted 置為真，
+    調用方據此保存已收到的部分並告知客戶端。等待下一項期間開始排空（例如模型還在生成一道長題）也會按時結束。
+    """
+
+    def __init__(self, source: AsyncIterator):
+        self._source = source.__aiter__()
+        self.interrupted = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.interrupted:
+            raise StopAsyncIteration
+        pending = asyncio.ensure_future(self._source.__anext__())
+        while True:
+            deadline = checkpoint_deadline()
+            # 未排空時每隔 DRAIN_POLL_SECONDS 檢查一次，不取消正在等待的下一項
+            timeout = DRAIN_POLL_SECONDS if deadline is None else deadline - time.monotonic()
+            if timeout > 0:
+                done, _ = await asyncio.wait((pending,), timeout=timeout)
+                if done:
+                    return pending.result()
+                if deadline is None:
+                    continue
+            break
+        pending.cancel()
+        try:
+            await pending
+        except (asyncio.CancelledError, StopAsyncIteration):
+            pass
+        self.interrupted = True
+        aclose = getattr(self._source, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        raise StopAsyncIteration
@@ -0,0 +1,156 @@
+# services/essay_evaluation.py
+
+import os
+import re
+import asyncio
+import datetime
+import unicodedata
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from . import ai
+from . import database
+from .idempotency import request_fingerprint
+
+# 不屬於任何提交的評估只用作內容緩存，保留這麼多天，由 `python manage.py purge-essay-evaluations` 清理
+ESSAY_EVALUATION_CACHE_TTL_DAYS = int(os.getenv("ESSAY_EVALUATION_CACHE_TTL_DAYS", "30"))
+
+_TABLE = models.EssayEvaluation.__table__
+_STORED = tuple(_TABLE.c[name] for name in models.EssayEvaluation.STORED_FIELDS)
+
+# 本進程中正在評估的內容：cache_key -> Task，內容相同的並發請求共用一次 LLM 調用
+_inflight: Dict[str, asyncio.Task] = {}
+
+def normalize_answer(text: str) -> str:
+    """NFKC 規範化並合併空白，只有全半角或空白不同的作答視為相同。"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', text or '')).strip()
+
+def evaluation_cache_key(question: schemas.QuestionInfo, user_answer: str, evaluation_model: Optional[str], evaluation_prompt: Optional[str]) -> str:
+    """(題幹, 參考答案, 規範化後的作答, 模型, 實際使用的提示詞) 的 SHA-256；默認提示詞修改後舊的評估不再命中。"""
+    prompt = ai.EVALUATE_ESSAY_PROMPT
+    return request_fingerprint(
+        question.stem, question.reference_explanation, normalize_answer(user_answer), evaluation_model,
+        evaluation_prompt or prompt['system_prompt'], prompt['format_instructions'],
+    )
+
+def _find(db: Session, cache_key: str, target: Optional[Tuple[int, int]]) -> Tuple[Optional[Dict], bool]:
+    """
+    返回 (已保存的評估, 是否無需再保存)。沒有 target 時只要有內容相同的評估即無需保存。
+    優先取 target 下的評估，其次是任何內容相同的評估（其他提交或不屬於提交的緩存）。
+    """
+    if target is not None:
+        row = db.execute(
+            select(*_STORED).where(_TABLE.c.result_id == target[0], _TABLE.c.question_id == target[1])
+        ).first()
+        if row is not None and row.cache_key == cache_key:
+            return row._asdict(), True
+    row = db.execute(select(*_STORED).where(_TABLE.c.cache_key == cache_key).limit(1)).first()
+    evaluation = row._asdict() if row is not None else None
+    return evaluation, target is None and evaluation is not None
+
+def _save(db: Session, evaluation: Dict, target: Optional[Tuple[int, int]]):
+    """保存評估（不提交事務）。target 下已有評估時覆蓋（作答或模型變了），依靠唯一約束原子完成。"""
+    if target is None:
+        db.execute(_TABLE.insert().values(**evaluation, created_at=datetime.datetime.utcnow()))
+        return
+    if db.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(_TABLE).values(
+        result_id=target[0], question_id=target[1], **evaluation, created_at=datetime.datetime.utcnow(),
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=['result_id', 'question_id'],
+        set_={name: stmt.excluded[name] for name in (*models.EssayEvaluation.STORED_FIELDS, 'created_at')},
+    ))
+
+async def _evaluate_once(cache_key: str, request: schemas.EvaluateShortAnswerRequest, provider: str, api_key: str,
+                         evaluation_model: Optional[str], evaluation_prompt: Optional[str]) -> schemas.EvaluateShortAnswerResponse:
+    task = _inflight.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(ai.evaluate_essay_with_ai(request, provider, api_key, evaluation_model, evaluation_prompt))
+        _inflight[cache_key] = task
+        # 所有等待者都被取消時也要取出異常，避免 "exception was never retrieved" 警告
+        task.add_done_callback(lambda t: (_inflight.pop(cache_key, None), t.cancelled() or t.exception()))
+    # 發起評估的請求被取消（例如客戶端斷開）時評估繼續進行，結果仍然保存給其他等待者
+    return await asyncio.shield(task)
+
+async def evaluate_and_save_short_answer(
+    db: Session,
+    request: schemas.EvaluateShortAnswerRequest,
+    provider: str,
+    api_key: str,
+    evaluation_model: Optional[str] = None,
+    evaluation_prompt: Optional[str] = None,
+) -> schemas.EvaluateShortAnswerResponse:
+    """
+    評估一道論述題的作答。內容相同的作答復用已保存的評估，不再調用 LLM；
+    請求帶 result_id 和 question_id 時評估保存在這條提交記錄下，歷史記錄詳情直接返回它。
+    """
+    cache_key = evaluation_cache_key(request.question, request.user_answer, evaluation_model, evaluation_prompt)
+    target = None
+    if request.result_id is not None and request.question_id is not None:
+        question = database.get_question_by_id(db, int(request.question_id))
+        result = database.get_test_result_by_id(db, request.result_id)
+        if question.test_paper_id != result.test_paper_id:
+            raise HTTPException(status_code=400, detail=f"Question {question.id} does not belong to the test paper of result {result.id}.")
+        target = (result.id, question.id)
+
+    evaluation, saved = _find(db, cache_key, target)
+    cached = evaluation is not None
+    if not cached:
+        response = await _evaluate_once(cache_key, request, provider, api_key, evaluation_model, evaluation_prompt)
+        evaluation = {
+            'cache_key': cache_key, 'model': evaluation_model,
+            **response.model_dump(include={'score', 'feedback', 'strengths', 'areas_for_improvement'}),
+        }
+        # 並發的相同請求可能已經保存了同一個評估
+        saved = _find(db, cache_key, target)[1]
+    if not saved:
+        _save(db, evaluation, target)
+        db.commit()
+
+    return schemas.EvaluateShortAnswerResponse(
+        score=evaluation['score'],
+        feedback=evaluation['feedback'],
+        strengths=evaluation['strengths'] or [],
+        areas_for_improvement=evaluation['areas_for_improvement'] or [],
+        reference_explanation=request.question.reference_explanation,
+        cached=cached,
+    )
+
+def pop_essay_evaluations(db: Session, result_ids) -> Dict[int, Dict[str, Dict]]:
+    """刪除並返回這些提交的論述題評估 {提交ID: {題目ID字符串: 評估}}（歸檔時與提交記錄一起移走）。"""
+    evaluations: Dict[int, Dict[str, Dict]] = {}
+    if not result_ids:
+        return evaluations
+    rows = db.execute(
+        select(_TABLE.c.result_id, _TABLE.c.question_id, *_STORED)
+        .where(_TABLE.c.result_id.in_(result_ids))
+        .order_by(_TABLE.c.result_id, _TABLE.c.question_id)
+    ).all()
+    for row in rows:
+        fields = row._asdict()
+        result_id, question_id = fields.pop('result_id'), fields.pop('question_id')
+        evaluations.setdefault(result_id, {})[str(question_id)] = fields
+    if rows:
+        db.execute(delete(_TABLE).where(_TABLE.c.result_id.in_(result_ids)))
+    return evaluations
+
+def delete_essay_evaluations(db: Session, result_ids_query) -> int:
+    """刪除一組提交（result_ids_query 為返回提交ID的子查詢）的論述題評估，不提交事務。"""
+    return db.execute(delete(_TABLE).where(_TABLE.c.result_id.in_(result_ids_query))).rowcount
+
+def purge_cached_essay_evaluations(db: Session, older_than_days: Optional[int] = None) -> int:
+    """刪除超過保留期、不屬於任何提交的評估並提交，返回刪除的行數。保存在提交記錄下的評估不受影響。"""
+    days = ESSAY_EVALUATION_CACHE_TTL_DAYS if older_than_days is None else older_than_days
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    deleted = db.execute(delete(_TABLE).where(_TABLE.c.result_id.is_(None), _TABLE.c.created_at < cutoff)).rowcount
+    db.commit()
+    return deleted
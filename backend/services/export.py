@@ -0,0 +1,131 @@
+# services/export.py
+
+import os
+import re
+import datetime
+import zipfile
+from typing import Iterator, List, Optional
+
+import orjson
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy.orm import Session, selectinload
+
+import models
+import schemas
+from .archive import iter_paper_result_rows
+from .search import paper_name_filter
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+
+# 模板在首次使用時編譯一次並由 Environment 緩存；開啟自動轉義，題幹/選項中的 HTML 會被轉義
+_environment = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(["html"]),
+    trim_blocks=True,
+    lstrip_blocks=True,
+    auto_reload=False,
+)
+_environment.globals["letter"] = _environment.filters["letter"] = lambda index: chr(65 + index)  # 0 -> A, 1 -> B ...
+
+def iter_test_paper_html(test_paper: models.TestPaper, include_answers: bool = True) -> Iterator[str]:
+    """按塊生成試卷的 HTML（Jinja2 的 generate 不會一次性拼接整個文檔）。"""
+    questions = [
+        schemas.QuestionModelAdapter.validate_python({
+            'id': str(q.id),
+            'type': q.question_type,
+            'stem': q.stem,
+            'options': q.options,
+            'answer': q.correct_answer,
+        })
+        for q in test_paper.questions
+    ]
+    template = _environment.get_template("test_paper.html")
+    return template.generate(name=test_paper.name, questions=questions, include_answers=include_answers)
+
+def render_test_paper_html(test_paper: models.TestPaper, include_answers: bool = True) -> bytes:
+    return "".join(iter_test_paper_html(test_paper, include_answers)).encode("utf-8")
+
+# --- Bulk ZIP Export ---
+
+# 每批從數據庫取出的試卷/提交記錄數，決定了導出時的內存上限
+EXPORT_PAPER_BATCH_SIZE = int(os.getenv("EXPORT_PAPER_BATCH_SIZE", "50"))
+EXPORT_RESULT_BATCH_SIZE = int(os.getenv("EXPORT_RESULT_BATCH_SIZE", "200"))
+# 壓縮後的數據累積到這個大小就發送給客戶端
+EXPORT_ZIP_CHUNK_SIZE = 64 * 1024
+
+class _ZipSink:
+    """不可 seek 的寫入目標：zipfile 寫入的字節先暫存，由生成器取走後立即清空。"""
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+def _archive_folder(paper: models.TestPaper) -> str:
+    # 文件夾名：<ID>-<名稱>，去掉文件系統不允許的字符
+    name = re.sub(r'[\\/:*?"<>|\s]+', "_", paper.name or "").strip("_")[:60]
+    return f"{paper.id:06d}-{name}" if name else f"{paper.id:06d}"
+
+def filter_papers(db: Session, created_from: Optional[datetime.datetime] = None, created_to: Optional[datetime.datetime] = None,
+                  search: Optional[str] = None, ids: Optional[List[int]] = None):
+    """按創建時間範圍、名稱搜索詞和ID列表篩選試卷，條件之間為“且”。"""
+    query = db.query(models.TestPaper)
+    if created_from:
+        query = query.filter(models.TestPaper.created_at >= created_from)
+    if created_to:
+        query = query.filter(models.TestPaper.created_at < created_to)
+    if search:
+        query = query.filter(paper_name_filter(db, search))
+    if ids:
+        query = query.filter(models.TestPaper.id.in_(ids))
+    return query
+
+def iter_papers_zip(db: Session, query, include_answers: bool = True, include_results: bool = True) -> Iterator[bytes]:
+    """
+    以流的方式生成包含多份試卷的 ZIP：每份試卷一個 paper.html，以及其提交記錄的 results.json。
+    試卷和提交記錄都按批次通過游標讀取，整個過程只在內存中保留當前批次與當前文件的壓縮緩衝。
+    """
+    sink = _ZipSink()
+    papers = (
+        query
+        .options(selectinload(models.TestPaper.questions))
+        .order_by(models.TestPaper.id)
+        .yield_per(EXPORT_PAPER_BATCH_SIZE)
+    )
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for paper in papers:
+            folder = _archive_folder(paper)
+            with archive.open(f"{folder}/paper.html", mode="w", force_zip64=True) as entry:
+                for chunk in iter_test_paper_html(paper, include_answers):
+                    entry.write(chunk.encode("utf-8"))
+                    if sink.size >= EXPORT_ZIP_CHUNK_SIZE:
+                        yield sink.drain()
+            yield sink.drain()
+
+            if not include_results:
+                continue
+            # 包括已歸檔的提交記錄
+            results = iter_paper_result_rows(db, paper.id, EXPORT_RESULT_BATCH_SIZE)
+            with archive.open(f"{folder}/results.json", mode="w", force_zip64=True) as entry:
+                entry.write(b"[")
+                for i, row in enumerate(results):
+                    entry.write((b",\n" if i else b"\n") + orjson.dumps(row))
+                    if sink.size >= EXPORT_ZIP_CHUNK_SIZE:
+                        yield sink.drain()
+                entry.write(b"\n]\n")
+            yield sink.drain()
+            # 已寫出的試卷不再需要，避免 identity map 隨導出數量增長
+            db.expunge(paper)
+    yield sink.drain()
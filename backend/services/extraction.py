@@ -0,0 +1,236 @@
+# services/extraction.py
+
+import os
+import codecs
+import asyncio
+import hashlib
+import zipfile
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from xml.etree import ElementTree
+
+from fastapi import HTTPException, UploadFile
+
+# 上傳的知識源文件大小上限（字節）
+SOURCE_UPLOAD_MAX_BYTES = int(os.getenv("SOURCE_UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+SOURCE_UPLOAD_CHUNK_SIZE = 256 * 1024
+# 提取文本的進程數；為 0 時在當前進程的線程池中提取
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+# 小於這個大小的純文本直接在請求中解碼，不經過進程池
+EXTRACTION_INLINE_BYTES = 256 * 1024
+# 進程內按文件哈希緩存多少份提取結果
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "32"))
+# 單個文件的提取時間上限（秒），超時的工作進程被終止
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "60"))
+# DOCX 中 word/document.xml 解壓後的大小上限（字節），防止壓縮炸彈
+DOCX_DOCUMENT_MAX_BYTES = int(os.getenv("DOCX_DOCUMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+
+PDF_MAGIC = b"%PDF-"
+ZIP_MAGIC = b"PK\x03\x04"
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+class UnsupportedDocumentError(ValueError):
+    """文件格式不受支持或無法從中提取文本。在工作進程中拋出，可以跨進程傳遞。"""
+
+# --- Format Detection & Extraction ---
+# 以下函數在工作進程中運行，只依賴標準庫（PDF 需要 pypdf，按需導入）。
+
+def detect_document_kind(data: bytes, filename: Optional[str] = None) -> str:
+    """根據文件頭（其次是擴展名）判斷類型：pdf、docx 或 text（包括 Markdown）。"""
+    if data.startswith(PDF_MAGIC):
+        return "pdf"
+    if data.startswith(ZIP_MAGIC):
+        return "docx"
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension == ".pdf":
+        return "pdf"
+    if extension == ".docx":
+        return "docx"
+    return "text"
+
+def decode_text(data: bytes) -> str:
+    """按 BOM、UTF-8、charset-normalizer 檢測結果、GB18030 的順序嘗試解碼，二進制內容拋出 UnsupportedDocumentError。"""
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return data.decode(encoding)
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        pass
+    if b"\x00" in data[:8192]:
+        raise UnsupportedDocumentError("The file looks like a binary file, not text.")
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        from_bytes = None
+    if from_bytes is not None:
+        best = from_bytes(data).best()
+        if best is not None:
+            return str(best)
+    try:
+        return data.decode("gb18030")
+    except UnicodeDecodeError:
+        raise UnsupportedDocumentError("Could not detect the text encoding of the file.")
+
+def _extract_docx(data: bytes) -> str:
+    import io
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            info = archive.getinfo("word/document.xml")
+            # file_size 來自文件頭，可能被偽造，因此讀取時也限制長度
+            if info.file_size > DOCX_DOCUMENT_MAX_BYTES:
+                raise UnsupportedDocumentError("The DOCX document is too large to extract.")
+            with archive.open(info) as member:
+                document = member.read(DOCX_DOCUMENT_MAX_BYTES + 1)
+            if len(document) > DOCX_DOCUMENT_MAX_BYTES:
+                raise UnsupportedDocumentError("The DOCX document is too large to extract.")
+    except (zipfile.BadZipFile, KeyError):
+        raise UnsupportedDocumentError("The file is not a valid DOCX document.")
+    paragraphs, parts = [], []
+    for event, element in ElementTree.iterparse(io.BytesIO(document), events=("end",)):
+        tag = element.tag
+        if tag == f"{_WORD_NS}t":
+            parts.append(element.text or "")
+        elif tag == f"{_WORD_NS}tab":
+            parts.append("\t")
+        elif tag in (f"{_WORD_NS}br", f"{_WORD_NS}cr"):
+            parts.append("\n")
+        elif tag == f"{_WORD_NS}p":
+            paragraphs.append("".join(parts))
+            parts = []
+            element.clear()
+    return "\n".join(paragraphs)
+
+def _extract_pdf(data: bytes) -> str:
+    import io
+    try:
+        from pypdf import PdfReader
+        from pypdf.errors import PdfReadError
+    except ImportError:
+        raise UnsupportedDocumentError("PDF support requires the pypdf package.")
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        return "\n\n".join((page.extract_text() or "").strip() for page in reader.pages)
+    except (PdfReadError, ValueError, KeyError) as e:
+        raise UnsupportedDocumentError(f"Could not read the PDF: {e}")
+
+def extract_text(kind: str, data: bytes) -> str:
+    """提取文本並統一換行。Markdown 按原文保留，標題和列表的結構對生成題目有用。"""
+    if kind == "pdf":
+        text = _extract_pdf(data)
+    elif kind == "docx":
+        text = _extract_docx(data)
+    else:
+        text = decode_text(data)
+    return text.replace("\r\n", "\n").replace("\r", "\n").strip()
+
+# --- Process Pool ---
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if EXTRACTION_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # 服務進程中有其他線程在運行，不使用 fork 啟動工作進程
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS, mp_context=multiprocessing.get_context(method))
+        return _pool
+
+def _discard_pool(pool: ProcessPoolExecutor, kill: bool = False):
+    """丟棄損壞或卡住的進程池，下次提取時重新建立。kill 為 True 時終止其中仍在運行的工作進程。"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    if kill:
+        # ProcessPoolExecutor 沒有公開的終止接口；池中其他進行中的提取會收到 BrokenProcessPool 並重試
+        for process in list((getattr(pool, '_processes', None) or {}).values()):
+            process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+async def _extract_in_pool(kind: str, data: bytes) -> str:
+    """
+    在進程池中提取文本。工作進程崩潰（例如惡意文件導致內存耗盡）時重建進程池並重試一次，
+    仍然失敗返回 503；超過 EXTRACTION_TIMEOUT_SECONDS 時終止工作進程並返回 422。
+    """
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        pool = _get_pool()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(pool, extract_text, kind, data), EXTRACTION_TIMEOUT_SECONDS)
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            if attempt:
+                raise HTTPException(status_code=503, detail="Text extraction failed, please retry.", headers={"Retry-After": "1"})
+        except asyncio.TimeoutError:
+            if pool is not None:
+                _discard_pool(pool, kill=True)
+            raise HTTPException(
+                status_code=422, detail=f"Text extraction took longer than {EXTRACTION_TIMEOUT_SECONDS:g} seconds.")
+
+def shutdown_extraction_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+# --- Upload Ingestion ---
+
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+async def read_upload_limited(upload: UploadFile, max_bytes: Optional[int] = None) -> bytes:
+    """分塊讀取上傳文件，超過大小上限時立即返回 413，不會把超大文件整個讀入內存。"""
+    limit = max_bytes or SOURCE_UPLOAD_MAX_BYTES
+    if upload.size is not None and upload.size > limit:
+        raise HTTPException(status_code=413, detail=f"File is larger than the {limit} byte limit.")
+    buffer = bytearray()
+    while chunk := await upload.read(SOURCE_UPLOAD_CHUNK_SIZE):
+        buffer += chunk
+        if len(buffer) > limit:
+            raise HTTPException(status_code=413, detail=f"File is larger than the {limit} byte limit.")
+    return bytes(buffer)
+
+async def extract_upload_text(upload: UploadFile) -> str:
+    """
+    讀取上傳的知識源文件並提取文本（PDF、DOCX、Markdown 或任意編碼的純文本）。
+    提取在進程池中進行，不阻塞事件循環；結果按文件內容的 SHA-256 緩存，重新上傳同一文件時直接返回。
+    """
+    data = await read_upload_limited(upload)
+    digest = hashlib.sha256(data).hexdigest()
+    with _cache_lock:
+        if digest in _cache:
+            _cache.move_to_end(digest)
+            return _cache[digest]
+
+    kind = detect_document_kind(data, upload.filename)
+    try:
+        if kind == "text" and len(data) <= EXTRACTION_INLINE_BYTES:
+            text = extract_text(kind, data)
+        else:
+            text = await _extract_in_pool(kind, data)
+    except UnsupportedDocumentError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    if not text:
+        raise HTTPException(status_code=400, detail="No text could be extracted from the uploaded file.")
+
+    with _cache_lock:
+        _cache[digest] = text
+        _cache.move_to_end(digest)
+        while len(_cache) > EXTRACTION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return text
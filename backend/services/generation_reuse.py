@@ -0,0 +1,88 @@
+# services/generation_reuse.py
+
+import re
+import json
+import hashlib
+import unicodedata
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session, selectinload
+
+import models
+import schemas
+
+# 哈希算法或規範化規則變化時遞增，舊哈希自然不再匹配
+CONTENT_HASH_VERSION = 1
+REUSE_MODES = ("off", "serve", "clone")
+
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+def normalize_source_content(source_content: Optional[str]) -> str:
+    """統一 Unicode 形式與換行、去掉行尾空白和多餘空行，使重新上傳的同一份文檔得到相同的哈希。"""
+    text = unicodedata.normalize("NFC", source_content or "")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+def generation_content_hash(source_content: Optional[str], config: schemas.GenerateTestConfig, generation_prompt: Optional[str], generation_model: Optional[str]) -> str:
+    """(規範化的知識源, 生成配置, 提示, 模型) 的 SHA-256，相同輸入的生成結果可以互相替代。"""
+    payload = {
+        "v": CONTENT_HASH_VERSION,
+        "source": normalize_source_content(source_content),
+        "config": config.model_dump(mode="json"),
+        "prompt": generation_prompt or "",
+        "model": generation_model or "",
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+def find_reusable_test_paper(db: Session, content_hash: str) -> Optional[models.TestPaper]:
+    """返回內容哈希相同且已經生成了題目的最新試卷。"""
+    return (
+        db.query(models.TestPaper)
+        .options(selectinload(models.TestPaper.questions))
+        .filter(
+            models.TestPaper.content_hash == content_hash,
+            (models.TestPaper.total_objective_questions + models.TestPaper.total_essay_questions) > 0,
+        )
+        .order_by(models.TestPaper.created_at.desc(), models.TestPaper.id.desc())
+        .first()
+    )
+
+def clone_test_paper(db: Session, source: models.TestPaper, name: Optional[str] = None) -> models.TestPaper:
+    """複製試卷及其題目（不複製提交記錄），新試卷有自己的ID，可以獨立重新生成或刪除。"""
+    clone = models.TestPaper(
+        name=name or source.name,
+        source_hash=source.source_hash,  # 原文按哈希共享，無需複製
+        config=source.config,
+        generation_prompt=source.generation_prompt,
+        total_objective_questions=source.total_objective_questions,
+        total_essay_questions=source.total_essay_questions,
+        content_hash=source.content_hash,
+    )
+    clone.questions = [
+        models.DBQuestion(
+            question_type=q.question_type,
+            stem=q.stem,
+            options=q.options,
+            correct_answer=q.correct_answer,
+        )
+        for q in sorted(source.questions, key=lambda q: q.id)
+    ]
+    db.add(clone)
+    db.commit()
+    db.refresh(clone)
+    return clone
+
+def reuse_test_paper(db: Session, content_hash: str, mode: str, name: Optional[str] = None) -> Optional[Tuple[models.TestPaper, int]]:
+    """
+    按 mode 複用已有的生成結果：serve 直接返回已有試卷，clone 複製為一份新試卷。
+    返回 (試卷, 被複用的試卷ID)；沒有可複用的試卷或 mode 為 off 時返回 None，由調用方照常生成。
+    """
+    if mode == "off":
+        return None
+    source = find_reusable_test_paper(db, content_hash)
+    if source is None:
+        return None
+    paper = source if mode == "serve" else clone_test_paper(db, source, name)
+    return paper, source.id
@@ -1,6 +1,6 @@
 # services/grading.py
 
-from typing import Dict, Any, Callable, List
+from typing import Dict, Any, Callable, List, Optional, Tuple
 import schemas
 import models
 
@@ -56,6 +56,57 @@ def grade_objective_question(question: models.DBQuestion, user_answer: schemas.U
         return False
     return grading_func(user_answer, question.correct_answer or {})
 
+# --- Compiled Answer Keys ---
+# 預先把標準答案規整為緊湊結構（集合、去空白的元組），批改時只做一次比較。
+# 語義與上面的策略函數保持一致。
+
+def _compile_single_choice(correct_answer: Any) -> Optional[int]:
+    return correct_answer.get('index') if isinstance(correct_answer, dict) else None
+
+def _compile_multiple_choice(correct_answer: Any) -> frozenset:
+    return frozenset(correct_answer.get('indexes', []) if isinstance(correct_answer, dict) else [])
+
+def _compile_fill_in_blank(correct_answer: Any) -> Tuple[str, ...]:
+    if isinstance(correct_answer, dict):
+        correct_texts = correct_answer.get('texts', [])
+    elif isinstance(correct_answer, list):
+        correct_texts = correct_answer
+    else:
+        correct_texts = []
+    return tuple(str(text).strip() for text in correct_texts)
+
+def _grade_compiled_single_choice(user_answer: schemas.UserAnswer, key: Optional[int]) -> bool:
+    return user_answer.answer_index is not None and user_answer.answer_index == key
+
+def _grade_compiled_multiple_choice(user_answer: schemas.UserAnswer, key: frozenset) -> bool:
+    return frozenset(user_answer.answer_indices or []) == key
+
+def _grade_compiled_fill_in_blank(user_answer: schemas.UserAnswer, key: Tuple[str, ...]) -> bool:
+    user_texts = user_answer.answer_texts or []
+    if not key:
+        return not any(user_texts)
+    if len(user_texts) < len(key):
+        user_texts = user_texts + [''] * (len(key) - len(user_texts))
+    return all(user_text.strip() == correct_text for user_text, correct_text in zip(user_texts, key))
+
+COMPILED_GRADING_STRATEGIES: Dict[str, Tuple[Callable[[Any], Any], Callable[[schemas.UserAnswer, Any], bool]]] = {
+    'single_choice': (_compile_single_choice, _grade_compiled_single_choice),
+    'multiple_choice': (_compile_multiple_choice, _grade_compiled_multiple_choice),
+    'fill_in_the_blank': (_compile_fill_in_blank, _grade_compiled_fill_in_blank),
+}
+
+def compile_answer(question_type: str, correct_answer: Any) -> Any:
+    """把一道客觀題的標準答案編譯為批改用的緊湊結構；非客觀題返回 None。"""
+    strategy = COMPILED_GRADING_STRATEGIES.get(question_type)
+    return strategy[0](correct_answer or {}) if strategy else None
+
+def grade_compiled_answer(question_type: str, key: Any, user_answer: schemas.UserAnswer) -> bool:
+    """使用編譯後的標準答案批改單個客觀題。"""
+    strategy = COMPILED_GRADING_STRATEGIES.get(question_type)
+    if not strategy:
+        return False
+    return strategy[1](user_answer, key)
+
 def get_formatted_user_answer(question: models.DBQuestion, user_answer: schemas.UserAnswer) -> Any:
     """獲取用於AI prompt或展示的用戶答案的原始格式。"""
     q_type = question.question_type
@@ -0,0 +1,163 @@
+# services/idempotency.py
+
+import os
+import time
+import asyncio
+import hashlib
+import datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+import models
+
+# 已完成請求的響應保留多久（秒），期間同一個鍵的重試直接返回保存的響應
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", str(24 * 3600)))
+# 執行中的請求佔用鍵的時長上限；處理它的進程崩潰後，過了這個時間鍵會被釋放
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "600"))
+# 同一個鍵正由其他進程處理時最多等待多久，超時返回 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "120"))
+IDEMPOTENCY_POLL_SECONDS = 0.25
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# 本進程中正在執行的請求：(scope, key) -> (指紋, 響應 JSON 的 Future)，重試直接等待同一個結果
+_inflight: Dict[Tuple[str, str], Tuple[str, asyncio.Future]] = {}
+
+def request_fingerprint(*parts) -> str:
+    """請求內容（任意可 JSON 序列化的值）的 SHA-256。"""
+    return hashlib.sha256(orjson.dumps(parts, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+def _replay(status_code: int, body: bytes) -> Response:
+    return Response(content=body, status_code=status_code, media_type="application/json", headers={REPLAYED_HEADER: "true"})
+
+def _mismatch():
+    return HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request.")
+
+def _claim(db: Session, scope: str, key: str, fingerprint: str) -> Optional[models.IdempotencyKey]:
+    """
+    嘗試佔用鍵。成功時返回 None；鍵已被佔用時返回已有的記錄。
+    過期的記錄先刪除；插入依靠主鍵衝突保證多個進程中只有一個成功。
+    """
+    table = models.IdempotencyKey
+    now = datetime.datetime.utcnow()
+    db.execute(delete(table).where(table.scope == scope, table.key == key, table.expires_at < now))
+    if db.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    claimed = db.execute(
+        insert(table).values(
+            scope=scope, key=key, fingerprint=fingerprint, created_at=now,
+            expires_at=now + datetime.timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+        ).on_conflict_do_nothing(index_elements=['scope', 'key'])
+    ).rowcount
+    db.commit()
+    if claimed:
+        return None
+    return db.get(table, (scope, key), populate_existing=True)
+
+def _complete(db: Session, scope: str, key: str, body: bytes):
+    table = models.IdempotencyKey
+    expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=IDEMPOTENCY_KEY_TTL_SECONDS)
+    db.execute(
+        update(table).where(table.scope == scope, table.key == key)
+        .values(status_code=200, response=body, expires_at=expires_at)
+    )
+    db.commit()
+
+def _release(db: Session, scope: str, key: str):
+    """請求失敗時刪除佔用的鍵，客戶端可以用同一個鍵重試。"""
+    db.rollback()
+    table = models.IdempotencyKey
+    db.execute(delete(table).where(table.scope == scope, table.key == key, table.status_code.is_(None)))
+    db.commit()
+
+async def _wait_for_other_worker(db: Session, scope: str, key: str, fingerprint: str) -> Optional[Response]:
+    """輪詢其他進程正在處理的同一個鍵。返回保存的響應；鍵被釋放（原請求失敗）時返回 None。"""
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+        row = db.get(models.IdempotencyKey, (scope, key), populate_existing=True)
+        db.commit()
+        if row is None or row.fingerprint != fingerprint:
+            return None
+        if row.status_code is not None:
+            return _replay(row.status_code, row.response)
+    raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress.", headers={"Retry-After": "5"})
+
+async def run_idempotent(
+    db: Session,
+    scope: str,
+    key: Optional[str],
+    fingerprint: str,
+    execute: Callable[[], Awaitable[BaseModel]],
+):
+    """
+    按 Idempotency-Key 執行一次請求。沒有鍵時直接執行。
+    - 第一次請求執行 execute，成功後保存響應 JSON（保留 IDEMPOTENCY_KEY_TTL_SECONDS 秒）；失敗時釋放鍵。
+    - 重試時返回保存的響應（帶 Idempotent-Replayed 頭）；原請求仍在執行時等待它的結果。
+    - 同一個鍵用於內容不同的請求時返回 422。
+    """
+    if not key:
+        return await execute()
+    if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {IDEMPOTENCY_KEY_MAX_LENGTH} characters.")
+
+    while True:
+        inflight = _inflight.get((scope, key))
+        if inflight is not None:
+            inflight_fingerprint, future = inflight
+            if inflight_fingerprint != fingerprint:
+                raise _mismatch()
+            try:
+                return _replay(200, await asyncio.shield(future))
+            except asyncio.CancelledError:
+                # 原請求被取消（例如客戶端斷開）時重新嘗試佔用鍵；本請求自身被取消時照常拋出
+                if not future.cancelled():
+                    raise
+                continue
+
+        existing = _claim(db, scope, key, fingerprint)
+        if existing is None:
+            break
+        if existing.fingerprint != fingerprint:
+            raise _mismatch()
+        if existing.status_code is not None:
+            return _replay(existing.status_code, existing.response)
+        replayed = await _wait_for_other_worker(db, scope, key, fingerprint)
+        if replayed is not None:
+            return replayed
+
+    future = asyncio.get_running_loop().create_future()
+    # 沒有重試在等待時也要取出異常，避免 "exception was never retrieved" 警告
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _inflight[(scope, key)] = (fingerprint, future)
+    try:
+        result = await execute()
+        body = orjson.dumps(result.model_dump(mode="json"))
+        _complete(db, scope, key, body)
+        future.set_result(body)
+        return result
+    except asyncio.CancelledError:
+        _release(db, scope, key)
+        future.cancel()
+        raise
+    except Exception as e:
+        _release(db, scope, key)
+        future.set_exception(e)
+        raise
+    finally:
+        _inflight.pop((scope, key), None)
+
+def purge_expired_idempotency_keys(db: Session) -> int:
+    """刪除過期的鍵並提交，返回刪除的行數。"""
+    table = models.IdempotencyKey
+    deleted = db.execute(delete(table).where(table.expires_at < datetime.datetime.utcnow())).rowcount
+    db.commit()
+    return deleted
@@ -0,0 +1,218 @@
+# services/item_analysis.py
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
+
+import models
+import schemas
+from .archive import iter_archived_results
+
+# 上下分组各取总分排名前/后 27% 的学生（经典项目分析的惯例）
+GROUP_FRACTION = 0.27
+ITEM_ANALYSIS_CACHE_SIZE = int(os.getenv("ITEM_ANALYSIS_CACHE_SIZE", "64"))
+
+# --- Response Matrices ---
+
+class ResponseMatrices:
+    """
+    一份试卷所有提交的作答矩阵。
+    - correct: 学生 × 客观题 的 0/1 得分矩阵
+    - picks: 学生 × 全部选项 的 one-hot 选择矩阵，第 j 题的选项位于 option_offsets[j]:option_offsets[j+1]
+    """
+    def __init__(self, questions: List[models.DBQuestion], results: List[Tuple[list, list]]):
+        self.questions = questions
+        option_sizes = [len(q.options or []) if q.question_type in ('single_choice', 'multiple_choice') else 0 for q in questions]
+        self.option_offsets = np.concatenate([[0], np.cumsum(option_sizes)]).astype(np.int64)
+        column_of = {str(q.id): j for j, q in enumerate(questions)}
+
+        correct_rows, correct_cols, pick_rows, pick_cols = [], [], [], []
+        for i, (user_answers, grading_results) in enumerate(results):
+            for grade in grading_results or []:
+                if isinstance(grade, dict) and grade.get('is_correct'):
+                    j = column_of.get(str(grade.get('question_id')))
+                    if j is not None:
+                        correct_rows.append(i)
+                        correct_cols.append(j)
+            for answer in user_answers or []:
+                if not isinstance(answer, dict):
+                    continue
+                j = column_of.get(str(answer.get('question_id')))
+                if j is None or not option_sizes[j]:
+                    continue
+                picked = [answer['answer_index']] if answer.get('answer_index') is not None else (answer.get('answer_indices') or [])
+                for option_index in picked:
+                    if isinstance(option_index, int) and 0 <= option_index < option_sizes[j]:
+                        pick_rows.append(i)
+                        pick_cols.append(self.option_offsets[j] + option_index)
+
+        n_students = len(results)
+        self.correct = np.zeros((n_students, len(questions)), dtype=np.float64)
+        self.correct[correct_rows, correct_cols] = 1.0
+        self.picks = np.zeros((n_students, int(self.option_offsets[-1])), dtype=np.float64)
+        self.picks[pick_rows, pick_cols] = 1.0
+
+# --- Vectorized Metrics ---
+
+def _column_correlation(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """逐列计算 a[:, j] 与 b[:, j]（或与一维向量 b）的 Pearson 相关系数，零方差列返回 NaN。"""
+    if b.ndim == 1:
+        b = b[:, None]
+    a_centered = a - a.mean(axis=0)
+    b_centered = b - b.mean(axis=0)
+    numerator = (a_centered * b_centered).mean(axis=0)
+    denominator = a_centered.std(axis=0) * b_centered.std(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), np.nan)
+
+def compute_item_metrics(matrices: ResponseMatrices) -> Dict[str, np.ndarray]:
+    """计算难度、点二列相关区分度、上下组区分度、干扰项分析与 KR-20 信度。"""
+    X = matrices.correct
+    n_students, n_items = X.shape
+    totals = X.sum(axis=1)
+
+    difficulty = X.mean(axis=0) if n_students else np.full(n_items, np.nan)
+    # 校正后的点二列相关：题目得分与“其余题目总分”的相关，避免题目自身抬高相关
+    rest_scores = totals[:, None] - X
+    point_biserial = _column_correlation(X, rest_scores) if n_students > 1 else np.full(n_items, np.nan)
+
+    group_size = max(1, int(round(n_students * GROUP_FRACTION))) if n_students else 0
+    if group_size:
+        order = np.argsort(totals, kind='stable')
+        lower, upper = order[:group_size], order[-group_size:]
+        upper_correct, lower_correct = X[upper].mean(axis=0), X[lower].mean(axis=0)
+        upper_picks, lower_picks = matrices.picks[upper].mean(axis=0), matrices.picks[lower].mean(axis=0)
+    else:
+        upper_correct = lower_correct = np.full(n_items, np.nan)
+        upper_picks = lower_picks = np.full(matrices.picks.shape[1], np.nan)
+
+    pick_rate = matrices.picks.mean(axis=0) if n_students else np.full(matrices.picks.shape[1], np.nan)
+    option_point_biserial = _column_correlation(matrices.picks, totals) if n_students > 1 else np.full(matrices.picks.shape[1], np.nan)
+
+    variance = totals.var() if n_students else 0.0
+    if n_items > 1 and variance > 0:
+        kr20 = (n_items / (n_items - 1)) * (1 - np.sum(difficulty * (1 - difficulty)) / variance)
+    else:
+        kr20 = np.nan
+
+    return {
+        'totals': totals,
+        'difficulty': difficulty,
+        'point_biserial': point_biserial,
+        'discrimination_index': upper_correct - lower_correct,
+        'pick_rate': pick_rate,
+        'upper_pick_rate': upper_picks,
+        'lower_pick_rate': lower_picks,
+        'option_point_biserial': option_point_biserial,
+        'kr20': np.float64(kr20),
+    }
+
+# --- Loading & Caching ---
+
+def _number(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else round(value, 4)
+
+def _answer_keys(question: models.DBQuestion) -> set:
+    answer = question.correct_answer or {}
+    if not isinstance(answer, dict):
+        return set()
+    if question.question_type == 'single_choice':
+        return {answer.get('index')}
+    return set(answer.get('indexes') or [])
+
+def _build_response(paper: models.TestPaper, matrices: ResponseMatrices, metrics: Dict[str, np.ndarray]) -> schemas.ItemAnalysisResponse:
+    items = []
+    for j, question in enumerate(matrices.questions):
+        start, end = matrices.option_offsets[j], matrices.option_offsets[j + 1]
+        keys = _answer_keys(question)
+        options = [
+            schemas.OptionAnalysis(
+                index=k,
+                is_key=k in keys,
+                pick_rate=_number(metrics['pick_rate'][start + k]),
+                upper_pick_rate=_number(metrics['upper_pick_rate'][start + k]),
+                lower_pick_rate=_number(metrics['lower_pick_rate'][start + k]),
+                point_biserial=_number(metrics['option_point_biserial'][start + k]),
+            )
+            for k in range(end - start)
+        ]
+        items.append(schemas.ItemAnalysis(
+            question_id=str(question.id),
+            question_type=question.question_type,
+            difficulty=_number(metrics['difficulty'][j]),
+            point_biserial=_number(metrics['point_biserial'][j]),
+            discrimination_index=_number(metrics['discrimination_index'][j]),
+            options=options,
+        ))
+
+    totals = metrics['totals']
+    return schemas.ItemAnalysisResponse(
+        test_paper_id=paper.id,
+        students=int(totals.shape[0]),
+        items_count=len(items),
+        mean_score=_number(totals.mean()) if totals.size else None,
+        score_std=_number(totals.std()) if totals.size else None,
+        kr20=_number(metrics['kr20']),
+        items=items,
+    )
+
+_cache: "OrderedDict[int, Tuple[Tuple[int, int, int], schemas.ItemAnalysisResponse]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def get_item_analysis(db: Session, test_paper_id: int) -> schemas.ItemAnalysisResponse:
+    """
+    返回一份试卷的经典项目分析结果。
+    结果按 (最新提交 id, 提交数, 最新题目 id) 缓存：新增/删除提交或重新生成题目后自动失效，否则直接复用。
+    """
+    paper = db.query(models.TestPaper).options(load_only(models.TestPaper.id)).filter(models.TestPaper.id == test_paper_id).first()
+    if not paper:
+        raise HTTPException(status_code=404, detail=f"Test with ID {test_paper_id} not found.")
+
+    # 歸檔的提交同樣計入分析；歸檔只是移動記錄，不改變 (最大ID, 總數)，因此不會使緩存失效
+    latest_result_id, result_count = 0, 0
+    for model in (models.TestPaperResult, models.ArchivedTestPaperResult):
+        latest, count = db.query(
+            func.coalesce(func.max(model.id), 0),
+            func.count(model.id),
+        ).filter(model.test_paper_id == test_paper_id).one()
+        latest_result_id, result_count = max(latest_result_id, latest), result_count + count
+    latest_question_id = db.query(
+        func.coalesce(func.max(models.DBQuestion.id), 0)
+    ).filter(models.DBQuestion.test_paper_id == test_paper_id).scalar()
+    version = (latest_result_id, result_count, latest_question_id)
+
+    with _cache_lock:
+        cached = _cache.get(test_paper_id)
+        if cached and cached[0] == version:
+            _cache.move_to_end(test_paper_id)
+            return cached[1]
+
+    questions = (
+        db.query(models.DBQuestion)
+        .filter(models.DBQuestion.test_paper_id == test_paper_id, models.DBQuestion.question_type != 'essay')
+        .order_by(models.DBQuestion.id)
+        .all()
+    )
+    results = (
+        db.query(models.TestPaperResult.user_answers, models.TestPaperResult.grading_results)
+        .filter(models.TestPaperResult.test_paper_id == test_paper_id)
+        .order_by(models.TestPaperResult.id)
+        .all()
+    )
+    results += [(row.user_answers, row.grading_results) for row in iter_archived_results(db, test_paper_id)]
+    matrices = ResponseMatrices(questions, results)
+    response = _build_response(paper, matrices, compute_item_metrics(matrices))
+
+    with _cache_lock:
+        _cache[test_paper_id] = (version, response)
+        _cache.move_to_end(test_paper_id)
+        while len(_cache) > ITEM_ANALYSIS_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return response
@@ -1,6 +1,11 @@
 # services/orchestration.py
 
-from typing import List
+import asyncio
+from collections import Counter
+from statistics import mean as statistics_mean, median as statistics_median
+from typing import List, Union
+from fastapi import HTTPException
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 import models
@@ -8,70 +13,180 @@ import schemas
 from . import database
 from . import grading
 from . import ai
-async def grade_and_save_test(
-    db: Session,
-    request: schemas.GradeQuestionsRequest,
-    provider: str,
-    api_key: str
-):
-    """Grades a test submission, calculates statistics, and saves everything."""
-    test_paper = database.get_test_paper_by_id(db, int(request.test_id))
-    questions_map = {str(q.id): q for q in test_paper.questions}
+from . import statistics
+from . import speculation
+from .question_feedback import save_question_feedback
+from .idempotency import request_fingerprint
+from .answer_key import AnswerKey, get_answer_key
+from .bulk_upload import BULK_GRADE_MAX_SUBMISSIONS
 
+def _grade_answers(answer_key: AnswerKey, answers: List[schemas.UserAnswer]) -> List[Union[schemas.ObjectiveGradeResult, schemas.EssayGradeResult]]:
+    """Grades one submission against a compiled answer key."""
     grading_results = []
 
     # Grade submitted answers
-    for user_answer in request.answers:
-        question = questions_map.get(str(user_answer.question_id))
+    for user_answer in answers:
+        question = answer_key.questions.get(str(user_answer.question_id))
         if not question:
             continue
 
         # 如果是论述题，直接提取参考答案，不进行评分
         if question.question_type == 'essay':
-            explanation = ""
-            # The reference answer is stored in correct_answer['reference_explanation']
-            if isinstance(question.correct_answer, dict):
-                explanation = question.correct_answer.get('reference_explanation', '')
-            elif isinstance(question.correct_answer, str):
-                # Compatible with old data or unexpected string format
-                explanation = question.correct_answer
-            
             grading_results.append(schemas.EssayGradeResult(
                 question_id=user_answer.question_id,
-                reference_explanation=explanation
+                reference_explanation=question.key
             ))
             continue
 
         # process objective questions
-        is_correct = grading.grade_objective_question(question, user_answer)
+        is_correct = grading.grade_compiled_answer(question.question_type, question.key, user_answer)
         grading_results.append(schemas.ObjectiveGradeResult(
             question_id=user_answer.question_id, 
             is_correct=is_correct
         ))
 
+    return grading_results
+
+def _count_correct(grading_results) -> int:
+    return sum(
+        1 for result in grading_results 
+        if isinstance(result, schemas.ObjectiveGradeResult) and result.is_correct
+    )
+
+async def grade_and_save_test(
+    db: Session,
+    request: schemas.GradeQuestionsRequest,
+    provider: str,
+    api_key: str
+):
+    """Grades a test submission, calculates statistics, and saves everything."""
+    # 編譯後的答案按 (試卷ID, 版本) 緩存，批改時不再加載題目
+    answer_key = get_answer_key(db, int(request.test_id))
+
+    grading_results = _grade_answers(answer_key, request.answers)
+
     # Convert Pydantic models to dictionaries for JSON serialization
     user_answers_dicts = [ans.model_dump() for ans in request.answers]
     grading_results_dicts = [res.model_dump() for res in grading_results]
 
     # Calculate correct objective question count
-    correct_objective_questions = sum(
-        1 for result in grading_results 
-        if isinstance(result, schemas.ObjectiveGradeResult) and result.is_correct
-    )
+    correct_objective_questions = _count_correct(grading_results)
 
     # Create and save the result
     db_result = models.TestPaperResult(
-        test_paper_id=request.test_id,
+        test_paper_id=answer_key.test_paper_id,
         user_answers=user_answers_dicts,
         grading_results=grading_results_dicts,
         correct_objective_questions=correct_objective_questions
     )
 
     db.add(db_result)
+    # 與提交記錄在同一事務中增量更新統計表
+    statistics.apply_result_to_statistics(db, db_result)
     db.commit()
     db.refresh(db_result)
 
     return db_result, grading_results
+
+def grade_and_save_bulk(
+    db: Session,
+    test_id: int,
+    submissions: List[schemas.BulkSubmission]
+) -> schemas.BulkGradeResponse:
+    """
+    Grades many submissions for one paper in a single pass.
+    The answer key is loaded once, all results are inserted with one executemany
+    and statistics are updated in the same transaction.
+    """
+    if len(submissions) > BULK_GRADE_MAX_SUBMISSIONS:
+        raise HTTPException(status_code=413, detail=f"Too many submissions (max {BULK_GRADE_MAX_SUBMISSIONS}).")
+    answer_key = get_answer_key(db, test_id)
+    total_objective = answer_key.total_objective_questions
+
+    rows = []
+    for submission in submissions:
+        grading_results = _grade_answers(answer_key, submission.answers)
+        rows.append(models.TestPaperResult(
+            test_paper_id=answer_key.test_paper_id,
+            user_answers=[ans.model_dump() for ans in submission.answers],
+            grading_results=[res.model_dump() for res in grading_results],
+            correct_objective_questions=_count_correct(grading_results),
+        ))
+
+    try:
+        result_ids = []
+        if rows:
+            stmt = insert(models.TestPaperResult).returning(models.TestPaperResult.id, sort_by_parameter_order=True)
+            result_ids = db.scalars(stmt, [
+                {
+                    'test_paper_id': row.test_paper_id,
+                    'user_answers': row.user_answers,
+                    'grading_results': row.grading_results,
+                    'correct_objective_questions': row.correct_objective_questions,
+                }
+                for row in rows
+            ]).all()
+        statistics.apply_results_to_statistics(db, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    students = []
+    for submission, row, result_id in zip(submissions, rows, result_ids):
+        students.append(schemas.BulkStudentResult(
+            student_id=submission.student_id,
+            result_id=result_id,
+            correct_objective_questions=row.correct_objective_questions,
+            score=round(row.correct_objective_questions * 100 / total_objective, 2) if total_objective else None,
+        ))
+
+    attempts: Counter = Counter()
+    correct: Counter = Counter()
+    for row in rows:
+        for grade in row.grading_results:
+            if 'is_correct' in grade:
+                attempts[grade['question_id']] += 1
+                correct[grade['question_id']] += 1 if grade['is_correct'] else 0
+
+    scores = [row.correct_objective_questions * 100 / total_objective for row in rows] if total_objective else []
+    aggregates = schemas.BulkGradeAggregates(
+        submissions=len(students),
+        total_objective_questions=total_objective,
+        mean_score=round(statistics_mean(scores), 2) if scores else None,
+        median_score=round(statistics_median(scores), 2) if scores else None,
+        min_score=round(min(scores), 2) if scores else None,
+        max_score=round(max(scores), 2) if scores else None,
+        question_correct_rates={question_id: round(correct[question_id] / n, 4) for question_id, n in attempts.items()},
+    )
+    return schemas.BulkGradeResponse(test_id=str(answer_key.test_paper_id), aggregates=aggregates, students=students)
+
+def _overall_feedback_signature(test_id: str, answers: List[schemas.UserAnswer], provider: str, evaluation_model: str = None, overall_feedback_prompt: str = None) -> str:
+    """總體反饋只取決於答案、提供商、模型和提示；簽名相同的預生成結果可以直接返回。"""
+    return request_fingerprint(str(test_id), [a.model_dump(mode="json") for a in answers], provider, evaluation_model, overall_feedback_prompt)
+
+def start_speculative_overall_feedback(
+    db: Session,
+    result_id: int,
+    request: schemas.GradeQuestionsRequest,
+    provider: str,
+    api_key: str,
+    evaluation_model: str = None,
+    overall_feedback_prompt: str = None
+) -> bool:
+    """
+    批改保存後在後台預先生成總體反饋並保存到提交記錄，返回是否已啟動（見 speculation.start_speculation）。
+    後台任務使用自己的會話，請求的會話在響應後就會關閉。
+    """
+    bind = db.get_bind()
+    signature = _overall_feedback_signature(request.test_id, request.answers, provider, evaluation_model, overall_feedback_prompt)
+
+    async def run() -> str:
+        with Session(bind=bind) as session:
+            return await _generate_overall_feedback(session, request.test_id, request.answers, result_id, provider, api_key, evaluation_model, overall_feedback_prompt)
+
+    return speculation.start_speculation(("overall_feedback", result_id), signature, run)
+
 async def generate_and_save_overall_feedback(
     db: Session, 
     request: schemas.GenerateOverallFeedbackRequest,
@@ -81,11 +196,34 @@ async def generate_and_save_overall_feedback(
     overall_feedback_prompt: str = None
 ) -> str:
     """Generates overall feedback, saves it to the specific result, and returns the feedback."""
-    test_paper = database.get_test_paper_by_id(db, int(request.test_id))
+    # 批改時已經開始預生成相同的反饋：返回其結果或等待它完成；預生成失敗時照常重新生成
+    signature = _overall_feedback_signature(request.test_id, request.answers, provider, evaluation_model, overall_feedback_prompt)
+    task = speculation.find_speculation(("overall_feedback", request.result_id), signature)
+    if task is not None:
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+        except Exception:
+            pass
+    return await _generate_overall_feedback(db, request.test_id, request.answers, request.result_id, provider, api_key, evaluation_model, overall_feedback_prompt)
+
+async def _generate_overall_feedback(
+    db: Session,
+    test_id: str,
+    answers: List[schemas.UserAnswer],
+    result_id: int,
+    provider: str,
+    api_key: str,
+    evaluation_model: str = None,
+    overall_feedback_prompt: str = None
+) -> str:
+    test_paper = database.get_test_paper_by_id(db, int(test_id))
     questions_map = {str(q.id): q for q in test_paper.questions}
 
     graded_info = []
-    for user_answer in request.answers:
+    for user_answer in answers:
         question = questions_map.get(user_answer.question_id)
         if not question: continue
 
@@ -101,7 +239,7 @@ async def generate_and_save_overall_feedback(
     feedback = await ai.get_overall_feedback_from_ai(graded_info, provider, api_key, evaluation_model, overall_feedback_prompt)
 
     # Save the feedback to the database
-    test_result = database.get_test_result_by_id(db, request.result_id)
+    test_result = database.get_test_result_by_id(db, result_id)
     test_result.overall_feedback = feedback
     db.commit()
 
@@ -123,16 +261,9 @@ async def generate_and_save_single_question_feedback(
     feedback = await ai.get_single_question_feedback_from_ai(question, user_answer, provider, api_key, evaluation_model, single_question_feedback_prompt)
 
     # Save the feedback to the database
+    # 每题一行，upsert 只写这一题，并发生成同一提交的不同题目不会互相覆盖
     test_result = database.get_test_result_by_id(db, request.result_id)
-    if test_result.question_feedbacks is None:
-        test_result.question_feedbacks = {}
-    
-    # Use mutable_json from sqlalchemy.dialects.postgresql import JSONB
-    # For sqlite, we have to copy and reassign
-    new_feedbacks = test_result.question_feedbacks.copy()
-    new_feedbacks[request.question_id] = feedback
-    test_result.question_feedbacks = new_feedbacks
-    
+    save_question_feedback(db, test_result.id, question.id, feedback, evaluation_model)
     db.commit()
 
     return feedback
\ No newline at end of file
@@ -0,0 +1,91 @@
+# services/pagination.py
+
+import os
+import json
+import base64
+import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+# 每页默认条数与上限，可通过环境变量调整
+DEFAULT_PAGE_SIZE = int(os.getenv("HISTORY_DEFAULT_PAGE_SIZE", "20"))
+MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "100"))
+
+# --- Cursor Encoding ---
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """将 (排序值, id) 编码为不透明的 URL 安全游标。"""
+    if isinstance(sort_value, datetime.datetime):
+        payload = {"t": "dt", "v": sort_value.isoformat(), "id": row_id}
+    else:
+        payload = {"t": "str", "v": sort_value, "id": row_id}
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """解码游标，格式错误时抛出400异常。"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        sort_value = payload["v"]
+        if payload.get("t") == "dt":
+            sort_value = datetime.datetime.fromisoformat(sort_value)
+        return sort_value, int(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    """将请求的页大小限制在 [1, MAX_PAGE_SIZE] 范围内。"""
+    if not limit:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+# --- Keyset Pagination ---
+
+def paginate_keyset(
+    query: Query,
+    sort_column,
+    id_column,
+    sort_key: Callable[[Any], Any],
+    order: str = "desc",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    include_total: bool = False,
+) -> Tuple[List[Any], Optional[str], Optional[int]]:
+    """
+    对查询按 (sort_column, id_column) 进行键集分页。
+    返回 (当前页数据, 下一页游标, 总数)。总数仅在 include_total 为真时计算。
+    """
+    page_size = clamp_page_size(limit)
+    total = query.order_by(None).count() if include_total else None
+
+    if cursor:
+        last_value, last_id = decode_cursor(cursor)
+        if order == "asc":
+            query = query.filter(or_(
+                sort_column > last_value,
+                and_(sort_column == last_value, id_column > last_id),
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column < last_value,
+                and_(sort_column == last_value, id_column < last_id),
+            ))
+
+    if order == "asc":
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    else:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+
+    # 多取一条用于判断是否还有下一页
+    rows = query.limit(page_size + 1).all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last_row = rows[-1]
+        next_cursor = encode_cursor(sort_key(last_row), last_row.id)
+
+    return rows, next_cursor, total
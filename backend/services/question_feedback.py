@@ -0,0 +1,85 @@
+# services/question_feedback.py
+
+import datetime
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+import models
+
+_TABLE = models.QuestionFeedback.__table__
+
+def _dialect_insert(db: Session):
+    if db.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+def save_question_feedback(db: Session, result_id: int, question_id: int, text: str, model: Optional[str] = None):
+    """
+    保存一題的反饋（不提交事務）。同一提交同一題已有反饋時覆蓋，依靠唯一約束原子完成：
+    並發生成不同題目的反饋互不影響，同一題的並發請求以最後寫入的為準。
+    """
+    stmt = _dialect_insert(db)(_TABLE).values(
+        result_id=result_id, question_id=question_id, text=text, model=model, created_at=datetime.datetime.utcnow(),
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=['result_id', 'question_id'],
+        set_={'text': stmt.excluded.text, 'model': stmt.excluded.model, 'created_at': stmt.excluded.created_at},
+    ))
+
+def insert_question_feedbacks(db: Session, feedbacks_by_result: Dict[int, Optional[Dict[str, str]]]) -> int:
+    """批量寫入 {提交ID: {題目ID: 反饋}}（批量導入時使用），返回寫入的行數。"""
+    rows = [
+        {'result_id': result_id, 'question_id': int(question_id), 'text': text}
+        for result_id, feedbacks in feedbacks_by_result.items() if feedbacks
+        for question_id, text in feedbacks.items()
+        if str(question_id).isdigit()
+    ]
+    if rows:
+        db.execute(_TABLE.insert(), rows)
+    return len(rows)
+
+def question_feedback_map(db: Session, result_ids: List[int]) -> Dict[int, Dict[str, str]]:
+    """返回 {提交ID: {題目ID字符串: 反饋}}，沒有反饋的提交不在結果中。"""
+    feedbacks = defaultdict(dict)
+    if result_ids:
+        rows = db.execute(
+            select(_TABLE.c.result_id, _TABLE.c.question_id, _TABLE.c.text)
+            .where(_TABLE.c.result_id.in_(result_ids))
+            .order_by(_TABLE.c.result_id, _TABLE.c.question_id)
+        )
+        for result_id, question_id, text in rows:
+            feedbacks[result_id][str(question_id)] = text
+    return feedbacks
+
+def pop_question_feedbacks(db: Session, result_ids: List[int]) -> Dict[int, Dict[str, str]]:
+    """刪除並返回這些提交的單題反饋（歸檔時與提交記錄一起移走）。"""
+    feedbacks = question_feedback_map(db, result_ids)
+    if feedbacks:
+        db.execute(delete(_TABLE).where(_TABLE.c.result_id.in_(result_ids)))
+    return feedbacks
+
+def delete_question_feedbacks(db: Session, result_ids_query) -> int:
+    """刪除一組提交（result_ids_query 為返回提交ID的子查詢）的單題反饋，不提交事務。"""
+    return db.execute(delete(_TABLE).where(_TABLE.c.result_id.in_(result_ids_query))).rowcount
+
+def with_question_feedbacks(db: Session, rows: Iterable[Dict], batch_size: int = 500) -> Iterator[Dict]:
+    """為逐條返回的提交記錄字典按批補上 question_feedbacks（每批一次查詢）。"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield from _attach(db, batch)
+            batch = []
+    if batch:
+        yield from _attach(db, batch)
+
+def _attach(db: Session, batch: List[Dict]) -> List[Dict]:
+    feedbacks = question_feedback_map(db, [row['id'] for row in batch])
+    for row in batch:
+        row['question_feedbacks'] = feedbacks.get(row['id'])
+    return batch
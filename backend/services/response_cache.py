@@ -0,0 +1,92 @@
+# services/response_cache.py
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterator, NamedTuple, Optional, Tuple
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+import models
+from .answer_key import get_paper_version
+
+# 進程內最多緩存多少個序列化後的試卷響應（每份試卷的每種格式算一個）
+PAPER_RESPONSE_CACHE_SIZE = int(os.getenv("PAPER_RESPONSE_CACHE_SIZE", "128"))
+# 客戶端可以保存響應，但每次使用前必須帶 If-None-Match 重新驗證
+PAPER_CACHE_CONTROL = "no-cache"
+
+class CachedResponse(NamedTuple):
+    version: Tuple[int, Any]
+    body: bytes
+    etag: str
+    media_type: str
+
+_cache: "OrderedDict[Tuple[str, int], CachedResponse]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def make_etag(body: bytes) -> str:
+    """強 ETag：響應體內容的哈希，與進程和版本號無關，多個 worker 之間一致。"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match 使用弱比較（RFC 9110 13.1.2），忽略 W/ 前綴
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+def _get_or_render(db: Session, kind: str, test_paper_id: int, render: Callable[[models.TestPaper], bytes], media_type: str) -> CachedResponse:
+    version = get_paper_version(db, test_paper_id)
+    key = (kind, test_paper_id)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached.version == version:
+            _cache.move_to_end(key)
+            return cached
+
+    body = render(db.get(models.TestPaper, test_paper_id))
+    entry = CachedResponse(version, body, make_etag(body), media_type)
+    with _cache_lock:
+        _cache[key] = entry
+        _cache.move_to_end(key)
+        while len(_cache) > PAPER_RESPONSE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return entry
+
+def cached_paper_response(
+    db: Session,
+    kind: str,
+    test_paper_id: int,
+    render: Callable[[models.TestPaper], bytes],
+    media_type: str,
+    if_none_match: Optional[str] = None,
+    stream_chunk_size: Optional[int] = None,
+) -> Response:
+    """
+    讀穿式緩存：按 (格式, 試卷ID) 保存序列化後的響應體，版本號變化時重新渲染。
+    客戶端帶上匹配的 If-None-Match 時返回 304。
+    指定 stream_chunk_size 時以分塊傳輸的方式發送響應體。
+    """
+    entry = _get_or_render(db, kind, test_paper_id, render, media_type)
+    headers = {"ETag": entry.etag, "Cache-Control": PAPER_CACHE_CONTROL}
+    if _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    if stream_chunk_size:
+        return StreamingResponse(_iter_chunks(entry.body, stream_chunk_size), media_type=entry.media_type, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+def _iter_chunks(body: bytes, chunk_size: int) -> Iterator[bytes]:
+    view = memoryview(body)
+    for start in range(0, len(view), chunk_size):
+        yield view[start:start + chunk_size].tobytes()
+
+def invalidate_paper_responses(test_paper_id: int):
+    """試卷被刪除或題目被重新生成時調用；其他進程通過版本號發現變化。"""
+    with _cache_lock:
+        for key in [key for key in _cache if key[1] == test_paper_id]:
+            del _cache[key]
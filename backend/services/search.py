@@ -0,0 +1,191 @@
+# services/search.py
+
+import re
+import html
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text, column
+from sqlalchemy.orm import Session
+
+import models
+from .pagination import clamp_page_size
+
+# trigram 分词器只能匹配长度不少于3个字符的词，更短的词退化为 LIKE 查询
+MIN_FTS_TERM_LENGTH = 3
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+SNIPPET_TOKENS = 24
+# 数据库与 LIKE 回退路径先用私用区字符标记命中位置，转义 HTML 后再替换为 <mark>，题干中的标签不会原样返回
+_MARK_START = "\ue000"
+_MARK_END = "\ue001"
+
+# --- Query Helpers ---
+
+def _split_terms(q: str) -> List[str]:
+    return [term for term in q.split() if term]
+
+def _quote_fts_term(term: str) -> str:
+    """将用户输入包装为 FTS5 短语，避免其中的运算符被解析。"""
+    return '"' + term.replace('"', '""') + '"'
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _highlight(value: Optional[str], terms: List[str]) -> Optional[str]:
+    """在 Python 中为 LIKE 回退路径生成与 FTS 一致的高亮标记（未转义，之后由 _render_highlight 处理）。"""
+    if not value or not terms:
+        return value
+    pattern = re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE)
+    return pattern.sub(lambda m: f"{_MARK_START}{m.group(0)}{_MARK_END}", value)
+
+def _render_highlight(value: Optional[str]) -> Optional[str]:
+    """转义片段中的 HTML，再把命中标记替换为 <mark>，结果可以直接作为 HTML 渲染。"""
+    if value is None:
+        return None
+    return html.escape(value).replace(_MARK_START, HIGHLIGHT_START).replace(_MARK_END, HIGHLIGHT_END)
+
+def _render_hits(papers: List[Dict[str, Any]], questions: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    for paper in papers:
+        paper["name_highlight"] = _render_highlight(paper["name_highlight"])
+    for question in questions:
+        question["stem_snippet"] = _render_highlight(question["stem_snippet"])
+        question["options_snippet"] = _render_highlight(question["options_snippet"])
+    return {"papers": papers, "questions": questions}
+
+def paper_name_filter(db: Session, search: str):
+    """
+    返回按试卷名称过滤的条件。
+    SQLite 下优先走 FTS5 索引（整个搜索词作为一个短语，与原先的子串匹配语义一致）。
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == 'sqlite' and len(search) >= MIN_FTS_TERM_LENGTH:
+        matching_ids = text(
+            "SELECT rowid FROM test_papers_fts WHERE test_papers_fts MATCH :name_query"
+        ).bindparams(name_query=_quote_fts_term(search)).columns(column("rowid"))
+        return models.TestPaper.id.in_(matching_ids)
+    return models.TestPaper.name.ilike(f"%{search}%")
+
+# --- SQLite (FTS5) ---
+
+def _search_sqlite(db: Session, terms: List[str], limit: int, offset: int) -> Dict[str, List[Dict[str, Any]]]:
+    fts_terms = [t for t in terms if len(t) >= MIN_FTS_TERM_LENGTH]
+    like_terms = [t for t in terms if len(t) < MIN_FTS_TERM_LENGTH]
+    params: Dict[str, Any] = {"limit": limit + 1, "offset": offset}
+
+    if fts_terms:
+        params["match"] = " ".join(_quote_fts_term(t) for t in fts_terms)
+
+    def like_clause(columns: List[str]) -> str:
+        clauses = []
+        for i, term in enumerate(like_terms):
+            params[f"like_{i}"] = f"%{_escape_like(term)}%"
+            clauses.append("(" + " OR ".join(f"{c} LIKE :like_{i} ESCAPE '\\'" for c in columns) + ")")
+        return " AND ".join(clauses)
+
+    if fts_terms:
+        paper_where = "test_papers_fts MATCH :match"
+        paper_rank = "bm25(test_papers_fts)"
+        paper_name = f"highlight(test_papers_fts, 0, '{_MARK_START}', '{_MARK_END}')"
+        question_where = "questions_fts MATCH :match"
+        question_rank = "bm25(questions_fts)"
+        stem = f"snippet(questions_fts, 0, '{_MARK_START}', '{_MARK_END}', '…', {SNIPPET_TOKENS})"
+        options = f"snippet(questions_fts, 1, '{_MARK_START}', '{_MARK_END}', '…', {SNIPPET_TOKENS})"
+        paper_order = f"{paper_rank}, p.id DESC"
+        question_order = f"{question_rank}, q.id DESC"
+    else:
+        # 只有短词时无法使用 MATCH，相关度统一为0，按新到旧排序
+        paper_where = question_where = "1 = 1"
+        paper_rank = question_rank = "0.0"
+        paper_order = "p.id DESC"
+        question_order = "q.id DESC"
+        paper_name = "test_papers_fts.name"
+        stem = "questions_fts.stem"
+        options = "questions_fts.options"
+    if like_terms:
+        paper_where += " AND " + like_clause(["test_papers_fts.name"])
+        question_where += " AND " + like_clause(["questions_fts.stem", "questions_fts.options"])
+
+    paper_rows = db.execute(text(f"""
+        SELECT p.id, p.name, p.created_at, {paper_name} AS name_highlight, {paper_rank} AS rank
+        FROM test_papers_fts JOIN test_papers p ON p.id = test_papers_fts.rowid
+        WHERE {paper_where}
+        ORDER BY {paper_order}
+        LIMIT :limit OFFSET :offset
+    """), params).mappings().all()
+
+    question_rows = db.execute(text(f"""
+        SELECT q.id, q.test_paper_id, p.name AS test_paper_name, q.question_type,
+               {stem} AS stem_snippet, {options} AS options_snippet, {question_rank} AS rank
+        FROM questions_fts
+        JOIN questions q ON q.id = questions_fts.rowid
+        LEFT JOIN test_papers p ON p.id = q.test_paper_id
+        WHERE {question_where}
+        ORDER BY {question_order}
+        LIMIT :limit OFFSET :offset
+    """), params).mappings().all()
+
+    papers = [dict(row) for row in paper_rows]
+    questions = [dict(row) for row in question_rows]
+    if like_terms:
+        for paper in papers:
+            paper["name_highlight"] = _highlight(paper["name_highlight"], like_terms)
+        for question in questions:
+            question["stem_snippet"] = _highlight(question["stem_snippet"], like_terms)
+            question["options_snippet"] = _highlight(question["options_snippet"], like_terms)
+    return _render_hits(papers, questions)
+
+# --- PostgreSQL (tsvector) ---
+
+def _search_postgres(db: Session, q: str, limit: int, offset: int) -> Dict[str, List[Dict[str, Any]]]:
+    headline_opts = f'StartSel="{_MARK_START}", StopSel="{_MARK_END}", MaxWords={SNIPPET_TOKENS}, MinWords=5'
+    params = {"q": q, "limit": limit + 1, "offset": offset, "headline_opts": headline_opts}
+
+    paper_rows = db.execute(text(f"""
+        SELECT p.id, p.name, p.created_at,
+               ts_headline('simple', coalesce(p.name, ''), query, :headline_opts) AS name_highlight,
+               ts_rank(p.search_vector, query) AS rank
+        FROM test_papers p, websearch_to_tsquery('simple', :q) query
+        WHERE p.search_vector @@ query
+        ORDER BY rank DESC, p.id DESC
+        LIMIT :limit OFFSET :offset
+    """), params).mappings().all()
+
+    question_rows = db.execute(text(f"""
+        SELECT q.id, q.test_paper_id, p.name AS test_paper_name, q.question_type,
+               ts_headline('simple', coalesce(q.stem, ''), query, :headline_opts) AS stem_snippet,
+               ts_headline('simple', coalesce(q.options::jsonb::text, ''), query, :headline_opts) AS options_snippet,
+               ts_rank(q.search_vector, query) AS rank
+        FROM questions q
+        LEFT JOIN test_papers p ON p.id = q.test_paper_id,
+             websearch_to_tsquery('simple', :q) query
+        WHERE q.search_vector @@ query
+        ORDER BY rank DESC, q.id DESC
+        LIMIT :limit OFFSET :offset
+    """), params).mappings().all()
+
+    return _render_hits([dict(r) for r in paper_rows], [dict(r) for r in question_rows])
+
+# --- Public API ---
+
+def search_question_bank(db: Session, q: str, limit: Optional[int] = None, offset: int = 0) -> Dict[str, Any]:
+    """
+    在试卷名称、题干和选项中进行全文检索。
+    返回按相关度排序的试卷与题目（带高亮片段），两者共用 limit/offset 分页。
+    """
+    page_size = clamp_page_size(limit)
+    terms = _split_terms(q)
+    if not terms:
+        return {"query": q, "papers": [], "questions": [], "next_offset": None}
+
+    if db.get_bind().dialect.name == 'postgresql':
+        hits = _search_postgres(db, q, page_size, offset)
+    else:
+        hits = _search_sqlite(db, terms, page_size, offset)
+
+    has_more = len(hits["papers"]) > page_size or len(hits["questions"]) > page_size
+    return {
+        "query": q,
+        "papers": hits["papers"][:page_size],
+        "questions": hits["questions"][:page_size],
+        "next_offset": offset + page_size if has_more else None,
+    }
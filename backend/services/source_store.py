@@ -0,0 +1,44 @@
+# services/source_store.py
+
+from typing import NamedTuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+
+class SourceStorageReport(NamedTuple):
+    papers: int  # 引用了知识源的试卷数
+    documents: int  # 去重后的知识源数
+    referenced_bytes: int  # 若每份试卷各存一份原文所需的字节数
+    unique_bytes: int  # 去重后的原文字节数
+    stored_bytes: int  # 压缩后实际保存的字节数
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.referenced_bytes - self.stored_bytes
+
+def source_storage_report(db: Session) -> SourceStorageReport:
+    """统计知识源按内容去重与压缩节省的空间。"""
+    papers, referenced = (
+        db.query(func.count(models.TestPaper.id), func.coalesce(func.sum(models.SourceBlob.size), 0))
+        .join(models.SourceBlob, models.TestPaper.source_hash == models.SourceBlob.hash)
+        .one()
+    )
+    documents, unique, stored = db.query(
+        func.count(models.SourceBlob.hash),
+        func.coalesce(func.sum(models.SourceBlob.size), 0),
+        func.coalesce(func.sum(func.length(models.SourceBlob.data)), 0),
+    ).one()
+    return SourceStorageReport(papers, documents, referenced, unique, stored)
+
+def delete_orphan_source_blobs(db: Session) -> int:
+    """删除不再被任何试卷引用的知识源，返回删除的行数。"""
+    referenced = db.query(models.TestPaper.source_hash).filter(models.TestPaper.source_hash.isnot(None))
+    deleted = (
+        db.query(models.SourceBlob)
+        .filter(models.SourceBlob.hash.notin_(referenced))
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
@@ -0,0 +1,80 @@
+# services/speculation.py
+
+import os
+import time
+import asyncio
+import logging
+import contextvars
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, Optional
+
+from .drain import is_draining
+
+logger = logging.getLogger(__name__)
+
+# 同時運行的預生成任務上限；達到上限時不再啟動新的預生成（不排隊），為 0 時關閉預生成
+SPECULATIVE_CONCURRENCY = int(os.getenv("SPECULATIVE_CONCURRENCY", "4"))
+# 預生成的結果保留多久（秒）等待對應的請求來取
+SPECULATIVE_RESULT_TTL_SECONDS = int(os.getenv("SPECULATIVE_RESULT_TTL_SECONDS", "900"))
+SPECULATIVE_MAX_ENTRIES = 1024
+
+class _Speculation:
+    __slots__ = ("signature", "task", "started")
+
+    def __init__(self, signature: str, task: asyncio.Task):
+        self.signature = signature
+        self.task = task
+        self.started = time.monotonic()
+
+_entries: "OrderedDict[Hashable, _Speculation]" = OrderedDict()
+
+def _log_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.info(f"Speculative task failed: {task.exception()}")
+
+def _prune():
+    expires = time.monotonic() - SPECULATIVE_RESULT_TTL_SECONDS
+    for key in [key for key, entry in _entries.items() if entry.task.done() and entry.started < expires]:
+        del _entries[key]
+    while len(_entries) > SPECULATIVE_MAX_ENTRIES:
+        _, entry = _entries.popitem(last=False)
+        entry.task.cancel()
+
+def running_speculations() -> int:
+    return sum(1 for entry in _entries.values() if not entry.task.done())
+
+def start_speculation(key: Hashable, signature: str, factory: Callable[[], Awaitable]) -> bool:
+    """
+    在後台運行 factory() 並以 key 登記，返回是否已啟動。
+    已有相同 key 和簽名的任務、達到並發上限或服務器正在關閉時不啟動。
+    任務在空的上下文中運行，不繼承觸發它的請求的截止時間。
+    """
+    if SPECULATIVE_CONCURRENCY <= 0 or is_draining():
+        return False
+    _prune()
+    existing = _entries.get(key)
+    if existing is not None and existing.signature == signature:
+        return True
+    if running_speculations() >= SPECULATIVE_CONCURRENCY:
+        return False
+    task = asyncio.get_running_loop().create_task(factory(), context=contextvars.Context())
+    task.add_done_callback(_log_failure)
+    if existing is not None:
+        existing.task.cancel()
+    _entries[key] = _Speculation(signature, task)
+    return True
+
+def find_speculation(key: Hashable, signature: str) -> Optional[asyncio.Task]:
+    """返回 key 對應且簽名相同的預生成任務（運行中或已完成），沒有時返回 None。"""
+    entry = _entries.get(key)
+    if entry is None or entry.signature != signature:
+        return None
+    return entry.task
+
+async def cancel_speculations():
+    """取消全部預生成任務（應用關閉時調用）。"""
+    tasks = [entry.task for entry in _entries.values()]
+    _entries.clear()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
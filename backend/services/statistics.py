@@ -0,0 +1,263 @@
+# services/statistics.py
+
+from itertools import chain
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session, load_only
+
+import models
+import schemas
+from .archive import iter_archived_results
+
+# --- Delta Extraction ---
+
+def _result_deltas(result: models.TestPaperResult) -> Tuple[List[Dict], List[Dict]]:
+    """從一條提交記錄中提取每道客觀題的作答/正確次數與選項被選次數。"""
+    answers = {
+        str(answer.get('question_id')): answer
+        for answer in (result.user_answers or [])
+        if isinstance(answer, dict)
+    }
+    question_rows, option_rows = [], []
+    for grade in result.grading_results or []:
+        # 論述題的批改結果沒有 is_correct，不計入正確率
+        if not isinstance(grade, dict) or 'is_correct' not in grade:
+            continue
+        try:
+            question_id = int(grade.get('question_id'))
+        except (TypeError, ValueError):
+            continue
+
+        question_rows.append({
+            'question_id': question_id,
+            'test_paper_id': result.test_paper_id,
+            'attempts': 1,
+            'correct_count': 1 if grade.get('is_correct') else 0,
+        })
+
+        answer = answers.get(str(question_id)) or {}
+        if answer.get('answer_index') is not None:
+            picks = {answer['answer_index']}
+        else:
+            picks = set(answer.get('answer_indices') or [])
+        for option_index in picks:
+            option_rows.append({
+                'question_id': question_id,
+                'option_index': option_index,
+                'test_paper_id': result.test_paper_id,
+                'pick_count': 1,
+            })
+    return question_rows, option_rows
+
+# --- Incremental Updates ---
+
+def _dialect_insert(db: Session):
+    if db.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+def _increment(db: Session, model, key_columns: List[str], counter_columns: List[str], rows: List[Dict]):
+    """對統計行做原子自增（不存在則插入），所有行通過一次 executemany 完成。"""
+    if not rows:
+        return
+    table = model.__table__
+    stmt = _dialect_insert(db)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={column: table.c[column] + stmt.excluded[column] for column in counter_columns},
+    )
+    db.execute(stmt, rows)
+
+def _decrement(db: Session, model, key_columns: List[str], counter_columns: List[str], rows: List[Dict]):
+    """對已存在的統計行做原子自減；不存在的行（例如尚未回填）直接跳過。"""
+    if not rows:
+        return
+    table = model.__table__
+    stmt = (
+        update(table)
+        .where(*[table.c[column] == bindparam(f'key_{column}') for column in key_columns])
+        .values({column: table.c[column] - bindparam(f'delta_{column}') for column in counter_columns})
+    )
+    params = [
+        {**{f'key_{c}': row[c] for c in key_columns}, **{f'delta_{c}': row[c] for c in counter_columns}}
+        for row in rows
+    ]
+    db.execute(stmt, params)
+
+def apply_result_to_statistics(db: Session, result: models.TestPaperResult, sign: int = 1):
+    """
+    將一條提交記錄計入（sign=1）或移出（sign=-1）統計表。
+    不會提交事務，由調用方與提交記錄的寫入/刪除放在同一個事務中提交。
+    """
+    apply_results_to_statistics(db, [result], sign)
+
+def apply_results_to_statistics(db: Session, results: List[models.TestPaperResult], sign: int = 1):
+    """
+    批量版本：先在內存中合併所有提交的增量，每張統計表只執行一次 executemany。
+    不會提交事務。
+    """
+    papers: Dict[int, List[int]] = {}
+    questions: Dict[int, List[int]] = {}
+    options: Counter = Counter()
+    for result in results:
+        if not result.test_paper_id:
+            continue
+        entry = papers.setdefault(result.test_paper_id, [0, 0])
+        entry[0] += 1
+        entry[1] += result.correct_objective_questions or 0
+        question_rows, option_rows = _result_deltas(result)
+        for row in question_rows:
+            entry = questions.setdefault(row['question_id'], [row['test_paper_id'], 0, 0])
+            entry[1] += 1
+            entry[2] += row['correct_count']
+        for row in option_rows:
+            options[(row['question_id'], row['option_index'], row['test_paper_id'])] += 1
+
+    paper_rows = [
+        {'test_paper_id': paper_id, 'attempts': attempts, 'correct_objective_sum': correct}
+        for paper_id, (attempts, correct) in papers.items()
+    ]
+    question_rows = [
+        {'question_id': question_id, 'test_paper_id': paper_id, 'attempts': attempts, 'correct_count': correct}
+        for question_id, (paper_id, attempts, correct) in questions.items()
+    ]
+    option_rows = [
+        {'question_id': question_id, 'option_index': option_index, 'test_paper_id': paper_id, 'pick_count': count}
+        for (question_id, option_index, paper_id), count in options.items()
+    ]
+    apply = _increment if sign > 0 else _decrement
+    apply(db, models.PaperStatistics, ['test_paper_id'], ['attempts', 'correct_objective_sum'], paper_rows)
+    apply(db, models.QuestionStatistics, ['question_id'], ['attempts', 'correct_count'], question_rows)
+    apply(db, models.QuestionOptionStatistics, ['question_id', 'option_index'], ['pick_count'], option_rows)
+
+def delete_paper_statistics(db: Session, test_paper_id: int, questions_only: bool = False):
+    """刪除一份試卷的統計數據（試卷被刪除或題目被重新生成時調用）。"""
+    db.query(models.QuestionOptionStatistics).filter(models.QuestionOptionStatistics.test_paper_id == test_paper_id).delete(synchronize_session=False)
+    db.query(models.QuestionStatistics).filter(models.QuestionStatistics.test_paper_id == test_paper_id).delete(synchronize_session=False)
+    if not questions_only:
+        db.query(models.PaperStatistics).filter(models.PaperStatistics.test_paper_id == test_paper_id).delete(synchronize_session=False)
+
+# --- Backfill ---
+
+def rebuild_statistics(db: Session, test_paper_id: Optional[int] = None, batch_size: int = 500) -> int:
+    """
+    從 test_paper_results 與歸檔表全量重建統計表（全部或單份試卷），返回處理的提交記錄數。
+    不會提交事務。
+    """
+    if test_paper_id is None:
+        db.query(models.QuestionOptionStatistics).delete(synchronize_session=False)
+        db.query(models.QuestionStatistics).delete(synchronize_session=False)
+        db.query(models.PaperStatistics).delete(synchronize_session=False)
+    else:
+        delete_paper_statistics(db, test_paper_id)
+
+    query = db.query(models.TestPaperResult).options(load_only(
+        models.TestPaperResult.test_paper_id,
+        models.TestPaperResult.user_answers,
+        models.TestPaperResult.grading_results,
+        models.TestPaperResult.correct_objective_questions,
+    ))
+    if test_paper_id is not None:
+        query = query.filter(models.TestPaperResult.test_paper_id == test_paper_id)
+
+    papers: Counter = Counter()
+    paper_correct: Counter = Counter()
+    questions: Dict[int, List[int]] = {}
+    options: Counter = Counter()
+    processed = 0
+    for result in chain(query.yield_per(batch_size), iter_archived_results(db, test_paper_id, batch_size)):
+        if not result.test_paper_id:
+            continue
+        processed += 1
+        papers[result.test_paper_id] += 1
+        paper_correct[result.test_paper_id] += result.correct_objective_questions or 0
+        question_rows, option_rows = _result_deltas(result)
+        for row in question_rows:
+            entry = questions.setdefault(row['question_id'], [row['test_paper_id'], 0, 0])
+            entry[1] += 1
+            entry[2] += row['correct_count']
+        for row in option_rows:
+            options[(row['question_id'], row['option_index'], row['test_paper_id'])] += 1
+
+    # 只為仍然存在的題目寫入統計（題目重新生成後舊題目的作答不再計入）
+    existing_questions = {
+        question_id for (question_id,) in db.query(models.DBQuestion.id).filter(models.DBQuestion.id.in_(list(questions)))
+    } if questions else set()
+
+    db.bulk_insert_mappings(models.PaperStatistics, [
+        {'test_paper_id': paper_id, 'attempts': attempts, 'correct_objective_sum': paper_correct[paper_id]}
+        for paper_id, attempts in papers.items()
+    ])
+    db.bulk_insert_mappings(models.QuestionStatistics, [
+        {'question_id': question_id, 'test_paper_id': paper_id, 'attempts': attempts, 'correct_count': correct}
+        for question_id, (paper_id, attempts, correct) in questions.items()
+        if question_id in existing_questions
+    ])
+    db.bulk_insert_mappings(models.QuestionOptionStatistics, [
+        {'question_id': question_id, 'option_index': option_index, 'test_paper_id': paper_id, 'pick_count': count}
+        for (question_id, option_index, paper_id), count in options.items()
+        if question_id in existing_questions
+    ])
+    return processed
+
+# --- Dashboard ---
+
+def get_paper_statistics(db: Session, test_paper_id: int) -> schemas.PaperStatisticsResponse:
+    """讀取一份試卷的統計數據，只與題目數量相關，與提交次數無關。"""
+    paper = (
+        db.query(models.TestPaper)
+        .options(load_only(models.TestPaper.id, models.TestPaper.name, models.TestPaper.total_objective_questions))
+        .filter(models.TestPaper.id == test_paper_id)
+        .first()
+    )
+    if not paper:
+        raise HTTPException(status_code=404, detail=f"Test with ID {test_paper_id} not found.")
+
+    paper_stats = db.get(models.PaperStatistics, test_paper_id)
+    question_stats = {
+        row.question_id: row
+        for row in db.query(models.QuestionStatistics).filter(models.QuestionStatistics.test_paper_id == test_paper_id)
+    }
+    option_counts: Dict[int, Dict[int, int]] = {}
+    for row in db.query(models.QuestionOptionStatistics).filter(models.QuestionOptionStatistics.test_paper_id == test_paper_id):
+        option_counts.setdefault(row.question_id, {})[row.option_index] = row.pick_count
+
+    questions = []
+    for question in (
+        db.query(models.DBQuestion)
+        .options(load_only(models.DBQuestion.id, models.DBQuestion.question_type, models.DBQuestion.stem, models.DBQuestion.options))
+        .filter(models.DBQuestion.test_paper_id == test_paper_id)
+        .order_by(models.DBQuestion.id)
+    ):
+        stats = question_stats.get(question.id)
+        attempts = stats.attempts if stats else 0
+        correct = stats.correct_count if stats else 0
+        counts = option_counts.get(question.id, {})
+        questions.append(schemas.QuestionStatistics(
+            question_id=str(question.id),
+            question_type=question.question_type,
+            stem=question.stem,
+            attempts=attempts,
+            correct_count=correct,
+            correct_rate=round(correct / attempts, 4) if attempts else None,
+            option_pick_counts=[counts.get(i, 0) for i in range(len(question.options or []))],
+        ))
+
+    attempts = paper_stats.attempts if paper_stats else 0
+    correct_sum = paper_stats.correct_objective_sum if paper_stats else 0
+    total_objective = paper.total_objective_questions or 0
+    mean_correct = correct_sum / attempts if attempts else None
+    return schemas.PaperStatisticsResponse(
+        test_paper_id=paper.id,
+        name=paper.name,
+        attempts=attempts,
+        total_objective_questions=total_objective,
+        mean_correct_objective=round(mean_correct, 4) if mean_correct is not None else None,
+        mean_score=round(mean_correct * 100 / total_objective, 2) if mean_correct is not None and total_objective else None,
+        questions=questions,
+    )
@@ -0,0 +1,250 @@
+# services/transfer.py
+
+import os
+import gzip
+import zlib
+import datetime
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
+
+import models
+import schemas
+from .archive import iter_paper_result_rows
+from .statistics import apply_results_to_statistics
+from .question_feedback import insert_question_feedbacks
+
+TRANSFER_FORMAT = "ai4exam-jsonl"
+TRANSFER_VERSION = 1
+# 導入時每批插入的行數；導出時每批讀取的試卷數
+TRANSFER_BATCH_SIZE = int(os.getenv("TRANSFER_BATCH_SIZE", "1000"))
+TRANSFER_CHUNK_SIZE = 64 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+
+_record_adapter: TypeAdapter = TypeAdapter(schemas.TransferRecord)
+
+# --- Export ---
+
+def _paper_record(paper: models.TestPaper) -> Dict:
+    return {
+        "kind": "paper",
+        "id": paper.id,
+        "name": paper.name,
+        "source_content": paper.source_content,
+        "config": paper.config,
+        "generation_prompt": paper.generation_prompt,
+        "total_objective_questions": paper.total_objective_questions or 0,
+        "total_essay_questions": paper.total_essay_questions or 0,
+        "created_at": paper.created_at,
+    }
+
+def _iter_records(db: Session, query) -> Iterator[Dict]:
+    yield {"kind": "header", "format": TRANSFER_FORMAT, "version": TRANSFER_VERSION,
+           "exported_at": datetime.datetime.utcnow()}
+    papers = (
+        query
+        .options(selectinload(models.TestPaper.questions), selectinload(models.TestPaper.source_blob))
+        .order_by(models.TestPaper.id)
+        .yield_per(max(1, TRANSFER_BATCH_SIZE // 20))
+    )
+    for paper in papers:
+        yield _paper_record(paper)
+        for q in paper.questions:
+            yield {
+                "kind": "question",
+                "id": q.id,
+                "test_paper_id": paper.id,
+                "question": {"type": q.question_type, "stem": q.stem, "options": q.options, "answer": q.correct_answer},
+            }
+        # 熱表與歸檔表中的提交記錄按ID合併導出，導入後全部進入熱表
+        for row in iter_paper_result_rows(db, paper.id, TRANSFER_BATCH_SIZE):
+            yield {"kind": "result", "test_paper_id": paper.id, **row}
+        db.expunge(paper)
+
+def iter_jsonl_export(db: Session, query=None, compress: bool = False) -> Iterator[bytes]:
+    """
+    以 JSONL 流式導出試卷、題目與提交記錄（可選 gzip）。
+    每份試卷的記錄依次為 paper、它的 question、它的 result，導入時可以逐行處理。
+    """
+    if query is None:
+        query = db.query(models.TestPaper)
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 輸出 gzip 格式
+    buffer: List[bytes] = []
+    size = 0
+    for record in _iter_records(db, query):
+        line = orjson.dumps(record) + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= TRANSFER_CHUNK_SIZE:
+            data = b"".join(buffer)
+            buffer.clear()
+            size = 0
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+    data = b"".join(buffer)
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+# --- Import ---
+
+def open_jsonl(fileobj: BinaryIO) -> BinaryIO:
+    """根據文件頭自動識別 gzip。fileobj 需要支持 peek 或 seek。"""
+    if hasattr(fileobj, "peek"):
+        head = fileobj.peek(2)[:2]
+    else:
+        head = fileobj.read(2)
+        fileobj.seek(0)
+    return gzip.GzipFile(fileobj=fileobj, mode="rb") if head == GZIP_MAGIC else fileobj
+
+def _remap_question_id(value, question_ids: Dict[int, int]) -> Optional[str]:
+    """返回新的題目ID；引用的題目沒有導入（例如該行被 skip_invalid 跳過）時返回 None。"""
+    try:
+        return str(question_ids[int(value)])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _remap_items(items: List[Dict], question_ids: Dict[int, int]) -> List[Dict]:
+    """改寫作答/批改結果中的題目ID，丟棄引用未導入題目的條目（原ID在目標庫中可能屬於無關的題目）。"""
+    remapped = []
+    for item in items:
+        question_id = _remap_question_id(item.get("question_id"), question_ids)
+        if question_id is not None:
+            remapped.append({**item, "question_id": question_id})
+    return remapped
+
+class _Importer:
+    """按依賴順序分批插入：結果依賴題目，題目依賴試卷；刷新任一批次前先刷新它依賴的批次。"""
+
+    def __init__(self, db: Session, batch_size: int):
+        self.db = db
+        self.batch_size = batch_size
+        self.paper_ids: Dict[int, int] = {}
+        self.seen_papers = set()  # 已讀到（可能尚未插入）的原始試卷ID
+        self.question_ids: Dict[int, int] = {}
+        self.papers: List[Tuple[int, Dict]] = []
+        self.questions: List[Tuple[int, Dict]] = []
+        self.results: List[Dict] = []
+        self.summary = schemas.ImportSummary()
+
+    def _insert_returning_ids(self, model, rows: List[Dict]) -> List[int]:
+        stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+        return self.db.scalars(stmt, rows).all()
+
+    def flush_papers(self):
+        if not self.papers:
+            return
+        # 原文寫入按內容哈希去重的 source_blobs，試卷行只保存哈希
+        rows = [row for _, row in self.papers]
+        models.store_source_blobs(self.db.connection(), [row["source_content"] for row in rows])
+        for row in rows:
+            text = row.pop("source_content")
+            row["source_hash"] = models.source_hash(text) if text is not None else None
+        new_ids = self._insert_returning_ids(models.TestPaper, rows)
+        self.paper_ids.update(zip((old for old, _ in self.papers), new_ids))
+        self.summary.papers += len(new_ids)
+        self.papers.clear()
+
+    def flush_questions(self):
+        self.flush_papers()
+        if not self.questions:
+            return
+        for _, row in self.questions:
+            row["test_paper_id"] = self.paper_ids[row["test_paper_id"]]
+        new_ids = self._insert_returning_ids(models.DBQuestion, [row for _, row in self.questions])
+        self.question_ids.update(zip((old for old, _ in self.questions), new_ids))
+        self.summary.questions += len(new_ids)
+        self.questions.clear()
+
+    def flush_results(self):
+        self.flush_questions()
+        if not self.results:
+            return
+        feedbacks = []
+        for row in self.results:
+            row["test_paper_id"] = self.paper_ids[row["test_paper_id"]]
+            # 提交記錄的 JSON 中通過題目ID引用題目，需要一併改寫；未導入的題目不計入統計
+            grading_results = _remap_items(row["grading_results"], self.question_ids)
+            dropped_correct = sum(1 for g in row["grading_results"] if g.get("is_correct")) - sum(1 for g in grading_results if g.get("is_correct"))
+            row["correct_objective_questions"] = max(0, row["correct_objective_questions"] - dropped_correct)
+            row["grading_results"] = grading_results
+            row["user_answers"] = _remap_items(row["user_answers"], self.question_ids)
+            # 單題反饋寫入 question_feedback 表，需要先得到新的提交ID
+            remapped_feedbacks = {}
+            for key, text in (row.pop("question_feedbacks") or {}).items():
+                question_id = _remap_question_id(key, self.question_ids)
+                if question_id is not None:
+                    remapped_feedbacks[question_id] = text
+            feedbacks.append(remapped_feedbacks)
+        if any(feedbacks):
+            new_ids = self._insert_returning_ids(models.TestPaperResult, self.results)
+            insert_question_feedbacks(self.db, dict(zip(new_ids, feedbacks)))
+        else:
+            self.db.execute(insert(models.TestPaperResult), self.results)
+        apply_results_to_statistics(self.db, [models.TestPaperResult(**row) for row in self.results])
+        self.summary.results += len(self.results)
+        self.results.clear()
+
+    def add(self, record):
+        if isinstance(record, schemas.TransferHeader):
+            return
+        if isinstance(record, schemas.PaperRecord):
+            row = record.model_dump(exclude={"kind", "id"})
+            # executemany 要求每行的列相同，因此缺省的創建時間在這裡補上
+            row["created_at"] = row["created_at"] or datetime.datetime.utcnow()
+            self.seen_papers.add(record.id)
+            self.papers.append((record.id, row))
+            if len(self.papers) >= self.batch_size:
+                self.flush_papers()
+            return
+
+        if record.test_paper_id not in self.seen_papers:
+            raise ValueError(f"unknown test_paper_id {record.test_paper_id}")
+
+        if isinstance(record, schemas.QuestionRecord):
+            question = record.question
+            self.questions.append((record.id, {
+                "test_paper_id": record.test_paper_id,
+                "question_type": question.type,
+                "stem": question.stem,
+                "options": question.options,
+                "correct_answer": question.answer.model_dump(),
+            }))
+            if len(self.questions) >= self.batch_size:
+                self.flush_questions()
+        else:
+            row = record.model_dump(exclude={"kind", "id"})
+            row["created_at"] = row["created_at"] or datetime.datetime.utcnow()
+            self.results.append(row)
+            if len(self.results) >= self.batch_size:
+                self.flush_results()
+
+def import_jsonl(db: Session, lines: Iterable[bytes], batch_size: Optional[int] = None, skip_invalid: bool = False) -> schemas.ImportSummary:
+    """
+    逐行導入 JSONL（每行用 schemas.TransferRecord 校驗），分批插入並重新分配ID。
+    所有數據在同一個事務中寫入，出錯時整體回滾；成功後提交。
+    """
+    importer = _Importer(db, batch_size or TRANSFER_BATCH_SIZE)
+    try:
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                importer.add(_record_adapter.validate_json(line))
+            except (ValidationError, ValueError) as e:
+                if skip_invalid:
+                    importer.summary.skipped += 1
+                    continue
+                raise HTTPException(status_code=400, detail=f"Line {line_number}: {e}")
+        importer.flush_results()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return importer.summary
@@ -0,0 +1,106 @@
+# backend/tests/conftest.py
+
+import os
+import sys
+from os.path import abspath, dirname
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# 让测试可以像应用本身一样直接导入 models / services / schemas
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+# 避免导入 main 时在工作目录下创建 test.db
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import models
+from models import Base
+from database import get_db
+
+CHOICE_TYPES = ("single_choice", "multiple_choice")
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """进程内缓存以试卷ID为键，而每个测试的内存数据库都会重用相同的ID。"""
+    from services import answer_key, dedup, drain, extraction, item_analysis, response_cache, speculation
+
+    answer_key._cache.clear()
+    extraction._cache.clear()
+    item_analysis._cache.clear()
+    response_cache._cache.clear()
+    dedup._index.clear()
+    drain.reset_drain()
+    speculation._entries.clear()
+    yield
+
+
+@pytest.fixture
+def engine():
+    """每个测试使用独立的内存 SQLite 数据库。"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_paper(db):
+    """
+    建立带题目的试卷：make_paper(name, questions, **试卷字段) -> (paper, 题目列表)。
+    questions 的每一项是 {type, stem, options, answer} 字典，或只有题干的字符串；
+    省略 type 时为单选题，选择题默认选项为 A/B，单选题默认答案为第一项。客观题与主观题数量按题型计算。
+    """
+    def make(name="试卷", questions=(), **fields):
+        rows = []
+        for spec in questions:
+            spec = {"stem": spec} if isinstance(spec, str) else spec
+            question_type = spec.get("type", "single_choice")
+            rows.append(models.DBQuestion(
+                question_type=question_type,
+                stem=spec["stem"],
+                options=spec.get("options", ["A", "B"] if question_type in CHOICE_TYPES else None),
+                correct_answer=spec.get("answer", {"index": 0, "explanation": ""}),
+            ))
+        fields.setdefault("total_objective_questions", sum(q.question_type != "essay" for q in rows))
+        fields.setdefault("total_essay_questions", sum(q.question_type == "essay" for q in rows))
+        paper = models.TestPaper(name=name, questions=rows, **fields)
+        db.add(paper)
+        db.commit()
+        return paper, rows
+
+    return make
+
+
+@pytest.fixture
+def client(engine):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        session = TestingSessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
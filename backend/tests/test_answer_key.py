@@ -0,0 +1,65 @@
+# backend/tests/test_answer_key.py
+
+import itertools
+
+from sqlalchemy import event
+
+import models
+import schemas
+import services
+from services import grading
+
+HEADERS = {"X-Provider": "siliconflow", "X-Api-Key": "test-key"}
+
+QUESTIONS = [
+    {"type": "single_choice", "stem": "单选", "options": ["A", "B", "C"], "answer": {"index": 1}},
+    {"type": "fill_in_the_blank", "stem": "填空", "answer": {"texts": [" for ", "while"]}},
+]
+
+
+def test_compiled_grading_matches_strategies():
+    cases = {
+        "single_choice": ([{"index": 1}, {}], [{"answer_index": i} for i in (None, 0, 1)]),
+        "multiple_choice": ([{"indexes": [0, 2]}, {"indexes": []}, {}],
+                            [{"answer_indices": v} for v in (None, [], [2, 0], [0, 2, 2], [0])]),
+        "fill_in_the_blank": ([{"texts": [" a ", "b"]}, ["a"], {"texts": []}, None],
+                              [{"answer_texts": v} for v in (None, [], ["a"], ["a ", " b"], ["", ""], ["a", "b", "c"])]),
+    }
+    for q_type, (correct_answers, answers) in cases.items():
+        for correct_answer, answer in itertools.product(correct_answers, answers):
+            question = models.DBQuestion(question_type=q_type, correct_answer=correct_answer)
+            user_answer = schemas.UserAnswer(question_type=q_type, **answer)
+            key = grading.compile_answer(q_type, correct_answer)
+            assert grading.grade_compiled_answer(q_type, key, user_answer) == \
+                grading.grade_objective_question(question, user_answer), (q_type, correct_answer, answer)
+
+
+def test_cached_key_skips_question_queries(engine, db, make_paper):
+    paper, _ = make_paper("编译答案", QUESTIONS)
+    services.get_answer_key(db, paper.id)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        services.get_answer_key(db, paper.id)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len(statements) == 1 and "FROM test_papers" in statements[0]
+
+
+def test_update_test_paper_invalidates_key(client, db, make_paper):
+    paper, questions = make_paper("编译答案", QUESTIONS)
+    answer = [{"question_id": str(questions[0].id), "question_type": "single_choice", "answer_index": 1}]
+    grade = lambda: client.post("/grade-questions", headers=HEADERS,
+                                json={"test_id": str(paper.id), "answers": answer}).json()["results"]
+    assert grade() == [{"question_id": str(questions[0].id), "is_correct": True}]
+
+    services.update_test_paper(db, paper.id, {"questions": [
+        {"type": "single_choice", "stem": "新单选", "options": ["A", "B"], "answer": {"index": 0, "explanation": ""}},
+    ]})
+    assert paper.version == 2
+    new_question = db.query(models.DBQuestion).filter_by(test_paper_id=paper.id).one()
+    answer[0]["question_id"] = str(new_question.id)
+    assert grade() == [{"question_id": str(new_question.id), "is_correct": False}]
+    assert services.get_answer_key(db, paper.id).total_objective_questions == 1
@@ -0,0 +1,95 @@
+# backend/tests/test_archive.py
+
+import datetime
+
+import orjson
+
+import models
+import services
+from tests.test_statistics import QUESTIONS, _dashboard, _submit
+
+
+def _submit_aged(client, db, paper, questions, count):
+    """提交 count 次，前 count-1 条的创建时间改到一年前。"""
+    ids = [_submit(client, paper, questions, i % 3, [0, 2] if i % 2 else [1]) for i in range(count)]
+    old = datetime.datetime.utcnow() - datetime.timedelta(days=365)
+    for i, result_id in enumerate(ids[:-1]):
+        db.query(models.TestPaperResult).filter(models.TestPaperResult.id == result_id).update(
+            {"created_at": old + datetime.timedelta(minutes=i)})
+    db.commit()
+    return ids
+
+
+def test_archive_moves_old_results_and_history_reads_both_tiers(client, db, make_paper):
+    paper, questions = make_paper("统计测试", QUESTIONS)
+    ids = _submit_aged(client, db, paper, questions, 6)
+    analysis_before = client.get(f"/history_test_papers/{paper.id}/item-analysis").json()
+    export_before = [orjson.loads(line) for line in b"".join(services.iter_jsonl_export(db)).splitlines()]
+
+    assert services.archive_old_results(db, older_than_days=30, batch_size=2) == 5
+    # 最新的一条不满足时间条件，仍在热表中
+    assert [r.id for r in db.query(models.TestPaperResult)] == [ids[-1]]
+    assert db.query(models.ArchivedTestPaperResult).count() == 5
+
+    assert [item["id"] for item in client.get("/history/summary").json()["items"]] == [ids[-1]]
+    page = client.get("/history/summary", params={"include_archived": True, "limit": 4, "include_total": True}).json()
+    assert page["total"] == 6
+    assert [item["id"] for item in page["items"]] == ids[::-1][:4]
+    assert [item["archived"] for item in page["items"]] == [False, True, True, True]
+    rest = client.get("/history/summary", params={"include_archived": True, "limit": 4, "cursor": page["next_cursor"]}).json()
+    assert [item["id"] for item in rest["items"]] == ids[::-1][4:]
+
+    full = client.get("/history/", params={"include_archived": True, "order": "asc"}).json()["items"]
+    assert [item["id"] for item in full] == ids
+    assert full[0]["archived"] and full[0]["test_paper"]["name"] == "统计测试"
+    assert full[0]["user_answers"][0]["question_id"] == str(questions[0].id)
+
+    detail = client.get(f"/history/{ids[0]}").json()
+    assert detail["archived"] and detail["grading_results"]
+
+    # 统计、项目分析和导出都包含归档记录
+    assert client.get(f"/history_test_papers/{paper.id}/item-analysis").json() == analysis_before
+    export_after = [orjson.loads(line) for line in b"".join(services.iter_jsonl_export(db)).splitlines()]
+    assert export_after[1:] == export_before[1:]
+    dashboard = _dashboard(client, paper)
+    services.rebuild_statistics(db)
+    db.commit()
+    assert _dashboard(client, paper) == dashboard
+
+
+def test_archived_results_can_be_deleted_or_restored(client, db, make_paper):
+    paper, questions = make_paper("统计测试", QUESTIONS)
+    ids = _submit_aged(client, db, paper, questions, 3)
+    services.archive_old_results(db, older_than_days=30)
+    attempts = _dashboard(client, paper)["attempts"]
+
+    assert client.delete(f"/history/{ids[0]}").status_code == 204
+    assert client.get(f"/history/{ids[0]}").status_code == 404
+    assert _dashboard(client, paper)["attempts"] == attempts - 1
+
+    # 需要修改记录（例如保存反馈）时会先把它移回热表
+    restored = services.get_test_result_by_id(db, ids[1])
+    assert restored.id == ids[1] and restored.grading_results
+    assert db.query(models.ArchivedTestPaperResult).count() == 0
+    assert client.get(f"/history/{ids[1]}").json()["archived"] is False
+
+    # 删除试卷时一并删除归档记录
+    services.archive_old_results(db, older_than_days=30)
+    assert db.query(models.ArchivedTestPaperResult).count() == 1
+    assert client.delete(f"/history_test_papers/{paper.id}").status_code == 204
+    assert db.query(models.ArchivedTestPaperResult).count() == 0
+
+
+def test_new_results_never_reuse_archived_ids(client, db, make_paper):
+    paper, questions = make_paper("统计测试", QUESTIONS)
+    ids = _submit_aged(client, db, paper, questions, 3)
+    assert services.archive_old_results(db, older_than_days=30) == 2
+
+    # 删除热表中最新的一条后，新的提交仍然不会拿到已归档的ID
+    assert client.delete(f"/history/{ids[-1]}").status_code == 204
+    new_id = _submit(client, paper, questions, 1, [0, 2])
+    assert new_id > ids[-1]
+
+    listed = [item["id"] for item in client.get("/history/", params={"include_archived": True, "order": "asc"}).json()["items"]]
+    assert listed == ids[:2] + [new_id]
+    assert client.get(f"/history/{ids[0]}").json()["archived"] is True
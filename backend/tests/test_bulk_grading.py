@@ -0,0 +1,67 @@
+# backend/tests/test_bulk_grading.py
+
+import json
+
+import models
+
+QUESTIONS = [
+    {"type": "single_choice", "stem": "单选", "options": ["A", "B", "C"], "answer": {"index": 1, "explanation": ""}},
+    {"type": "multiple_choice", "stem": "多选", "options": ["A", "B", "C", "D"], "answer": {"indexes": [0, 2], "explanation": ""}},
+    {"type": "fill_in_the_blank", "stem": "填空", "answer": {"texts": ["x", "y"]}},
+    {"type": "essay", "stem": "论述", "answer": {"reference_explanation": "参考"}},
+]
+
+
+def _answers(questions, single, multiple, texts):
+    return [
+        {"question_id": str(questions[0].id), "question_type": "single_choice", "answer_index": single},
+        {"question_id": str(questions[1].id), "question_type": "multiple_choice", "answer_indices": multiple},
+        {"question_id": str(questions[2].id), "question_type": "fill_in_the_blank", "answer_texts": texts},
+        {"question_id": str(questions[3].id), "question_type": "essay", "answer_text": "作答"},
+    ]
+
+
+def test_bulk_json_grades_in_one_request(client, db, make_paper):
+    paper, questions = make_paper("批量批改", QUESTIONS)
+    body = {"test_id": str(paper.id), "submissions": [
+        {"student_id": "s1", "answers": _answers(questions, 1, [0, 2], ["x", "y"])},
+        {"student_id": "s2", "answers": _answers(questions, 0, [0, 2], ["x", "z"])},
+    ]}
+    response = client.post("/grade-questions/bulk", json=body)
+    assert response.status_code == 200
+    data = response.json()
+    assert [s["correct_objective_questions"] for s in data["students"]] == [3, 1]
+    assert [s["student_id"] for s in data["students"]] == ["s1", "s2"]
+    assert data["aggregates"]["mean_score"] == round((100 + 100 / 3) / 2, 2)
+    assert data["aggregates"]["question_correct_rates"][str(questions[0].id)] == 0.5
+
+    stored = db.get(models.TestPaperResult, data["students"][1]["result_id"])
+    assert stored.correct_objective_questions == 1
+    assert db.get(models.PaperStatistics, paper.id).attempts == 2
+
+
+def test_bulk_csv_upload(client, make_paper):
+    paper, questions = make_paper("批量批改", QUESTIONS)
+    header = "student_id," + ",".join(str(q.id) for q in questions)
+    csv_text = "\n".join([header, "s1,B,AC,x|y,答案", "s2,0,\"A, C\",x,", ""])
+    response = client.post(
+        "/grade-questions/bulk/upload",
+        data={"test_id": str(paper.id)},
+        files={"file": ("answers.csv", csv_text.encode("utf-8"), "text/csv")},
+    )
+    assert response.status_code == 200
+    students = response.json()["students"]
+    assert [(s["student_id"], s["correct_objective_questions"]) for s in students] == [("s1", 3), ("s2", 1)]
+
+
+def test_bulk_jsonl_upload_reports_bad_line(client, db, make_paper):
+    paper, questions = make_paper("批量批改", QUESTIONS)
+    lines = [json.dumps({"student_id": "s1", "answers": _answers(questions, 1, [0], ["x"])}), "{not json"]
+    response = client.post(
+        "/grade-questions/bulk/upload",
+        data={"test_id": str(paper.id)},
+        files={"file": ("answers.jsonl", "\n".join(lines).encode("utf-8"), "application/x-ndjson")},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Line 2")
+    assert db.query(models.TestPaperResult).count() == 0
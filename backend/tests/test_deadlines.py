@@ -0,0 +1,91 @@
+# backend/tests/test_deadlines.py
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+import models
+import services
+from services import ai, deadlines
+
+CONFIG = {"description": "循环", "question_config": [{"type": "single_choice", "count": 2}], "difficulty": "中等"}
+HEADERS = {"X-Provider": "siliconflow", "X-Api-Key": "k", "X-Generation-Model": "m"}
+QUESTION = {"type": "single_choice", "stem": "for 循环适合做什么？", "options": ["遍历序列", "定义函数"], "answer": {"index": 0, "explanation": ""}}
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def _fake_client(monkeypatch, create):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(ai, "get_llm_client", lambda provider, api_key: client)
+
+
+def test_stream_stages_and_request_deadline(monkeypatch):
+    monkeypatch.setattr(deadlines, "LLM_IDLE_TIMEOUT_SECONDS", 0.05)
+
+    async def stalls_after(n):
+        for i in range(n):
+            yield i
+        await asyncio.sleep(10)
+
+    async def collect(stream, **kwargs):
+        received = []
+        with pytest.raises(deadlines.LLMTimeoutError) as info:
+            async for item in deadlines.iter_with_timeouts(stream, **kwargs):
+                received.append(item)
+        return received, info.value.stage
+
+    assert asyncio.run(collect(stalls_after(2))) == ([0, 1], "idle")
+    assert asyncio.run(collect(stalls_after(0), first_token_timeout=0.05)) == ([], "first_token")
+
+    async def with_deadline():
+        deadlines.set_request_deadline(0.05)
+        with pytest.raises(deadlines.LLMTimeoutError) as info:
+            await deadlines.wait_stage(asyncio.sleep(10), "response", 120)
+        return info.value.stage
+
+    assert asyncio.run(with_deadline()) == "deadline"
+
+
+def test_stalled_generation_saves_questions_received(client, db, monkeypatch):
+    monkeypatch.setattr(deadlines, "LLM_IDLE_TIMEOUT_SECONDS", 0.1)
+    paper = models.TestPaper(name="超时", source_content="循环", config=CONFIG)
+    db.add(paper)
+    db.commit()
+
+    async def create(**params):
+        async def stream():
+            yield _chunk('{"title": "循环测验"}%%END_OF_META%%')
+            yield _chunk(f"```json\n{json.dumps(QUESTION, ensure_ascii=False)}\n```%%END_OF_QUESTION%%")
+            yield _chunk('```json\n{"type": "single_choice", "stem": "写到一半')
+            await asyncio.sleep(10)
+        return stream()
+
+    _fake_client(monkeypatch, create)
+    response = client.get(f"/generate-stream-test/{paper.id}", headers=HEADERS)
+    events = [orjson.loads(line[len("data:"):]) for line in response.text.splitlines() if line.startswith("data:")]
+
+    assert [e["type"] for e in events] == ["metadata", "question", "interrupted"]
+    assert events[-1]["content"] == {"reason": "timeout", "stage": "idle", "saved_questions": 1}
+    db.expire_all()
+    saved = db.get(models.TestPaper, paper.id)
+    assert [q.stem for q in saved.questions] == [QUESTION["stem"]]
+    assert saved.content_hash is None
+
+
+def test_request_timeout_header_bounds_llm_calls(client, monkeypatch):
+    async def create(**params):
+        await asyncio.sleep(10)
+
+    _fake_client(monkeypatch, create)
+    data = {"source_text": "循环", "config_json": json.dumps(CONFIG)}
+
+    response = client.post("/generate-test", data=data, headers={**HEADERS, services.DEADLINE_HEADER: "0.1"})
+    assert response.status_code == 504
+    assert "deadline" in response.json()["detail"]
+    assert client.post("/generate-test", data=data, headers={**HEADERS, services.DEADLINE_HEADER: "soon"}).status_code == 400
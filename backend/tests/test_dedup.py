@@ -0,0 +1,106 @@
+# backend/tests/test_dedup.py
+
+import orjson
+
+import models
+import services
+from services import dedup
+
+STEM = "以下哪种循环结构用于遍历列表、元组或字符串等序列中的每一个元素？"
+OPTIONS = ["for 循环", "while 循环", "do-while 循环", "goto 语句"]
+HASH = {"stem": "哈希表发生冲突时可以如何处理？", "options": ["链地址法", "开放寻址法"]}
+B_TREE = {"stem": "数据库中 B+ 树索引的特点是什么？", "options": ["有序", "无序"]}
+
+
+def test_signature_ignores_punctuation_case_and_option_order():
+    a = dedup.minhash_signature(STEM, OPTIONS)
+    b = dedup.minhash_signature(STEM.replace("？", "?").replace("、", ", "), list(reversed(OPTIONS)))
+    c = dedup.minhash_signature("数据库中 B+ 树索引与哈希索引相比有哪些优势？", ["范围查询", "等值查询"])
+    assert dedup.estimate_similarity(a, b) == 1.0
+    assert dedup.estimate_similarity(a, c) < 0.3
+    assert dedup.minhash_signature("", None) is None
+
+
+def test_finds_near_duplicates_in_other_papers(db, make_paper):
+    original, _ = make_paper("循环", [{"stem": STEM, "options": OPTIONS}, B_TREE])
+    matches = services.find_duplicate_questions(db, STEM.replace("每一个", "每个"), OPTIONS)
+    assert [m.test_paper_id for m in matches] == [original.id]
+    assert matches[0].similarity >= services.DUPLICATE_THRESHOLD
+
+    # 题目被插入后无需显式通知，下一次查询会增量索引
+    copy, _ = make_paper("循环（副本）", [{"stem": STEM + "！", "options": OPTIONS}])
+    matches = services.find_duplicate_questions(db, STEM, OPTIONS, exclude_test_paper_id=original.id)
+    assert [m.test_paper_id for m in matches] == [copy.id]
+
+    # 重新生成后旧题目被删除，不再被报告为重复
+    services.update_test_paper(db, copy.id, {"questions": [
+        {"type": "single_choice", **HASH, "answer": {"index": 0, "explanation": ""}},
+    ]})
+    matches = services.find_duplicate_questions(db, STEM, OPTIONS)
+    assert [m.test_paper_id for m in matches] == [original.id]
+
+
+def test_duplicate_clusters_endpoint(client, make_paper):
+    make_paper("A", [{"stem": STEM, "options": OPTIONS}, HASH])
+    make_paper("B", [{"stem": STEM + "（单选）", "options": OPTIONS}])
+    make_paper("C", [{"stem": STEM, "options": list(reversed(OPTIONS))}, B_TREE])
+
+    data = client.get("/search/duplicates").json()
+    assert len(data["clusters"]) == 1
+    cluster = data["clusters"][0]
+    assert cluster["size"] == 3
+    assert {q["test_paper_name"] for q in cluster["questions"]} == {"A", "B", "C"}
+    assert cluster["similarity"] >= data["threshold"]
+    assert data["next_offset"] is None
+
+
+def test_stream_drops_duplicates(client, db, make_paper, monkeypatch):
+    make_paper("已有试卷", [{"stem": STEM, "options": OPTIONS}])
+    target, _ = make_paper("新试卷", config={"description": "", "question_config": [], "difficulty": "中等"}, source_content="循环")
+
+    fresh = {"type": "single_choice", **HASH, "answer": {"index": 0, "explanation": ""}}
+    repeated = {"type": "single_choice", "stem": STEM, "options": OPTIONS, "answer": {"index": 0, "explanation": ""}}
+
+    async def fake_stream(**kwargs):
+        for payload in ({"type": "metadata", "content": {"title": "新试卷"}},
+                        {"type": "question", "content": fresh},
+                        {"type": "question", "content": repeated},
+                        {"type": "question", "content": dict(fresh, stem=fresh["stem"] + "？")}):
+            yield f"data: {orjson.dumps(payload).decode()}\n\n"
+
+    monkeypatch.setattr(services, "generate_test_stream_from_ai", fake_stream)
+    headers = {"X-Provider": "google", "X-Api-Key": "k", "X-Generation-Model": "m"}
+    response = client.get(f"/generate-stream-test/{target.id}", params={"duplicates": "drop"}, headers=headers)
+    events = [orjson.loads(line[len("data:"):]) for line in response.text.splitlines() if line.startswith("data:")]
+
+    assert [e["type"] for e in events] == ["metadata", "question", "duplicate", "duplicate"]
+    assert events[2]["content"]["duplicate_of"][0]["test_paper_id"] != target.id
+    assert events[3]["content"]["duplicate_of"][0]["generated_index"] == 0
+    db.expire_all()
+    saved = db.get(models.TestPaper, target.id)
+    assert [q.stem for q in saved.questions] == [fresh["stem"]]
+    # 缺少被丢弃题目的试卷不记录内容哈希，不会被 reuse=serve 复用
+    assert saved.content_hash is None
+
+
+def test_deleted_question_ids_are_not_reused(client, db, make_paper):
+    paper, questions = make_paper("循环", [{"stem": STEM, "options": OPTIONS}])
+    deleted_id = questions[0].id
+    assert services.find_duplicate_questions(db, STEM, OPTIONS)
+
+    assert client.delete(f"/history_test_papers/{paper.id}").status_code == 204
+    db.expunge_all()
+    _, others = make_paper("哈希", [HASH])
+    assert others[0].id > deleted_id
+
+    # 新题目被增量索引，已删除的题目不再被报告
+    assert [m.question_id for m in services.find_duplicate_questions(db, HASH["stem"], HASH["options"])] == [others[0].id]
+    assert services.find_duplicate_questions(db, STEM, OPTIONS) == []
+
+
+def test_ids_committed_out_of_order_are_indexed(db, engine, make_paper, monkeypatch):
+    _, (early, late) = make_paper("循环", [{"stem": STEM, "options": OPTIONS}, HASH])
+    # 模拟 PostgreSQL：较大的ID先提交并被索引，较小的ID之后才出现
+    dedup._index.add([(late.id, late.test_paper_id, late.stem, late.options)])
+    monkeypatch.setattr(engine.dialect, "name", "postgresql")
+    assert [m.question_id for m in services.find_duplicate_questions(db, STEM, OPTIONS)] == [early.id]
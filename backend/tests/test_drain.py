@@ -0,0 +1,84 @@
+# backend/tests/test_drain.py
+
+import asyncio
+
+import orjson
+
+import models
+import services
+from services import drain
+
+HEADERS = {"X-Provider": "google", "X-Api-Key": "k", "X-Generation-Model": "m"}
+QUESTION = {"type": "single_choice", "stem": "for 循环适合做什么？", "options": ["遍历序列", "定义函数"], "answer": {"index": 0, "explanation": ""}}
+
+
+def _events(response):
+    return [orjson.loads(line[len("data:"):]) for line in response.text.splitlines() if line.startswith("data:")]
+
+
+def _paper(db):
+    paper = models.TestPaper(name="排空", source_content="循环",
+                             config={"description": "", "question_config": [], "difficulty": "中等"})
+    db.add(paper)
+    db.commit()
+    return paper
+
+
+def test_stream_stops_at_checkpoint_deadline(monkeypatch):
+    monkeypatch.setattr(drain, "DRAIN_TIMEOUT_SECONDS", 0.2)
+    monkeypatch.setattr(drain, "DRAIN_CHECKPOINT_MARGIN_SECONDS", 0.1)
+    closed = []
+
+    async def slow():
+        try:
+            for i in range(10):
+                yield i
+                await asyncio.sleep(0.05)
+        finally:
+            closed.append(True)
+
+    async def consume():
+        stream = drain.DrainAwareStream(slow())
+        received = [await stream.__anext__()]
+        drain.begin_drain()
+        async for item in stream:
+            received.append(item)
+        return stream, received
+
+    stream, received = asyncio.run(consume())
+    assert stream.interrupted and closed == [True]
+    assert 1 < len(received) < 10
+
+
+def test_new_requests_are_rejected_while_draining(client):
+    drain.begin_drain()
+    response = client.get("/test-papers/1", headers={"Origin": "http://localhost:5173"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert response.headers["connection"] == "close"
+    # 浏览器能读到 503，而不是报告跨域错误
+    assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
+
+
+def test_interrupted_stream_saves_partial_paper(client, db, monkeypatch):
+    paper = _paper(db)
+    monkeypatch.setattr(drain, "DRAIN_TIMEOUT_SECONDS", 0)
+    monkeypatch.setattr(drain, "DRAIN_POLL_SECONDS", 0.01)
+
+    async def fake_stream(**kwargs):
+        yield f"data: {orjson.dumps({'type': 'metadata', 'content': {'title': '排空'}}).decode()}\n\n"
+        yield f"data: {orjson.dumps({'type': 'question', 'content': QUESTION}).decode()}\n\n"
+        # 生成下一题期间服务器收到 SIGTERM
+        drain.begin_drain()
+        await asyncio.sleep(0.2)
+        yield f"data: {orjson.dumps({'type': 'question', 'content': dict(QUESTION, stem='while 呢？')}).decode()}\n\n"
+
+    monkeypatch.setattr(services, "generate_test_stream_from_ai", fake_stream)
+    events = _events(client.get(f"/generate-stream-test/{paper.id}", headers=HEADERS))
+
+    assert [e["type"] for e in events] == ["metadata", "question", "interrupted"]
+    assert events[-1]["content"] == {"reason": "server_shutdown", "saved_questions": 1}
+    db.expire_all()
+    saved = db.get(models.TestPaper, paper.id)
+    assert [q.stem for q in saved.questions] == [QUESTION["stem"]]
+    assert saved.content_hash is None
@@ -0,0 +1,119 @@
+# backend/tests/test_essay_evaluation.py
+
+import asyncio
+import datetime
+
+import httpx
+
+import models
+import schemas
+import services
+from services import ai
+from tests.test_statistics import QUESTIONS, _submit
+
+HEADERS = {"X-Provider": "siliconflow", "X-Api-Key": "k", "X-Evaluation-Model": "m"}
+
+
+def _fake_evaluation(monkeypatch, delay=0.0):
+    calls = []
+
+    async def fake_evaluate(request, provider, api_key, evaluation_model=None, evaluation_prompt=None):
+        calls.append(request.user_answer)
+        await asyncio.sleep(delay)
+        return schemas.EvaluateShortAnswerResponse(
+            score=60 + len(calls), feedback=f"评估 {len(calls)}", strengths=["结构"], areas_for_improvement=[],
+            reference_explanation=request.question.reference_explanation,
+        )
+
+    monkeypatch.setattr(ai, "evaluate_essay_with_ai", fake_evaluate)
+    return calls
+
+
+def _body(result_id=None, question=None, answer="作答"):
+    body = {"question": {"stem": "论述", "reference_explanation": "参考"}, "user_answer": answer}
+    if result_id is not None:
+        body.update(result_id=result_id, question_id=str(question.id))
+    return body
+
+
+def test_evaluation_is_stored_on_the_result_and_reused(client, db, make_paper, monkeypatch):
+    calls = _fake_evaluation(monkeypatch)
+    paper, questions = make_paper("统计测试", QUESTIONS)
+    result_id = _submit(client, paper, questions, 1, [0, 2])
+
+    first = client.post("/evaluate-short-answer", json=_body(result_id, questions[2]), headers=HEADERS).json()
+    assert first["score"] == 61 and first["cached"] is False
+    # 重新打开记录时直接返回保存的评估
+    again = client.post("/evaluate-short-answer", json=_body(result_id, questions[2]), headers=HEADERS).json()
+    assert again == {**first, "cached": True}
+    stored = client.get(f"/history/{result_id}").json()["essay_evaluations"]
+    assert stored == {str(questions[2].id): {"score": 61, "feedback": "评估 1", "strengths": ["结构"],
+                                              "areas_for_improvement": [], "model": "m"}}
+
+    # 只有空白和全半角不同的作答命中缓存，换模型或改写作答时重新评估
+    other = _submit(client, paper, questions, 0, [0])
+    reused = client.post("/evaluate-short-answer", json=_body(other, questions[2], answer=" 作答\n"), headers=HEADERS).json()
+    assert reused["score"] == 61 and reused["cached"] is True
+    assert client.get(f"/history/{other}").json()["essay_evaluations"][str(questions[2].id)]["score"] == 61
+    client.post("/evaluate-short-answer", json=_body(result_id, questions[2]), headers={**HEADERS, "X-Evaluation-Model": "n"})
+    client.post("/evaluate-short-answer", json=_body(), headers=HEADERS)
+    assert calls == ["作答", "作答"]
+    assert client.get(f"/history/{result_id}").json()["essay_evaluations"][str(questions[2].id)]["model"] == "n"
+    assert db.query(models.EssayEvaluation).count() == 2
+
+    # 删除试卷时一并删除
+    client.delete(f"/history_test_papers/{paper.id}")
+    assert db.query(models.EssayEvaluation).count() == 0
+
+
+def test_concurrent_identical_evaluations_call_the_llm_once(client, db, monkeypatch):
+    from main import app
+
+    calls = _fake_evaluation(monkeypatch, delay=0.2)
+
+    async def send_three():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as ac:
+            return await asyncio.gather(*(ac.post("/evaluate-short-answer", json=_body(), headers=HEADERS) for _ in range(3)))
+
+    responses = asyncio.run(send_three())
+    assert [response.json()["score"] for response in responses] == [61] * 3
+    assert calls == ["作答"]
+    assert db.query(models.EssayEvaluation).count() == 1
+
+
+def test_archive_and_restore_keep_evaluations(client, db, make_paper, monkeypatch):
+    _fake_evaluation(monkeypatch)
+    paper, questions = make_paper("统计测试", QUESTIONS)
+    result_id = _submit(client, paper, questions, 1, [0, 2])
+    client.post("/evaluate-short-answer", json=_body(result_id, questions[2]), headers=HEADERS)
+    db.query(models.TestPaperResult).filter(models.TestPaperResult.id == result_id).update(
+        {"created_at": datetime.datetime.utcnow() - datetime.timedelta(days=365)})
+    db.commit()
+
+    assert services.archive_old_results(db, older_than_days=30) == 1
+    assert db.query(models.EssayEvaluation).count() == 0
+    assert client.get(f"/history/{result_id}").json()["essay_evaluations"][str(questions[2].id)]["score"] == 61
+
+    # 再次评估时记录被恢复到热表，评估随之写回并直接复用
+    response = client.post("/evaluate-short-answer", json=_body(result_id, questions[2]), headers=HEADERS).json()
+    assert response["cached"] is True
+    row = db.query(models.EssayEvaluation).one()
+    assert (row.result_id, row.question_id, row.score) == (result_id, questions[2].id, 61)
+
+
+def test_question_must_belong_to_the_result_and_cache_rows_expire(client, db, make_paper, monkeypatch):
+    _fake_evaluation(monkeypatch)
+    paper, questions = make_paper("统计测试", QUESTIONS)
+    result_id = _submit(client, paper, questions, 1, [0, 2])
+    _, (other,) = make_paper("其他试卷", [{"type": "essay", "stem": "论述", "answer": {"reference_explanation": "参考"}}])
+    response = client.post("/evaluate-short-answer", json=_body(result_id, other), headers=HEADERS)
+    assert response.status_code == 400
+    assert db.query(models.EssayEvaluation).count() == 0
+
+    # 只作缓存的评估超过保留期后被清理，保存在提交记录下的评估保留
+    client.post("/evaluate-short-answer", json=_body(), headers=HEADERS)
+    client.post("/evaluate-short-answer", json=_body(result_id, questions[2], answer="另一份作答"), headers=HEADERS)
+    db.query(models.EssayEvaluation).update({"created_at": datetime.datetime.utcnow() - datetime.timedelta(days=365)})
+    db.commit()
+    assert services.purge_cached_essay_evaluations(db) == 1
+    assert [row.result_id for row in db.query(models.EssayEvaluation)] == [result_id]
@@ -0,0 +1,63 @@
+# backend/tests/test_export.py
+
+import models
+from routers import export
+
+NAME = "<script>名称</script>"
+QUESTIONS = [
+    {"type": "single_choice", "stem": "<b>单选</b>", "options": ["<i>甲</i>", "乙"], "answer": {"index": 1, "explanation": "单选解析"}},
+    {"type": "multiple_choice", "stem": "多选", "options": ["甲", "乙", "丙"], "answer": {"indexes": [0, 2], "explanation": ""}},
+    {"type": "fill_in_the_blank", "stem": "填空", "answer": {"texts": ["for", "while"], "explanation": ""}},
+    {"type": "essay", "stem": "论述", "answer": {"reference_explanation": "参考答案"}},
+]
+
+
+def test_html_export_escapes_and_renders_answers(client, make_paper):
+    paper, _ = make_paper(NAME, QUESTIONS)
+    html = client.get(f"/export/test-paper/{paper.id}/html").text
+    assert "<script>名称</script>" not in html and "&lt;script&gt;名称&lt;/script&gt;" in html
+    assert "1. &lt;b&gt;单选&lt;/b&gt;" in html and "A. &lt;i&gt;甲&lt;/i&gt;" in html
+    assert "正确答案: B" in html and "正确答案: A, C" in html
+    assert "<li>空白 2: while</li>" in html and "参考答案" in html
+    assert 'id="q' in html and html.count('class="question"') == 4
+
+
+def test_html_export_without_answers_is_cached_separately(client, make_paper, monkeypatch):
+    paper, _ = make_paper(NAME, QUESTIONS)
+    monkeypatch.setattr(export, "EXPORT_CHUNK_SIZE", 256)
+    with_answers = client.get(f"/export/test-paper/{paper.id}/html")
+    blank = client.get(f"/export/test-paper/{paper.id}/html", params={"include_answers": "false"})
+    assert blank.status_code == 200 and "单选解析" not in blank.text and 'class="show-answer"' not in blank.text
+    assert "单选解析" in with_answers.text
+    assert blank.headers["etag"] != with_answers.headers["etag"]
+    assert client.get(f"/export/test-paper/{paper.id}/html", params={"include_answers": "false"},
+                      headers={"If-None-Match": blank.headers["etag"]}).status_code == 304
+
+
+def test_bulk_zip_export_streams_filtered_papers(client, db, make_paper):
+    import datetime
+    import io
+    import json
+    import zipfile
+
+    (first, _), (second, _) = make_paper(NAME, QUESTIONS), make_paper(NAME, QUESTIONS)
+    second.name = "第二份"
+    second.created_at = datetime.datetime(2020, 1, 1)
+    db.add(models.TestPaperResult(test_paper_id=first.id, user_answers=[], grading_results=[],
+                                  correct_objective_questions=2, overall_feedback="很好"))
+    db.commit()
+
+    response = client.get("/export/papers.zip")
+    assert response.status_code == 200 and response.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    names = sorted(archive.namelist())
+    assert names == [f"{first.id:06d}-script_名称_script/paper.html", f"{first.id:06d}-script_名称_script/results.json",
+                     f"{second.id:06d}-第二份/paper.html", f"{second.id:06d}-第二份/results.json"]
+    results = json.loads(archive.read(names[1]))
+    assert [(r["correct_objective_questions"], r["overall_feedback"]) for r in results] == [(2, "很好")]
+    assert json.loads(archive.read(names[3])) == []
+
+    response = client.get("/export/papers.zip", params={"created_from": "2024-01-01T00:00:00", "include_results": "false"})
+    assert zipfile.ZipFile(io.BytesIO(response.content)).namelist() == [f"{first.id:06d}-script_名称_script/paper.html"]
+    response = client.get("/export/papers.zip", params=[("ids", second.id), ("search", "第二")])
+    assert len(zipfile.ZipFile(io.BytesIO(response.content)).namelist()) == 2
@@ -0,0 +1,119 @@
+# backend/tests/test_extraction.py
+
+import io
+import json
+import zipfile
+
+import models
+import services
+from services import extraction
+
+CONFIG = {"description": "循环", "question_config": [{"type": "single_choice", "count": 1}], "difficulty": "中等"}
+TEXT = "第一章 循环结构\nfor 循环用于遍历序列，while 循环在条件为真时重复执行。\n" * 20
+
+
+def _upload(client, filename, content):
+    return client.post("/tests", data={"config_json": json.dumps(CONFIG)}, files={"source_file": (filename, content)})
+
+
+def _source(db, response):
+    assert response.status_code == 201, response.text
+    return db.get(models.TestPaper, response.json()["test_id"]).source_content
+
+
+def _docx(paragraphs):
+    ns = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", f'<w:document xmlns:w="{ns}"><w:body>{body}</w:body></w:document>')
+    return buffer.getvalue()
+
+
+def _pdf(text):
+    """一页只包含一行文字的最小 PDF。"""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def test_text_uploads_in_any_encoding(client, db):
+    for encoding in ("utf-8", "utf-8-sig", "utf-16", "gb18030"):
+        source = _source(db, _upload(client, "notes.md", TEXT.encode(encoding)))
+        assert source == "以下是文件内容：\n" + TEXT.strip(), encoding
+
+    response = _upload(client, "image.png", b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR" + bytes(range(256)) * 4)
+    assert response.status_code == 415
+
+
+def test_docx_and_pdf_are_extracted_and_cached_by_file_hash(client, db, monkeypatch):
+    assert "第一段\n第二段" in _source(db, _upload(client, "lesson.docx", _docx(["第一段", "第二段"])))
+
+    pdf = _pdf("Loops repeat a block of code")
+    assert "Loops repeat a block of code" in _source(db, _upload(client, "lesson.pdf", pdf))
+
+    # 同一文件再次上传时不再提取
+    def fail(*args):
+        raise AssertionError("extraction should be served from the cache")
+
+    monkeypatch.setattr(extraction, "extract_text", fail)
+    assert "Loops repeat a block of code" in _source(db, _upload(client, "renamed.pdf", pdf))
+
+
+def test_upload_size_limit(client, monkeypatch):
+    monkeypatch.setattr(extraction, "SOURCE_UPLOAD_MAX_BYTES", 1024)
+    assert _upload(client, "big.txt", b"a" * 2048).status_code == 413
+    assert _upload(client, "small.txt", b"a" * 512).status_code == 201
+    assert services.SOURCE_UPLOAD_MAX_BYTES > 1024
+
+
+def test_broken_pool_is_rebuilt_and_slow_extraction_times_out(client, db, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    class BrokenPool(ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            raise BrokenProcessPool("a worker died")
+
+    # 工作进程崩溃后丢弃进程池，用新建的进程池重试
+    pools = [BrokenPool(), ThreadPoolExecutor(1)]
+    monkeypatch.setattr(extraction, "_get_pool", lambda: pools.pop(0))
+    assert "第一段" in _source(db, _upload(client, "lesson.docx", _docx(["第一段"])))
+    # 重试仍然失败时返回 503
+    pools = [BrokenPool(), BrokenPool()]
+    monkeypatch.setattr(extraction, "_get_pool", lambda: pools.pop(0))
+    response = _upload(client, "other.docx", _docx(["第二段"]))
+    assert response.status_code == 503 and response.headers["Retry-After"] == "1"
+
+    monkeypatch.setattr(extraction, "_get_pool", lambda: None)
+    monkeypatch.setattr(extraction, "EXTRACTION_TIMEOUT_SECONDS", 0.1)
+    original = extraction.extract_text
+
+    def slow(kind, data):
+        import time
+        time.sleep(0.5)
+        return original(kind, data)
+
+    monkeypatch.setattr(extraction, "extract_text", slow)
+    assert _upload(client, "slow.docx", _docx(["第三段"])).status_code == 422
+
+
+def test_docx_document_size_is_capped(client, monkeypatch):
+    monkeypatch.setattr(extraction, "EXTRACTION_WORKERS", 0)
+    monkeypatch.setattr(extraction, "DOCX_DOCUMENT_MAX_BYTES", 4096)
+    assert _upload(client, "small.docx", _docx(["短"])).status_code == 201
+    assert _upload(client, "bomb.docx", _docx(["长" * 4096])).status_code == 415
@@ -0,0 +1,92 @@
+# backend/tests/test_generation_reuse.py
+
+import json
+import urllib.parse
+
+import models
+import schemas
+import services
+
+CONFIG = {"description": "循环", "question_config": [{"type": "single_choice", "count": 1}], "difficulty": "中等"}
+HEADERS = {"X-Provider": "google", "X-Api-Key": "k", "X-Generation-Model": "gemini-1.5-flash"}
+
+
+def _fake_generation(monkeypatch):
+    calls = []
+
+    async def fake_generate_test_from_ai(**kwargs):
+        calls.append(kwargs)
+        return {"title": "循环测验", "questions": [
+            {"type": "single_choice", "stem": f"第{len(calls)}次生成的题目", "options": ["for", "while"], "answer": {"index": 0, "explanation": ""}},
+        ]}
+
+    monkeypatch.setattr(services, "generate_test_from_ai", fake_generate_test_from_ai)
+    return calls
+
+
+def _generate(client, source_text="Python 循环\n", **form):
+    data = {"source_text": source_text, "config_json": json.dumps(CONFIG), **form}
+    response = client.post("/generate-test", data=data, headers=HEADERS)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_content_hash_normalizes_source_and_covers_model():
+    config = schemas.GenerateTestConfig.model_validate(CONFIG)
+    base = services.generation_content_hash("第一行\n\n\n第二行", config, None, "m")
+    assert services.generation_content_hash("第一行  \r\n\r\n第二行\r\n", config, None, "m") == base
+    assert services.generation_content_hash("第一行\n\n\n第二行", config, None, "other") != base
+    assert services.generation_content_hash("第一行\n\n\n第二行", config, "提示", "m") != base
+
+
+def test_generate_test_reuse_modes(client, monkeypatch):
+    calls = _fake_generation(monkeypatch)
+
+    first = _generate(client, reuse="serve")
+    assert first["reused_from"] is None and len(calls) == 1
+
+    served = _generate(client, source_text="Python 循环\r\n\r\n", reuse="serve")
+    assert served["test_id"] == first["test_id"] and served["reused_from"] == first["test_id"]
+
+    cloned = _generate(client, reuse="clone", name="副本")
+    assert cloned["test_id"] != first["test_id"] and cloned["name"] == "副本"
+    assert [q["stem"] for q in cloned["questions"]] == [q["stem"] for q in first["questions"]]
+    assert len(calls) == 1
+
+    fresh = _generate(client, reuse="serve", force_fresh="true")
+    assert fresh["reused_from"] is None and len(calls) == 2
+    # 默认不复用
+    assert _generate(client)["reused_from"] is None and len(calls) == 3
+
+
+def test_create_test_entry_reuses_generated_paper(client, monkeypatch):
+    _fake_generation(monkeypatch)
+    generated = _generate(client)
+
+    data = {"source_text": "Python 循环", "config_json": json.dumps(CONFIG), "reuse": "clone"}
+    entry = client.post("/tests", data=data, headers={"X-Generation-Model": HEADERS["X-Generation-Model"]}).json()
+    assert entry["reused_from"] == int(generated["test_id"])
+    assert client.get(f"/test-papers/{entry['test_id']}").json()["questions"][0]["stem"] == generated["questions"][0]["stem"]
+
+    # 没有匹配的生成结果时照常新建空试卷
+    data["source_text"] = "另一份资料"
+    entry = client.post("/tests", data=data).json()
+    assert entry["reused_from"] is None
+    assert client.get(f"/test-papers/{entry['test_id']}").json()["questions"] == []
+
+
+def test_encoded_prompt_matches_across_endpoints(client, db, monkeypatch):
+    _fake_generation(monkeypatch)
+    prompt = {"X-Generation-Prompt": urllib.parse.quote("请出循环相关的题目")}
+    generated = client.post(
+        "/generate-test", data={"source_text": "Python 循环", "config_json": json.dumps(CONFIG)}, headers={**HEADERS, **prompt},
+    ).json()
+
+    data = {"source_text": "Python 循环", "config_json": json.dumps(CONFIG), "reuse": "serve"}
+    entry = client.post("/tests", data=data, headers={"X-Generation-Model": HEADERS["X-Generation-Model"], **prompt}).json()
+    assert entry["reused_from"] == int(generated["test_id"])
+
+    # /tests 新建的试卷保存解码后的提示，之后流式生成得到的内容哈希与 /generate-test 相同
+    data.update(source_text="另一份资料", reuse="off")
+    entry = client.post("/tests", data=data, headers=prompt).json()
+    assert db.get(models.TestPaper, entry["test_id"]).generation_prompt == "请出循环相关的题目"
@@ -0,0 +1,33 @@
+# backend/tests/test_history_summary.py
+
+from sqlalchemy import event
+
+import models
+
+
+def test_summary_never_selects_json_blobs(client, db, engine):
+    paper = models.TestPaper(name="摘要测试", total_objective_questions=4, total_essay_questions=1)
+    db.add(paper)
+    db.flush()
+    db.add(models.TestPaperResult(
+        test_paper_id=paper.id,
+        user_answers=[{"question_id": "1", "answer_text": "x" * 1000}],
+        grading_results=[{"question_id": "1", "is_correct": True}],
+        question_feedbacks={"1": "y" * 1000},
+        correct_objective_questions=3,
+    ))
+    db.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, stmt, *args: statements.append(stmt))
+    data = client.get("/history/summary").json()
+
+    item = data["items"][0]
+    assert item["test_paper_name"] == "摘要测试"
+    assert item["correct_objective_questions"] == 3
+    assert item["total_objective_questions"] == 4
+    assert item["score"] == 75.0
+    assert "user_answers" not in item
+    for stmt in statements:
+        for column in ("user_answers", "grading_results", "question_feedbacks", "source_content"):
+            assert column not in stmt
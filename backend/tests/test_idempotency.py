@@ -0,0 +1,96 @@
+# backend/tests/test_idempotency.py
+
+import asyncio
+import datetime
+import json
+
+import httpx
+
+import models
+import services
+
+CONFIG = {"description": "循环", "question_config": [{"type": "single_choice", "count": 1}], "difficulty": "中等"}
+HEADERS = {"X-Provider": "google", "X-Api-Key": "k", "X-Generation-Model": "gemini-1.5-flash"}
+
+
+def _fake_generation(monkeypatch, delay=0.0, fail_first=False):
+    calls = []
+
+    async def fake_generate_test_from_ai(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(delay)
+        if fail_first and len(calls) == 1:
+            raise RuntimeError("provider timed out")
+        return {"title": "循环测验", "questions": [
+            {"type": "single_choice", "stem": "for 循环适合做什么？", "options": ["遍历序列", "定义函数"], "answer": {"index": 0, "explanation": ""}},
+        ]}
+
+    monkeypatch.setattr(services, "generate_test_from_ai", fake_generate_test_from_ai)
+    return calls
+
+
+def _form(source_text="Python 循环"):
+    return {"source_text": source_text, "config_json": json.dumps(CONFIG)}
+
+
+def test_retry_with_same_key_replays_response(client, db, monkeypatch):
+    calls = _fake_generation(monkeypatch)
+    headers = {**HEADERS, "Idempotency-Key": "retry-1"}
+
+    first = client.post("/generate-test", data=_form(), headers=headers)
+    retry = client.post("/generate-test", data=_form(), headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers[services.REPLAYED_HEADER] == "true"
+    assert len(calls) == 1 and db.query(models.TestPaper).count() == 1
+
+    # 同一个键用于不同内容的请求
+    assert client.post("/generate-test", data=_form("另一份资料"), headers=headers).status_code == 422
+    # 不带键时照常执行
+    client.post("/generate-test", data=_form(), headers=HEADERS)
+    assert len(calls) == 2
+
+
+def test_concurrent_duplicates_attach_to_in_flight_request(client, db, monkeypatch):
+    from main import app
+
+    calls = _fake_generation(monkeypatch, delay=0.2)
+    headers = {**HEADERS, "Idempotency-Key": "concurrent-1"}
+
+    async def send_twice():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as ac:
+            return await asyncio.gather(*(ac.post("/generate-test", data=_form(), headers=headers) for _ in range(2)))
+
+    first, second = asyncio.run(send_twice())
+    assert first.status_code == second.status_code == 200
+    assert first.json()["test_id"] == second.json()["test_id"]
+    assert len(calls) == 1 and db.query(models.TestPaper).count() == 1
+
+
+def test_failed_request_releases_key_and_expired_keys_are_purged(client, db, monkeypatch):
+    calls = _fake_generation(monkeypatch, fail_first=True)
+    headers = {**HEADERS, "Idempotency-Key": "flaky-1"}
+
+    try:
+        client.post("/generate-test", data=_form(), headers=headers)
+    except RuntimeError:
+        pass
+    assert db.query(models.IdempotencyKey).count() == 0
+    assert client.post("/generate-test", data=_form(), headers=headers).status_code == 200
+    assert len(calls) == 2
+
+    db.query(models.IdempotencyKey).update({"expires_at": datetime.datetime.utcnow() - datetime.timedelta(seconds=1)})
+    db.commit()
+    assert services.purge_expired_idempotency_keys(db) == 1
+
+
+def test_grade_questions_retry_does_not_save_twice(client, db, make_paper):
+    paper, (question,) = make_paper("批改", [{"stem": "单选", "answer": {"index": 1, "explanation": ""}}])
+    body = {"test_id": str(paper.id), "answers": [
+        {"question_id": str(question.id), "question_type": "single_choice", "answer_index": 1}]}
+    headers = {"X-Provider": "siliconflow", "X-Api-Key": "k", "Idempotency-Key": "grade-1"}
+
+    first = client.post("/grade-questions", json=body, headers=headers)
+    retry = client.post("/grade-questions", json=body, headers=headers)
+    assert retry.json()["result_id"] == first.json()["result_id"]
+    assert db.query(models.TestPaperResult).count() == 1
@@ -0,0 +1,78 @@
+# backend/tests/test_item_analysis.py
+
+import random
+import statistics
+
+import pytest
+
+import models
+from services import item_analysis
+
+
+def _pearson(x, y):
+    if statistics.pstdev(x) == 0 or statistics.pstdev(y) == 0:
+        return None
+    mx, my = statistics.fmean(x), statistics.fmean(y)
+    cov = statistics.fmean([(a - mx) * (b - my) for a, b in zip(x, y)])
+    return cov / (statistics.pstdev(x) * statistics.pstdev(y))
+
+
+def _seed(db, make_paper, students=40, seed=7):
+    rng = random.Random(seed)
+    paper, questions = make_paper("项目分析", [
+        {"stem": f"单选{i}", "options": ["A", "B", "C", "D"], "answer": {"index": i % 4, "explanation": ""}}
+        for i in range(3)
+    ] + [{"type": "fill_in_the_blank", "stem": "填空", "answer": {"texts": ["x"], "explanation": ""}}])
+
+    matrix = []
+    for _ in range(students):
+        ability = rng.random()
+        answers, grades, row = [], [], []
+        for q in questions:
+            correct = rng.random() < ability
+            row.append(int(correct))
+            if q.question_type == "single_choice":
+                key = q.correct_answer["index"]
+                pick = key if correct else rng.choice([k for k in range(4) if k != key])
+                answers.append({"question_id": str(q.id), "question_type": q.question_type, "answer_index": pick})
+            else:
+                answers.append({"question_id": str(q.id), "question_type": q.question_type, "answer_texts": ["x" if correct else "y"]})
+            grades.append({"question_id": str(q.id), "is_correct": correct})
+        matrix.append(row)
+        db.add(models.TestPaperResult(test_paper_id=paper.id, user_answers=answers, grading_results=grades,
+                                      correct_objective_questions=sum(row)))
+    db.commit()
+    return paper, questions, matrix
+
+
+def test_metrics_match_naive_computation(client, db, make_paper):
+    paper, questions, matrix = _seed(db, make_paper)
+    data = client.get(f"/history_test_papers/{paper.id}/item-analysis").json()
+    totals = [sum(row) for row in matrix]
+    k = len(questions)
+
+    assert data["students"] == len(matrix)
+    for j, item in enumerate(data["items"]):
+        column = [row[j] for row in matrix]
+        assert item["difficulty"] == pytest.approx(statistics.fmean(column), abs=1e-4)
+        rest = [t - c for t, c in zip(totals, column)]
+        assert item["point_biserial"] == pytest.approx(_pearson(column, rest), abs=1e-4)
+
+    p = [statistics.fmean([row[j] for row in matrix]) for j in range(k)]
+    kr20 = k / (k - 1) * (1 - sum(pj * (1 - pj) for pj in p) / statistics.pvariance(totals))
+    assert data["kr20"] == pytest.approx(kr20, abs=1e-4)
+
+    first = data["items"][0]
+    assert [o["is_key"] for o in first["options"]] == [True, False, False, False]
+    assert sum(o["pick_rate"] for o in first["options"]) == pytest.approx(1.0, abs=1e-3)
+    assert data["items"][3]["options"] == []
+
+
+def test_cache_is_invalidated_by_new_results(client, db, make_paper):
+    paper, questions, _ = _seed(db, make_paper, students=10)
+    first = client.get(f"/history_test_papers/{paper.id}/item-analysis").json()
+    assert client.get(f"/history_test_papers/{paper.id}/item-analysis").json() == first
+
+    db.add(models.TestPaperResult(test_paper_id=paper.id, user_answers=[], grading_results=[]))
+    db.commit()
+    assert client.get(f"/history_test_papers/{paper.id}/item-analysis").json()["students"] == 11
@@ -0,0 +1,59 @@
+# backend/tests/test_pagination.py
+
+import datetime
+
+import models
+
+
+def _seed(db, count=7):
+    base = datetime.datetime(2025, 1, 1)
+    for i in range(count):
+        # 故意让部分记录的 created_at 相同，以验证 id 作为次排序键
+        paper = models.TestPaper(
+            name=f"paper-{i % 3}",
+            created_at=base + datetime.timedelta(minutes=i // 2),
+        )
+        db.add(paper)
+        db.flush()
+        db.add(models.TestPaperResult(
+            test_paper_id=paper.id,
+            user_answers=[],
+            grading_results=[],
+            created_at=paper.created_at,
+        ))
+    db.commit()
+
+
+def _walk(client, url, **params):
+    seen, cursor = [], None
+    while True:
+        query = dict(params, limit=3)
+        if cursor:
+            query["cursor"] = cursor
+        data = client.get(url, params=query).json()
+        assert len(data["items"]) <= 3
+        seen.extend(item["id"] for item in data["items"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            return seen
+
+
+def test_keyset_pages_cover_every_row_once(client, db):
+    _seed(db)
+    for url in ("/history/", "/history_test_papers/"):
+        for sort_by in ("created_at", "name"):
+            for order in ("asc", "desc"):
+                ids = _walk(client, url, sort_by=sort_by, order=order)
+                assert len(ids) == 7
+                assert len(set(ids)) == 7
+
+
+def test_total_is_only_computed_on_request(client, db):
+    _seed(db)
+    assert client.get("/history/").json()["total"] is None
+    assert client.get("/history/", params={"include_total": True}).json()["total"] == 7
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/history_test_papers/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
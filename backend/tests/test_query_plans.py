@@ -0,0 +1,90 @@
+# backend/tests/test_query_plans.py
+#
+# 用 EXPLAIN QUERY PLAN 检查热点查询是否命中索引。
+# 如果有人删除了索引或改写查询导致退化为全表扫描，这里的测试会失败。
+
+import pytest
+from sqlalchemy import event, func
+
+from models import DBQuestion, TestPaperResult
+
+
+def _plan(db, statement):
+    """返回查询计划中每一步的描述文本。"""
+    if hasattr(statement, "statement"):
+        statement = statement.statement
+    sql = str(statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    return [row[3] for row in rows]
+
+
+def _assert_indexed(plan, *tables):
+    for table in tables:
+        for step in plan:
+            # "SCAN <table>" 不带 "USING ... INDEX" 即为全表扫描
+            assert not (step.startswith(f"SCAN {table}") and "INDEX" not in step), plan
+    assert not any("USE TEMP B-TREE FOR ORDER BY" in step for step in plan), plan
+
+
+def test_questions_by_paper_uses_index(db):
+    # test_paper.questions 的懒加载
+    plan = _plan(db, db.query(DBQuestion).filter(DBQuestion.test_paper_id == 1))
+    _assert_indexed(plan, "questions")
+
+
+def test_results_by_paper_uses_index(db):
+    # delete_test_result 中的计数与 delete_test_paper_and_results 中的批量删除
+    count_plan = _plan(db, db.query(func.count(TestPaperResult.id)).filter(TestPaperResult.test_paper_id == 1))
+    _assert_indexed(count_plan, "test_paper_results")
+
+    delete_plan = db.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN DELETE FROM test_paper_results WHERE test_paper_id = 1"
+    ).fetchall()
+    _assert_indexed([row[3] for row in delete_plan], "test_paper_results")
+
+
+def test_latest_results_for_paper_uses_composite_index(db):
+    query = (
+        db.query(TestPaperResult)
+        .filter(TestPaperResult.test_paper_id == 1)
+        .order_by(TestPaperResult.created_at.desc())
+        .limit(1)
+    )
+    plan = _plan(db, query)
+    _assert_indexed(plan, "test_paper_results")
+    assert any("ix_test_paper_results_test_paper_id_created_at" in step for step in plan), plan
+
+
+def _page_plan(client, engine, url, **params):
+    """请求第二页（带游标），对端点实际执行的分页查询运行 EXPLAIN QUERY PLAN。"""
+    first = client.get(url, params={**params, "limit": 1}).json()
+    statements = []
+    listener = lambda conn, cursor, stmt, parameters, *args: statements.append((stmt, parameters))
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert client.get(url, params={**params, "limit": 1, "cursor": first["next_cursor"]}).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    (statement, parameters), = [(s, p) for s, p in statements if "ORDER BY" in s and "LIMIT" in s]
+    with engine.connect() as conn:
+        return [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("url, sort_by, index", [
+    ("/history/", "created_at", "ix_test_paper_results_created_at"),
+    # 先按名称索引遍历试卷，只在同名试卷的提交记录内部按 id 排序（RIGHT PART OF ORDER BY）
+    ("/history/", "name", "ix_test_papers_name_sort"),
+    ("/history/summary", "name", "ix_test_papers_name_sort"),
+    ("/history_test_papers/", "created_at", "ix_test_papers_created_at"),
+    ("/history_test_papers/", "name", "ix_test_papers_name_sort"),
+])
+def test_history_pages_use_index(client, db, engine, make_paper, url, sort_by, index, order):
+    for name in ("乙", "甲", "丙"):
+        paper, _ = make_paper(name)
+        db.add_all(TestPaperResult(test_paper_id=paper.id, user_answers=[], grading_results=[]) for _ in range(2))
+    db.commit()
+
+    plan = _page_plan(client, engine, url, sort_by=sort_by, order=order)
+    _assert_indexed(plan, "test_paper_results", "test_papers")
+    assert any(index in step for step in plan), plan
@@ -0,0 +1,67 @@
+# backend/tests/test_question_feedback.py
+
+import asyncio
+import datetime
+
+import models
+import services
+from services import ai
+from tests.test_statistics import QUESTIONS, _submit
+
+HEADERS = {"X-Provider": "siliconflow", "X-Api-Key": "k", "X-Evaluation-Model": "m"}
+
+
+def _fake_feedback(monkeypatch):
+    async def fake_single_feedback(question, user_answer, provider, api_key, evaluation_model=None, prompt=None):
+        await asyncio.sleep(0)
+        return f"{question.stem}-{evaluation_model}"
+
+    monkeypatch.setattr(ai, "get_single_question_feedback_from_ai", fake_single_feedback)
+
+
+def _feedback(client, result_id, question, model="m"):
+    body = {"result_id": result_id, "question_id": str(question.id)}
+    response = client.post("/generate-single-question-feedback", json=body, headers={**HEADERS, "X-Evaluation-Model": model})
+    assert response.status_code == 200
+    return response.json()["feedback"]
+
+
+def test_feedback_per_question_is_upserted(client, db, make_paper, monkeypatch):
+    _fake_feedback(monkeypatch)
+    paper, questions = make_paper("统计测试", QUESTIONS)
+    result_id = _submit(client, paper, questions, 1, [0, 2])
+
+    assert _feedback(client, result_id, questions[0]) == "单选-m"
+    assert _feedback(client, result_id, questions[2]) == "论述-m"
+    # 重新生成同一题时覆盖，不影响其他题
+    assert _feedback(client, result_id, questions[0], model="other") == "单选-other"
+
+    rows = db.query(models.QuestionFeedback).order_by(models.QuestionFeedback.question_id).all()
+    assert [(row.question_id, row.text, row.model) for row in rows] == [
+        (questions[0].id, "单选-other", "other"), (questions[2].id, "论述-m", "m")]
+    expected = {str(questions[0].id): "单选-other", str(questions[2].id): "论述-m"}
+    assert client.get(f"/history/{result_id}").json()["question_feedbacks"] == expected
+    assert client.get("/history/").json()["items"][0]["question_feedbacks"] == expected
+
+    client.delete(f"/history/{result_id}")
+    assert db.query(models.QuestionFeedback).count() == 0
+
+
+def test_archive_and_restore_keep_feedback(client, db, make_paper, monkeypatch):
+    _fake_feedback(monkeypatch)
+    paper, questions = make_paper("统计测试", QUESTIONS)
+    result_id = _submit(client, paper, questions, 1, [0, 2])
+    _feedback(client, result_id, questions[1])
+    db.query(models.TestPaperResult).filter(models.TestPaperResult.id == result_id).update(
+        {"created_at": datetime.datetime.utcnow() - datetime.timedelta(days=365)})
+    db.commit()
+
+    assert services.archive_old_results(db, older_than_days=30) == 1
+    assert db.query(models.QuestionFeedback).count() == 0
+    expected = {str(questions[1].id): "多选-m"}
+    assert client.get(f"/history/{result_id}").json()["question_feedbacks"] == expected
+
+    services.restore_archived_result(db, result_id)
+    db.commit()
+    assert db.query(models.QuestionFeedback).count() == 1
+    assert client.get(f"/history/{result_id}").json()["question_feedbacks"] == expected
@@ -0,0 +1,38 @@
+# backend/tests/test_response_cache.py
+
+import services
+
+QUESTIONS = [{"stem": "<b>单选</b>", "answer": {"index": 1, "explanation": "解析"}}]
+
+
+def test_paper_etag_and_not_modified(client, db, make_paper):
+    paper, _ = make_paper("缓存试卷", QUESTIONS)
+    first = client.get(f"/test-papers/{paper.id}")
+    assert first.status_code == 200
+    assert first.json()["questions"][0]["answer"] == {"index": 1, "explanation": "解析"}
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and first.headers["cache-control"] == "no-cache"
+
+    cached = client.get(f"/test-papers/{paper.id}", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    services.update_test_paper(db, paper.id, {"title": "改名", "questions": [
+        {"type": "single_choice", "stem": "新题", "options": ["A", "B"], "answer": {"index": 0, "explanation": ""}},
+    ]})
+    changed = client.get(f"/test-papers/{paper.id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()["name"] == "改名"
+
+
+def test_html_export_is_cached_per_paper(client, make_paper):
+    paper, _ = make_paper("缓存试卷", QUESTIONS)
+    html = client.get(f"/export/test-paper/{paper.id}/html")
+    assert html.status_code == 200 and html.headers["content-type"].startswith("text/html")
+    assert client.get(f"/export/test-paper/{paper.id}/html",
+                      headers={"If-None-Match": html.headers["etag"]}).status_code == 304
+    # JSON 与 HTML 分开缓存，ETag 不同
+    assert client.get(f"/test-papers/{paper.id}").headers["etag"] != html.headers["etag"]
+
+    assert client.delete(f"/history_test_papers/{paper.id}").status_code == 204
+    assert client.get(f"/export/test-paper/{paper.id}/html").status_code == 404
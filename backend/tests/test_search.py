@@ -0,0 +1,55 @@
+# backend/tests/test_search.py
+
+OPTIONS = ["for 循环", "while 循环"]
+
+
+def test_search_ranks_papers_and_highlights_questions(client, make_paper):
+    make_paper("Python 循环结构测验", [{"stem": "以下哪种循环用于遍历序列？", "options": OPTIONS}])
+    make_paper("数据库索引", [{"stem": "B 树索引的特点是什么？", "options": ["有序", "无序"]}])
+
+    data = client.get("/search/", params={"q": "循环结构"}).json()
+    assert [p["name"] for p in data["papers"]] == ["Python 循环结构测验"]
+    assert "<mark>循环结构</mark>" in data["papers"][0]["name_highlight"]
+
+    data = client.get("/search/", params={"q": "while"}).json()
+    assert len(data["questions"]) == 1
+    assert "<mark>while</mark>" in data["questions"][0]["options_snippet"]
+
+
+def test_short_terms_fall_back_to_like(client, make_paper):
+    make_paper("Python 循环结构测验", [{"stem": "以下哪种循环用于遍历序列？", "options": OPTIONS}])
+    data = client.get("/search/", params={"q": "遍历"}).json()
+    assert len(data["questions"]) == 1
+    assert "<mark>遍历</mark>" in data["questions"][0]["stem_snippet"]
+
+
+def test_index_follows_update_and_delete(client, db, make_paper):
+    paper, _ = make_paper("旧的试卷名称", ["第一题题干内容"])
+    paper.name = "新的试卷名称"
+    db.commit()
+    assert client.get("/search/", params={"q": "旧的试卷"}).json()["papers"] == []
+    assert len(client.get("/search/", params={"q": "新的试卷"}).json()["papers"]) == 1
+
+    db.delete(paper)
+    db.commit()
+    data = client.get("/search/", params={"q": "第一题题干"}).json()
+    assert data["papers"] == [] and data["questions"] == []
+
+
+def test_history_search_uses_index(client, make_paper):
+    make_paper("Python 循环结构测验")
+    make_paper("数据库索引")
+    items = client.get("/history_test_papers/", params={"search": "循环结构"}).json()["items"]
+    assert [p["name"] for p in items] == ["Python 循环结构测验"]
+
+
+def test_snippets_escape_html_around_highlights(client, make_paper):
+    make_paper("<b>循环</b> 测验", [{"stem": "<img src=x onerror=alert(1)> 循环结构", "options": ["a & b", "<script>循环</script>"]}])
+
+    data = client.get("/search/", params={"q": "循环结构"}).json()
+    snippet = data["questions"][0]["stem_snippet"]
+    assert snippet.endswith("onerror=alert(1)&gt; <mark>循环结构</mark>") and "<img" not in snippet
+
+    data = client.get("/search/", params={"q": "循环"}).json()
+    assert data["papers"][0]["name_highlight"] == "&lt;b&gt;<mark>循环</mark>&lt;/b&gt; 测验"
+    assert "&lt;script&gt;<mark>循环</mark>&lt;/script&gt;" in data["questions"][0]["options_snippet"]
@@ -0,0 +1,66 @@
+# backend/tests/test_serialization.py
+
+import orjson
+import pytest
+from pydantic import ValidationError
+
+import models
+import schemas
+import services
+from services import ai
+
+
+def test_question_answer_is_chosen_by_type():
+    question = schemas.QuestionModelAdapter.validate_python({
+        "type": "multiple_choice", "stem": "多选", "options": ["A", "B"],
+        "answer": {"indexes": [0, 1], "explanation": ""},
+    })
+    assert isinstance(question, schemas.MultipleChoiceQuestion)
+    assert isinstance(question.answer, schemas.MultipleChoiceAnswer)
+
+    # 答案与题型不符时只按该题型报错，不会被其他答案模型“碰巧”接受
+    mismatched = {"type": "single_choice", "stem": "单选", "answer": {"indexes": [0], "explanation": ""}}
+    with pytest.raises(ValidationError) as info:
+        schemas.StrictQuestionModelAdapter.validate_python(mismatched)
+    assert {error["loc"] for error in info.value.errors()} == {("single_choice", "answer", "index")}
+    # 读取时退回旧版模型
+    legacy = schemas.QuestionModelAdapter.validate_python(mismatched)
+    assert isinstance(legacy, schemas.LegacyQuestionModel)
+    assert isinstance(legacy.answer, schemas.MultipleChoiceAnswer)
+
+
+def test_mismatched_questions_still_load_but_are_not_saved(client, db):
+    # 旧版本写入的、答案结构与题型不符的题目
+    paper = models.TestPaper(name="旧试卷", config={})
+    paper.questions = [
+        models.DBQuestion(question_type="single_choice", stem="单选", options=["A", "B"],
+                          correct_answer={"indexes": [0], "explanation": ""}),
+        models.DBQuestion(question_type="true_false", stem="判断", options=["对", "错"],
+                          correct_answer={"index": 0, "explanation": ""}),
+    ]
+    db.add(paper)
+    db.commit()
+
+    response = client.get(f"/test-papers/{paper.id}")
+    assert response.status_code == 200
+    assert [q["answer"] for q in response.json()["questions"]] == [
+        {"indexes": [0], "explanation": ""}, {"index": 0, "explanation": ""}]
+    assert client.get(f"/export/test-paper/{paper.id}/html").status_code == 200
+    assert client.get("/export/papers.zip").status_code == 200
+
+    # 新生成的题目保存前按题型校验，不符的题目被丢弃，试卷也不记录内容哈希
+    questions = [
+        {"type": "single_choice", "stem": "好题", "options": ["A", "B"], "answer": {"index": 1, "explanation": ""}},
+        {"type": "single_choice", "stem": "坏题", "options": ["A", "B"], "answer": {"indexes": [1], "explanation": ""}},
+    ]
+    services.update_test_paper(db, paper.id, {"title": "", "questions": questions}, content_hash="h")
+    db.refresh(paper)
+    assert [q.stem for q in paper.questions] == ["好题"]
+    assert paper.content_hash is None and paper.total_objective_questions == 1
+
+
+def test_sse_event_is_utf8_json():
+    event = ai._sse_event({"type": "question", "content": {"stem": "题干"}})
+    assert event.startswith("data: ") and event.endswith("\n\n")
+    assert orjson.loads(event[len("data: "):]) == {"type": "question", "content": {"stem": "题干"}}
+    assert "题干" in event
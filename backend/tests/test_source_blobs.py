@@ -0,0 +1,53 @@
+# backend/tests/test_source_blobs.py
+
+from sqlalchemy import event
+
+import models
+import services
+
+DOCUMENT = "第一章 循环结构\nfor 循环用于遍历序列。\n" * 500
+
+
+def test_identical_sources_are_stored_once_and_compressed(db):
+    for i in range(3):
+        db.add(models.TestPaper(name=f"第{i}次生成", source_content=DOCUMENT))
+    db.add(models.TestPaper(name="其他", source_content="另一份资料"))
+    db.add(models.TestPaper(name="无知识源"))
+    db.commit()
+
+    assert db.query(models.SourceBlob).count() == 2
+    blob = db.get(models.SourceBlob, models.source_hash(DOCUMENT))
+    assert blob.size == len(DOCUMENT.encode("utf-8"))
+    assert len(blob.data) < blob.size // 20
+
+    db.expunge_all()
+    papers = db.query(models.TestPaper).order_by(models.TestPaper.id).all()
+    assert [p.source_content for p in papers] == [DOCUMENT] * 3 + ["另一份资料", None]
+
+    report = services.source_storage_report(db)
+    assert (report.papers, report.documents) == (4, 2)
+    assert report.referenced_bytes == 3 * blob.size + len("另一份资料".encode("utf-8"))
+    assert report.saved_bytes > 2 * blob.size
+
+
+def test_paper_listing_does_not_read_source_blobs(client, db, engine):
+    db.add(models.TestPaper(name="试卷", source_content=DOCUMENT))
+    db.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, stmt, *args: statements.append(stmt))
+    assert client.get("/history_test_papers/").status_code == 200
+    assert statements and not any("source_blobs" in stmt for stmt in statements)
+
+
+def test_orphan_blobs_are_deleted(db):
+    paper = models.TestPaper(name="试卷", source_content=DOCUMENT)
+    db.add(paper)
+    db.commit()
+    paper.source_content = "修改后的资料"
+    db.commit()
+
+    assert db.query(models.SourceBlob).count() == 2
+    assert services.delete_orphan_source_blobs(db) == 1
+    db.expunge_all()
+    assert db.query(models.TestPaper).one().source_content == "修改后的资料"
@@ -0,0 +1,59 @@
+# backend/tests/test_speculative_feedback.py
+
+import asyncio
+
+import models
+from services import ai, speculation
+
+HEADERS = {"X-Provider": "siliconflow", "X-Api-Key": "k", "X-Evaluation-Model": "m"}
+
+
+def _paper(make_paper):
+    paper, (question,) = make_paper("反馈", [{"stem": "单选", "answer": {"index": 1, "explanation": ""}}])
+    answers = [{"question_id": str(question.id), "question_type": "single_choice", "answer_index": 0}]
+    return paper, answers
+
+
+def _fake_feedback(monkeypatch):
+    calls = []
+
+    async def fake_overall_feedback(graded_info, provider, api_key, evaluation_model=None, overall_feedback_prompt=None):
+        calls.append(evaluation_model)
+        await asyncio.sleep(0.2)
+        return f"反馈 {len(calls)}"
+
+    monkeypatch.setattr(ai, "get_overall_feedback_from_ai", fake_overall_feedback)
+    return calls
+
+
+def test_feedback_endpoint_attaches_to_speculative_task(client, db, make_paper, monkeypatch):
+    calls = _fake_feedback(monkeypatch)
+    paper, answers = _paper(make_paper)
+
+    graded = client.post("/grade-questions", json={"test_id": str(paper.id), "answers": answers},
+                         headers={**HEADERS, "X-Speculative-Feedback": "true"}).json()
+    assert graded["speculative_feedback"] is True
+
+    body = {"result_id": graded["result_id"], "test_id": str(paper.id), "answers": answers}
+    assert client.post("/generate-overall-feedback", json=body, headers=HEADERS).json() == {"feedback": "反馈 1"}
+    assert client.post("/generate-overall-feedback", json=body, headers=HEADERS).json() == {"feedback": "反馈 1"}
+    assert calls == ["m"]
+    db.expire_all()
+    assert db.get(models.TestPaperResult, graded["result_id"]).overall_feedback == "反馈 1"
+
+    # 换了模型的请求不使用预生成结果
+    other = client.post("/generate-overall-feedback", json=body, headers={**HEADERS, "X-Evaluation-Model": "other"})
+    assert other.json() == {"feedback": "反馈 2"} and calls == ["m", "other"]
+
+
+def test_speculation_is_opt_in_and_capped(client, make_paper, monkeypatch):
+    calls = _fake_feedback(monkeypatch)
+    paper, answers = _paper(make_paper)
+    grade = lambda headers: client.post("/grade-questions", json={"test_id": str(paper.id), "answers": answers}, headers=headers).json()
+
+    assert grade(HEADERS)["speculative_feedback"] is False
+    monkeypatch.setattr(speculation, "SPECULATIVE_CONCURRENCY", 1)
+    assert grade({**HEADERS, "X-Speculative-Feedback": "true"})["speculative_feedback"] is True
+    # 上一个预生成仍在运行，达到上限后不再启动新的
+    assert grade({**HEADERS, "X-Speculative-Feedback": "true"})["speculative_feedback"] is False
+    assert speculation.running_speculations() == 1
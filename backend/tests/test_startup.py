@@ -0,0 +1,48 @@
+# backend/tests/test_startup.py
+
+import os
+import sys
+import sqlite3
+import subprocess
+from os.path import abspath, dirname
+
+BACKEND_DIR = dirname(dirname(abspath(__file__)))
+
+
+def _run(code, **env):
+    return subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", code],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        env={**os.environ, "DATABASE_URL": "sqlite://", **env},
+    ).stdout.strip()
+
+
+def test_importing_main_does_not_load_provider_sdks():
+    loaded = _run("import sys, main; print(sorted(m for m in ('google.generativeai', 'openai') if m in sys.modules))")
+    assert loaded == "[]"
+
+
+def test_migrate_mode_upgrades_to_head(tmp_path):
+    path = tmp_path / "app.db"
+    _run("import database; database.init_db()", DATABASE_URL=f"sqlite:///{path}", DB_SCHEMA_MODE="migrate")
+    with sqlite3.connect(path) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        version = conn.execute("SELECT version_num FROM alembic_version").fetchone()
+    assert {"test_papers", "test_paper_results", "test_paper_results_archive"} <= tables
+    assert version is not None
+
+
+def test_llm_clients_share_one_pool_per_provider():
+    import asyncio
+
+    from services import ai
+
+    async def check():
+        first, second = ai.get_llm_client("siliconflow", "key-1"), ai.get_llm_client("siliconflow", "key-2")
+        # 不同用户的 API Key 各自生效，但共用同一个连接池，缓存不会随用户数增长
+        assert (first.api_key, second.api_key) == ("key-1", "key-2")
+        assert first._client is second._client and len(ai._clients) == 1
+        await ai.close_llm_clients()
+        assert first._client.is_closed and not ai._clients
+
+    asyncio.run(check())
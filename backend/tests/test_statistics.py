@@ -0,0 +1,65 @@
+# backend/tests/test_statistics.py
+
+import models
+import services
+
+HEADERS = {"X-Provider": "siliconflow", "X-Api-Key": "test-key"}
+
+QUESTIONS = [
+    {"type": "single_choice", "stem": "单选", "options": ["A", "B", "C"], "answer": {"index": 1, "explanation": ""}},
+    {"type": "multiple_choice", "stem": "多选", "options": ["A", "B", "C", "D"], "answer": {"indexes": [0, 2], "explanation": ""}},
+    {"type": "essay", "stem": "论述", "answer": {"reference_explanation": "参考"}},
+]
+
+
+def _submit(client, paper, questions, single, multiple):
+    answers = [
+        {"question_id": str(questions[0].id), "question_type": "single_choice", "answer_index": single},
+        {"question_id": str(questions[1].id), "question_type": "multiple_choice", "answer_indices": multiple},
+        {"question_id": str(questions[2].id), "question_type": "essay", "answer_text": "作答"},
+    ]
+    response = client.post("/grade-questions", json={"test_id": str(paper.id), "answers": answers}, headers=HEADERS)
+    assert response.status_code == 200
+    return response.json()["result_id"]
+
+
+def _dashboard(client, paper):
+    return client.get(f"/history_test_papers/{paper.id}/statistics").json()
+
+
+def test_statistics_follow_grading_and_deletion(client, make_paper):
+    paper, questions = make_paper("统计测试", QUESTIONS)
+    _submit(client, paper, questions, single=1, multiple=[0, 2])   # 全对
+    second = _submit(client, paper, questions, single=0, multiple=[0])  # 全错
+
+    stats = _dashboard(client, paper)
+    assert stats["attempts"] == 2
+    assert stats["mean_correct_objective"] == 1.0
+    assert stats["mean_score"] == 50.0
+    single, multiple, essay = stats["questions"]
+    assert (single["attempts"], single["correct_rate"], single["option_pick_counts"]) == (2, 0.5, [1, 1, 0])
+    assert multiple["option_pick_counts"] == [2, 0, 1, 0]
+    assert essay["attempts"] == 0 and essay["correct_rate"] is None
+
+    assert client.delete(f"/history/{second}").status_code == 204
+    stats = _dashboard(client, paper)
+    assert stats["attempts"] == 1
+    assert stats["questions"][0]["option_pick_counts"] == [0, 1, 0]
+
+
+def test_rebuild_matches_incremental(client, db, make_paper):
+    paper, questions = make_paper("统计测试", QUESTIONS)
+    _submit(client, paper, questions, single=1, multiple=[0, 2])
+    _submit(client, paper, questions, single=2, multiple=[1, 2])
+    _submit(client, paper, questions, single=1, multiple=[0])
+    incremental = _dashboard(client, paper)
+
+    db.query(models.QuestionOptionStatistics).delete()
+    db.query(models.QuestionStatistics).delete()
+    db.query(models.PaperStatistics).delete()
+    db.commit()
+    assert _dashboard(client, paper)["attempts"] == 0
+
+    assert services.rebuild_statistics(db) == 3
+    db.commit()
+    assert _dashboard(client, paper) == incremental
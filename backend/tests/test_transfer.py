@@ -0,0 +1,74 @@
+# backend/tests/test_transfer.py
+
+import gzip
+import json
+
+import models
+
+
+def _seed(client, db, make_paper):
+    paper, questions = make_paper("迁移试卷", [
+        {"stem": "单选", "answer": {"index": 1, "explanation": ""}},
+        {"type": "essay", "stem": "论述", "answer": {"reference_explanation": "参考"}},
+    ], config={"description": "d", "question_config": [], "difficulty": "中等"})
+    answers = [
+        {"question_id": str(questions[0].id), "question_type": "single_choice", "answer_index": 1},
+        {"question_id": str(questions[1].id), "question_type": "essay", "answer_text": "作答"},
+    ]
+    response = client.post("/grade-questions/bulk", json={"test_id": str(paper.id), "submissions": [{"answers": answers}]})
+    assert response.status_code == 200
+    result = db.get(models.TestPaperResult, response.json()["students"][0]["result_id"])
+    result.question_feedbacks = {str(questions[0].id): "不错"}
+    db.commit()
+    return paper
+
+
+def _import(client, body, **data):
+    return client.post("/transfer/import", data=data, files={"file": ("bank.jsonl", body, "application/x-ndjson")})
+
+
+def test_export_import_round_trip_remaps_ids(client, db, make_paper):
+    _seed(client, db, make_paper)
+    exported = client.get("/transfer/export.jsonl", params={"gzip": "true"})
+    assert exported.status_code == 200
+    lines = [json.loads(line) for line in gzip.decompress(exported.content).splitlines()]
+    assert [line["kind"] for line in lines] == ["header", "paper", "question", "question", "result"]
+
+    response = _import(client, exported.content)
+    assert response.json() == {"papers": 1, "questions": 2, "results": 1, "skipped": 0}
+
+    new_paper = db.query(models.TestPaper).order_by(models.TestPaper.id.desc()).first()
+    new_question_ids = {str(q.id) for q in new_paper.questions}
+    new_result = new_paper.results[0]
+    assert {a["question_id"] for a in new_result.user_answers} == new_question_ids
+    assert {g["question_id"] for g in new_result.grading_results} == new_question_ids
+    assert set(new_result.question_feedbacks) <= new_question_ids
+    assert new_result.correct_objective_questions == 1
+    assert db.get(models.PaperStatistics, new_paper.id).attempts == 1
+
+
+def test_import_rejects_invalid_line_atomically(client, db, make_paper):
+    _seed(client, db, make_paper)
+    lines = client.get("/transfer/export.jsonl").content.splitlines()
+    question = json.loads(lines[2])
+    question["question"]["answer"] = {"indexes": [0]}  # 与单选题型不符
+    body = b"\n".join(lines[:2] + [json.dumps(question).encode()] + lines[3:])
+
+    response = _import(client, body)
+    assert response.status_code == 400 and response.json()["detail"].startswith("Line 3")
+    assert db.query(models.TestPaper).count() == 1
+
+    response = _import(client, body, skip_invalid="true")
+    assert response.json() == {"papers": 1, "questions": 1, "results": 1, "skipped": 1}
+
+    # 被跳过的单选题的原ID在本库中属于原试卷的题目，引用它的作答、批改结果和反馈都被丢弃
+    new_paper = db.query(models.TestPaper).order_by(models.TestPaper.id.desc()).first()
+    essay_id = str(new_paper.questions[0].id)
+    new_result = new_paper.results[0]
+    assert [a["question_id"] for a in new_result.user_answers] == [essay_id]
+    assert [g["question_id"] for g in new_result.grading_results] == [essay_id]
+    assert new_result.question_feedbacks is None
+    assert new_result.correct_objective_questions == 0
+    assert db.query(models.QuestionStatistics).filter(models.QuestionStatistics.test_paper_id == new_paper.id).count() == 0
+    original_question = db.query(models.DBQuestion).order_by(models.DBQuestion.id).first()
+    assert db.get(models.QuestionStatistics, original_question.id).attempts == 1